@@ -0,0 +1,33 @@
+"""Размер и скорость сериализации пользователя: JSON против двоичного формата
+
+Запуск из корня репозитория: python -m benchmarks.binary_format
+"""
+
+import json
+from benchmarks.common import best_time, make_user
+from utils.backends import encode_user, decode_user
+from utils.models import to_json
+
+CARD_COUNTS = (1_000, 10_000)
+
+def main():
+    print(f"{'cards':>7} {'format':>12} {'size':>10} {'encode':>10} {'decode':>10}")
+    for card_count in CARD_COUNTS:
+        user = make_user(card_count)
+        number = max(1, 20_000 // card_count)
+
+        # Прежний формат файла пользователя: JSON с отступами
+        pretty = json.dumps(user, ensure_ascii=False, indent=4, default=to_json).encode('utf-8')
+        encode = best_time(lambda: json.dumps(user, ensure_ascii=False, indent=4, default=to_json).encode('utf-8'), number)
+        decode = best_time(lambda: json.loads(pretty), number)
+        print(f"{card_count:>7} {'pretty json':>12} {len(pretty) / 1024:>8.0f}KB {encode / 1000:>8.1f}ms {decode / 1000:>8.1f}ms")
+
+        for data_format in ('json', 'binary'):
+            data = encode_user(user, data_format)
+            assert decode_user(data)['cards'] == list(user['cards'])
+            encode = best_time(lambda: encode_user(user, data_format), number)
+            decode = best_time(lambda: decode_user(data), number)
+            print(f"{card_count:>7} {data_format:>12} {len(data) / 1024:>8.0f}KB {encode / 1000:>8.1f}ms {decode / 1000:>8.1f}ms")
+
+if __name__ == '__main__':
+    main()
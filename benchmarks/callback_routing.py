@@ -0,0 +1,130 @@
+"""Стоимость маршрутизации нажатия: цепочка lambda-фильтров против CallbackRouter
+
+Обе схемы регистрируют одинаковый набор действий с пустыми обработчиками,
+нажатия проходят через dp.feed_update. Цепочка фильтров повторяет прежнюю
+регистрацию обработчиков в bot.py; для роутера нажатия даны и в старом
+виде (кнопки уже отправленных сообщений), и в компактном (pack).
+
+Запуск из корня репозитория: python -m benchmarks.callback_routing
+"""
+
+import asyncio
+import time
+from aiogram import Bot, Dispatcher, types
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from utils.callback_data import pack
+from utils.callback_router import CallbackRouter
+
+UPDATES = 2000
+
+class States(StatesGroup):
+    adding_card = State()
+    adding_translation = State()
+    waiting_for_gpt = State()
+    learning = State()
+
+async def handler(*args, **kwargs):
+    pass
+
+def lambda_chain() -> Dispatcher:
+    """Прежняя схема: фильтры проверяются по порядку регистрации"""
+    dp = Dispatcher()
+    query = dp.callback_query
+    for name in ('back_to_menu', 'change_language', 'settings'):
+        query(lambda c, name=name: c.data == name)(handler)
+    query(lambda c: c.data.startswith('lang_'))(handler)
+    query(lambda c: len(c.data.split('_')) == 2 and c.data.split('_')[0] in ['front', 'back'])(handler)
+    for name in ('notifications', 'my_cards'):
+        query(lambda c, name=name: c.data == name)(handler)
+    query(lambda c: c.data.startswith('page_'))(handler)
+    query(lambda c: c.data == 'add_card')(handler)
+    query(lambda c: c.data.startswith('add_translation_'), States.adding_card)(handler)
+    query(lambda c: c.data == 'save_card', States.adding_card)(handler)
+    query(lambda c: c.data.startswith('card_'))(handler)
+    query(lambda c: c.data.startswith('edit_') and len(c.data.split('_')) == 3)(handler)
+    query(lambda c: c.data.startswith('delete_') and len(c.data.split('_')) == 2)(handler)
+    query(lambda c: c.data.startswith('confirm_delete_'))(handler)
+    query(lambda c: c.data == 'back_to_cards')(handler)
+    query(lambda c: c.data == 'back_to_add_card', States.adding_translation)(handler)
+    query(lambda c: c.data.startswith('back_to_card_'), StateFilter('waiting_for_translation'))(handler)
+    query(lambda c: c.data == 'add_translation_gpt')(handler)
+    query(lambda c: c.data == 'save_gpt_cards')(handler)
+    query(lambda c: c.data == 'back_to_add_card', States.waiting_for_gpt)(handler)
+    query(lambda c: c.data == 'learn')(handler)
+    query(lambda c: c.data == 'back_to_menu', States.learning)(handler)
+    query(lambda c: c.data in ['answer_correct', 'answer_wrong'], States.learning)(handler)
+    return dp
+
+def table_router() -> Dispatcher:
+    """Текущая схема: один обработчик и разбор callback_data через CallbackRouter"""
+    dp = Dispatcher()
+    router = CallbackRouter()
+    for name in ('back_to_menu', 'change_language', 'settings', 'notifications', 'my_cards', 'add_card',
+                 'back_to_cards', 'add_translation_gpt', 'save_gpt_cards', 'learn'):
+        router.route(name)(handler)
+    router.route('lang', lang=str)(handler)
+    router.route('front', lang=str)(handler)
+    router.route('back', lang=str)(handler)
+    router.route('page', page=int)(handler)
+    router.route('add_translation', States.adding_card, lang=str)(handler)
+    router.route('save_card', States.adding_card)(handler)
+    router.route('card', card_id=int)(handler)
+    router.route('edit', card_id=int, lang=str)(handler)
+    router.route('delete', card_id=int)(handler)
+    router.route('confirm_delete', card_id=int)(handler)
+    router.route('back_to_add_card', States.adding_translation)(handler)
+    router.route('back_to_card', 'waiting_for_translation', card_id=int)(handler)
+    router.route('back_to_add_card', States.waiting_for_gpt)(handler)
+    router.route('back_to_menu', States.learning)(handler)
+    router.route('answer_correct', States.learning)(handler)
+    router.route('answer_wrong', States.learning)(handler)
+
+    @dp.callback_query()
+    async def route(callback: types.CallbackQuery, state: FSMContext, **data):
+        if not await router.dispatch(callback, state, **data):
+            raise SkipHandler()
+    return dp
+
+# (старая callback_data, компактная callback_data, состояние FSM)
+CASES = (
+    ('back_to_menu', pack('back_to_menu'), None),
+    ('card_17', pack('card', 17), None),
+    ('answer_correct', pack('answer_correct'), States.learning),
+    ('back_to_card_17', pack('back_to_card', 17), 'waiting_for_translation'),
+)
+
+def callback_update(update_id: int, data: str) -> types.Update:
+    return types.Update(update_id=update_id, callback_query=types.CallbackQuery(
+        id=str(update_id), chat_instance='chat', data=data,
+        from_user=types.User(id=1, is_bot=False, first_name='user'),
+        message=types.Message(message_id=1, date=0, chat=types.Chat(id=1, type='private'))
+    ))
+
+async def cost(dp: Dispatcher, bot: Bot, data: str, state) -> float:
+    """Лучшее из трех прогонов, микросекунды на нажатие"""
+    await dp.fsm.get_context(bot, 1, 1).set_state(state)
+    updates = [callback_update(update_id, data) for update_id in range(UPDATES)]
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        for update in updates:
+            await dp.feed_update(bot, update)
+        timings.append((time.perf_counter() - started) / UPDATES * 1e6)
+    return min(timings)
+
+async def main():
+    bot = Bot('123456:TEST')
+    chain, router = lambda_chain(), table_router()
+    print(f"{'callback_data':>16} {'lambdas':>10} {'router':>10} {'packed':>10}")
+    for data, packed, state in CASES:
+        before = await cost(chain, bot, data, state)
+        after = await cost(router, bot, data, state)
+        compact = await cost(router, bot, packed, state)
+        print(f"{data:>16} {before:>8.0f}us {after:>8.0f}us {compact:>8.0f}us")
+    await bot.session.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
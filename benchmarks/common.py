@@ -0,0 +1,43 @@
+"""Общие данные для бенчмарков: синтетические карточки и пользователи"""
+
+import random
+import time
+import timeit
+from utils.data_manager import create_statistics
+from utils.default_deck import create_default_cards
+from utils.models import Card, Deck
+
+LANGUAGES = ('ru', 'en', 'es', 'ro')
+
+def make_card(card_id: int, rng: random.Random, now: float) -> Card:
+    """Карточка с переводами на все языки; 80% карточек уже показывались"""
+    translations = {lang: f'{lang} word {card_id}' for lang in LANGUAGES}
+    stats = create_statistics()
+    if rng.random() < 0.8:
+        total = rng.randint(1, 20)
+        wrong = rng.randint(0, total)
+        stats.update(total_attempts=total, correct_answers=total - wrong, wrong_answers=wrong,
+                     wrong_streak=rng.randint(0, min(wrong, 3)), last_result=rng.random() < 0.5,
+                     last_shown=now - rng.uniform(0, 48) * 3600)
+    return Card(id=card_id, translations=translations, statistics=stats)
+
+def make_cards(count: int, seed: int = 0) -> list:
+    """Карточки с id после шаблонной колоды"""
+    rng = random.Random(seed)
+    now = time.time()
+    first_id = len(create_default_cards()) + 1
+    return [make_card(card_id, rng, now) for card_id in range(first_id, first_id + count)]
+
+def make_user(card_count: int, seed: int = 0) -> dict:
+    """Пользователь с шаблонной колодой и card_count своими карточками"""
+    cards = create_default_cards() + make_cards(card_count, seed)
+    return {
+        'interface_lang': 'en',
+        'settings': {'front_languages': ['es'], 'back_languages': ['en']},
+        'cards': Deck(cards),
+        'last_card_id': cards[-1]['id']
+    }
+
+def best_time(statement, number: int) -> float:
+    """Лучшее из трех измерений, микросекунды на вызов"""
+    return min(timeit.repeat(statement, number=number, repeat=3)) / number * 1e6
@@ -0,0 +1,52 @@
+"""Поиск похожих переводов: время запроса к триграммному индексу
+
+Колода собирается из псевдослов, сложенных из слогов европейских языков,
+чтобы триграммы повторялись примерно как в живом языке. Запросы — наполовину
+существующие слова с опечаткой, наполовину новые слова.
+
+Запуск из корня репозитория: python -m benchmarks.duplicate_index
+"""
+
+import random
+from benchmarks.common import best_time
+from utils.constants import FUZZY_DUPLICATE_THRESHOLD
+from utils.duplicate_index import DuplicateIndex, TrigramIndex, fold_text
+
+SIZES = (10_000, 50_000)
+QUERIES = 1000
+# Слоги: начало, гласная и окончание, как в европейских языках
+ONSETS = ('', 'b', 'c', 'd', 'f', 'g', 'h', 'j', 'k', 'l', 'm', 'n', 'p', 'r', 's', 't', 'v', 'w', 'z',
+          'bl', 'br', 'cr', 'dr', 'fl', 'fr', 'gr', 'pl', 'pr', 'st', 'str', 'tr', 'ch', 'sh', 'th')
+VOWELS = ('a', 'e', 'i', 'o', 'u', 'ai', 'ea', 'ou', 'ie')
+CODAS = ('', '', '', 'n', 'r', 's', 't', 'l', 'm', 'nd', 'st', 'ng', 'ck')
+
+def make_word(rng: random.Random) -> str:
+    syllable = lambda: rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+    words = [''.join(syllable() for _ in range(rng.randint(1, 3))) for _ in range(rng.choice((1, 1, 1, 2)))]
+    return ' '.join(words)
+
+def with_typo(word: str, rng: random.Random) -> str:
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice('aeiou') + word[position + 1:]
+
+def main():
+    print(f"{'cards':>7} {'trigram index':>14} {'card check':>11}")
+    for size in SIZES:
+        rng = random.Random(size)
+        words = [make_word(rng) for _ in range(size)]
+        cards = [{'id': card_id, 'translations': {'en': word, 'es': word[::-1]}} for card_id, word in enumerate(words)]
+        trigram_index = TrigramIndex()
+        for card in cards:
+            trigram_index.add(card['id'], fold_text(card['translations']['en'], 'en'))
+        duplicate_index = DuplicateIndex(cards)
+
+        queries = [with_typo(rng.choice(words), rng) if i % 2 else make_word(rng) for i in range(QUERIES)]
+        folded = [fold_text(query, 'en') for query in queries]
+        picks = iter(folded * 3)
+        lookup = best_time(lambda: trigram_index.similar(next(picks), FUZZY_DUPLICATE_THRESHOLD), QUERIES)
+        picks = iter(queries * 3)
+        check = best_time(lambda: duplicate_index.similar_cards({'en': (query := next(picks)), 'es': query[::-1]}), QUERIES)
+        print(f"{size:>7} {lookup / 1000:>12.3f}ms {check / 1000:>9.3f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Память на карточку: словари из хранилища против моделей Card и Statistics
+
+Карточки читаются из JSON так же, как при загрузке пользователя, и
+остаются в памяти в виде словарей или моделей. Объем считается через
+tracemalloc; отдельно показан объем без словарей переводов, которые у
+шаблонных карточек общие для всех пользователей.
+
+Запуск из корня репозитория: python -m benchmarks.models
+"""
+
+import gc
+import json
+import tracemalloc
+from benchmarks.common import make_cards
+from utils.models import Card, to_json
+
+CARD_COUNT = 100_000
+
+def retained(build) -> int:
+    """Сколько байт остается занято объектами, которые вернула build"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+def main():
+    payload = json.dumps(make_cards(CARD_COUNT), default=to_json)
+    translations = retained(lambda: [card['translations'] for card in json.loads(payload)])
+    print(f"{CARD_COUNT} cards, translations alone: {translations / CARD_COUNT:.0f} bytes per card")
+    print(f"{'form':>8} {'per card':>10} {'w/o translations':>17}")
+    for name, build in (
+        ('dicts', lambda: json.loads(payload)),
+        ('models', lambda: [Card.from_dict(card) for card in json.loads(payload)]),
+    ):
+        size = retained(build)
+        print(f"{name:>8} {size / CARD_COUNT:>8.0f}B {(size - translations) / CARD_COUNT:>15.0f}B")
+
+if __name__ == '__main__':
+    main()
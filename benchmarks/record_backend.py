@@ -0,0 +1,65 @@
+"""Чтение одного пользователя: общий user_data.json против файла записей с индексом
+
+Старое хранилище держало всех пользователей в одном JSON-файле, и чтобы
+получить одного пользователя, приходилось разбирать весь файл. Бэкенд
+records читает одну запись по смещению из индекса.
+
+Запуск из корня репозитория: python -m benchmarks.record_backend
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+from benchmarks.common import best_time, make_user
+from utils.backends.record_backend import RecordBackend
+from utils.models import to_json
+
+USER_COUNTS = (100, 1_000)
+CARDS_PER_USER = 100
+
+def main():
+    print(f"{'users':>6} {'json size':>10} {'json.load':>11} {'records':>11} {'open':>11} {'rebuild':>11}")
+    for user_count in USER_COUNTS:
+        users = {str(user_id): make_user(CARDS_PER_USER, seed=user_id) for user_id in range(user_count)}
+        with tempfile.TemporaryDirectory() as directory:
+            # Прежний формат: все пользователи в одном файле с отступами
+            json_path = os.path.join(directory, 'user_data.json')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(users, f, ensure_ascii=False, indent=4, default=to_json)
+
+            records_path = os.path.join(directory, 'user_data.records')
+            index_path = os.path.join(directory, 'user_data.idx')
+            backend = RecordBackend(records_path, index_path)
+            for user_id, user in users.items():
+                backend.save_user(user_id, user)
+
+            picks = random.Random(1).choices(list(users), k=1000)
+            picked = iter(picks * 3)
+
+            def load_from_json():
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    return json.load(f).get(next(picked))
+
+            full_load = best_time(load_from_json, 1)
+            picked = iter(picks * 3)
+            record_load = best_time(lambda: backend.load_user(next(picked)), 1000)
+            backend.close()
+
+            # Открытие с готовым индексом и перестройка индекса сканированием (индекс потерян)
+            open_time = best_time(lambda: RecordBackend(records_path, index_path).close(), 1)
+
+            def rebuild():
+                os.remove(index_path)
+                with contextlib.redirect_stdout(io.StringIO()):  # сообщение о перестройке
+                    RecordBackend(records_path, index_path).close()
+
+            rebuild_time = best_time(rebuild, 1)
+            size = os.path.getsize(json_path) / 2**20
+        print(f"{user_count:>6} {size:>8.1f}MB {full_load / 1000:>9.1f}ms {record_load / 1000:>9.2f}ms "
+              f"{open_time / 1000:>9.2f}ms {rebuild_time / 1000:>9.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Выбор карточки: полный проход с calculate_priority, DueIndex и ScoreColumns
+
+Запуск из корня репозитория: python -m benchmarks.scoring
+"""
+
+import random
+import time
+from benchmarks.common import best_time, make_cards
+from utils.data_manager import calculate_priority
+from utils.due_index import DueIndex
+from utils.models import Card
+from utils.scoring import ScoreColumns
+
+SIZES = (1_000, 10_000, 100_000)
+
+def answered(card: Card) -> Card:
+    stats = dict(card['statistics'])
+    stats['total_attempts'] += 1
+    stats['last_shown'] = time.time()
+    return Card(id=card['id'], translations=card['translations'], statistics=stats)
+
+def main():
+    print(f"{'cards':>8} {'engine':>12} {'select':>11} {'answer':>11} {'remove':>11}")
+    for size in SIZES:
+        cards = make_cards(size)
+        number = max(1, 100_000 // size)
+        last_id = cards[0]['id']
+        reference = best_time(lambda: max(cards, key=lambda card: calculate_priority(card, last_id)), number)
+        print(f"{size:>8} {'reference':>12} {reference:>9.0f}us {'-':>11} {'-':>11}")
+        for name, engine in (('DueIndex', DueIndex), ('ScoreColumns', ScoreColumns)):
+            index = engine(cards)
+            select = best_time(lambda: index.select(last_id), number)
+            # Ответ: обновление статистики и проверка, не устарела ли очередь показа
+            picks = iter(random.Random(1).choices(cards, k=3 * 1000))
+            answer = best_time(lambda: (index.update(answered(next(picks))), index.stable_until()), 1000)
+            removals = min(1000, size // 4)
+            removed = iter(random.Random(2).sample(cards, 3 * removals))
+            remove = best_time(lambda: index.remove(next(removed)['id']), removals)
+            print(f"{size:>8} {name:>12} {select:>9.0f}us {answer:>9.1f}us {remove:>9.1f}us")
+
+if __name__ == '__main__':
+    main()
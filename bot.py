@@ -1,17 +1,27 @@
 """Основной файл бота"""
 
 import os
-import json
-import time
 import asyncio
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, StateFilter
 from dotenv import load_dotenv
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from keyboards.keyboards import get_language_keyboard, get_main_menu_keyboard, get_settings_keyboard, get_cards_keyboard, get_card_view_keyboard, get_add_card_keyboard
-from utils.data_manager import load_user_data, save_user_data, create_user, calculate_priority, select_next_card
+from keyboards.keyboards import get_language_keyboard, get_main_menu_keyboard, get_settings_keyboard, get_cards_keyboard, get_card_view_keyboard, get_add_card_keyboard, get_daily_plan_done_keyboard
+from utils.data_manager import run_journal_compactor, run_write_behind
+from utils import metrics
+from utils.repository import UserRepository
+from utils.callback_data import pack
+from utils.callback_router import CallbackRouter
+from utils.request_scheduler import OutgoingScheduler
+from utils.user_locks import UserLockMap, UserLockMiddleware
 from locales.translations import TRANSLATIONS, GPT_PROMPTS
 
 def format_stats_message(stats, is_correct):
@@ -27,18 +37,6 @@ def format_stats_message(stats, is_correct):
     result = "✅ +1" if is_correct else "❌ -1"
     return f"{result} | {stars} ({correct_percent:.0f}%) | {stats['correct_streak']}/15"
 
-def create_statistics():
-    """Создает начальную структуру статистики для карточки"""
-    return {
-        'total_attempts': 0,
-        'correct_answers': 0,
-        'wrong_answers': 0,
-        'last_shown': None,
-        'last_result': None,
-        'correct_streak': 0,
-        'wrong_streak': 0
-    }
-
 class CardStates(StatesGroup):
     waiting_for_translation = State()
     adding_card = State()
@@ -46,13 +44,41 @@ class CardStates(StatesGroup):
     waiting_for_gpt = State()
     learning = State()  # Новое состояние для режима обучения
 
-# Загружаем токен из .env
+# Загружаем токен и настройки запуска из .env
 load_dotenv()
-bot = Bot(token=os.getenv('BOT_TOKEN'))
-dp = Dispatcher()
 
-# Загружаем данные пользователей
-user_data = load_user_data()
+# Режим получения обновлений: 'polling' (по умолчанию) или 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+# Вебхук: публичный адрес бота, путь, секрет и адрес, на котором слушает встроенный сервер
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or None
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+# Свой сервер Bot API (например, локальный или заглушка для тестов) вместо api.telegram.org
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=os.getenv('BOT_TOKEN'), session=session)
+# Все запросы к Bot API проходят через планировщик с лимитами частоты и ожиданием после 429
+outgoing = OutgoingScheduler()
+bot.session.middleware(outgoing)
+
+# Репозиторий пользователей передается в обработчики через параметр repo
+repo = UserRepository()
+dp = Dispatcher(repo=repo)
+# Обновления одного пользователя обрабатываются по очереди, чтобы чтение-изменение-запись не перемешивались
+user_locks = UserLockMap()
+dp.update.outer_middleware(UserLockMiddleware(user_locks))
+
+# Все callback-запросы разбираются один раз и направляются по таблице действий
+callbacks = CallbackRouter()
+
+@dp.callback_query()
+async def route_callback(callback: types.CallbackQuery, state: FSMContext, **data):
+    """Передает callback-запрос обработчику его действия"""
+    if not await callbacks.dispatch(callback, state, **data):
+        raise SkipHandler()
 
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
@@ -63,11 +89,11 @@ async def cmd_start(message: types.Message):
         reply_markup=get_language_keyboard()
     )
 
-@dp.callback_query(lambda c: c.data == "back_to_menu")
-async def back_to_menu(callback: types.CallbackQuery):
+@callbacks.route('back_to_menu')
+async def back_to_menu(callback: types.CallbackQuery, repo: UserRepository):
     """Обработчик возврата в главное меню"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Возвращаемся в главное меню без проверки языков
     await callback.message.edit_text(
@@ -76,38 +102,29 @@ async def back_to_menu(callback: types.CallbackQuery):
     )
     await callback.answer()
 
-@dp.callback_query(lambda c: c.data == "change_language")
-async def change_language(callback: types.CallbackQuery):
+@callbacks.route('change_language')
+async def change_language(callback: types.CallbackQuery, repo: UserRepository):
     """Обработчик кнопки смены языка"""
     user_id = str(callback.from_user.id)
-    fresh_user_data = load_user_data()  # Загружаем свежие данные
-    if user_id not in fresh_user_data:
+    if repo.get(user_id) is None:
         return
     
-    # Обновляем глобальные данные
-    global user_data
-    user_data = fresh_user_data
-    
     await callback.message.edit_text(
         TRANSLATIONS['ru']['welcome'],
         reply_markup=get_language_keyboard()
     )
     await callback.answer()
 
-@dp.callback_query(lambda c: c.data == "settings")
-async def show_settings(callback: types.CallbackQuery):
+@callbacks.route('settings')
+async def show_settings(callback: types.CallbackQuery, repo: UserRepository):
     """Показывает меню настроек"""
     user_id = str(callback.from_user.id)
-    fresh_user_data = load_user_data()  # Загружаем свежие данные
-    if user_id not in fresh_user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    # Обновляем глобальные данные
-    global user_data
-    user_data = fresh_user_data
-    
-    language = user_data[user_id]['interface_lang']
-    settings = user_data[user_id].get('settings', {})
+    language = user['interface_lang']
+    settings = user.get('settings', {})
     
     # Инициализируем списки языков, если их нет
     if 'front_languages' not in settings:
@@ -115,8 +132,8 @@ async def show_settings(callback: types.CallbackQuery):
     if 'back_languages' not in settings:
         settings['back_languages'] = []
     
-    user_data[user_id]['settings'] = settings
-    save_user_data(user_data)
+    user['settings'] = settings
+    repo.save(user_id, user)
     
     await callback.message.edit_text(
         TRANSLATIONS[language]['settings_menu'],
@@ -128,32 +145,32 @@ async def show_settings(callback: types.CallbackQuery):
     )
     await callback.answer()
 
-@dp.callback_query(lambda c: c.data.startswith('lang_'))
-async def language_choice(callback: types.CallbackQuery):
+@callbacks.route('lang', language=str)  # Код языка: ru, en, es, ro
+async def language_choice(callback: types.CallbackQuery, repo: UserRepository, language: str):
     user_id = str(callback.from_user.id)
-    language = callback.data[5:]  # Получаем код языка (ru, en, es, ro)
     
     # Создаем или обновляем данные пользователя
-    if user_id not in user_data:
-        user_data[user_id] = create_user(user_id, language)
+    user = repo.get(user_id)
+    if user is None:
+        repo.create(user_id, language)
     else:
-        user_data[user_id]['interface_lang'] = language
+        user['interface_lang'] = language
         # Проверяем наличие новых полей в настройках
-        if 'settings' not in user_data[user_id]:
-            user_data[user_id]['settings'] = {
+        if 'settings' not in user:
+            user['settings'] = {
                 'daily_cards_limit': 20,
                 'notification_enabled': True,
                 'front_languages': [],
                 'back_languages': []
             }
-        elif 'front_languages' not in user_data[user_id]['settings']:
-            user_data[user_id]['settings'].update({
+        elif 'front_languages' not in user['settings']:
+            user['settings'].update({
                 'front_languages': [],
                 'back_languages': []
             })
-    
-    # Сохраняем данные
-    save_user_data(user_data)
+        
+        # Сохраняем данные
+        repo.save(user_id, user)
     
     # Редактируем текущее сообщение, заменяя его на главное меню
     await callback.message.edit_text(
@@ -164,15 +181,17 @@ async def language_choice(callback: types.CallbackQuery):
     # Отвечаем на callback
     await callback.answer(TRANSLATIONS[language].get('language_selected', 'Язык выбран!'))
 
-@dp.callback_query(lambda c: len(c.data.split('_')) == 2 and c.data.split('_')[0] in ['front', 'back'])
-async def process_language_selection(callback: types.CallbackQuery):
+@callbacks.route('front', lang_code=str)
+@callbacks.route('back', lang_code=str)
+async def process_language_selection(callback: types.CallbackQuery, repo: UserRepository, action: str, lang_code: str):
     """Обработчик выбора языков для карточек"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
-    settings = user_data[user_id]['settings']
+    user = repo.get(user_id)
+    language = user['interface_lang']
+    settings = user['settings']
     
-    # Определяем, для какой стороны выбран язык
-    side, lang_code = callback.data.split('_')
+    # Действие — сторона карточки, для которой выбран язык
+    side = action
     target_list = f"{side}_languages"
     other_list = 'back_languages' if side == 'front' else 'front_languages'
     
@@ -185,7 +204,7 @@ async def process_language_selection(callback: types.CallbackQuery):
             settings[other_list].remove(lang_code)
         settings[target_list].append(lang_code)
     
-    save_user_data(user_data)
+    repo.save(user_id, user)
     
     # Обновляем клавиатуру
     await callback.message.edit_reply_markup(
@@ -198,28 +217,24 @@ async def process_language_selection(callback: types.CallbackQuery):
     await callback.answer()
 
 # Обработчик остальных кнопок (заглушка)
-@dp.callback_query(lambda c: c.data == "notifications")
-async def process_callback(callback: types.CallbackQuery):
+@callbacks.route('notifications')
+async def process_callback(callback: types.CallbackQuery, repo: UserRepository):
     """Временный обработчик для кнопки уведомлений"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Пока просто показываем уведомление
     await callback.answer(f"🚧 {TRANSLATIONS[language]['notifications_in_progress']}")
 
-@dp.callback_query(lambda c: c.data == "my_cards")
-async def process_my_cards_button(callback: types.CallbackQuery):
+@callbacks.route('my_cards')
+async def process_my_cards_button(callback: types.CallbackQuery, repo: UserRepository):
     user_id = str(callback.from_user.id)
-    fresh_user_data = load_user_data()  # Загружаем свежие данные
-    if user_id not in fresh_user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    # Обновляем глобальные данные
-    global user_data
-    user_data = fresh_user_data
-    
-    language = user_data[user_id]['interface_lang']
-    cards = user_data[user_id]['cards']
+    language = user['interface_lang']
+    cards = user['cards']
     
     keyboard, header = get_cards_keyboard(language, cards)
     await callback.message.edit_text(
@@ -227,17 +242,16 @@ async def process_my_cards_button(callback: types.CallbackQuery):
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data.startswith('page_'))
-async def change_cards_page(callback: types.CallbackQuery):
+@callbacks.route('page', page=int)
+async def change_cards_page(callback: types.CallbackQuery, repo: UserRepository, page: int):
     user_id = str(callback.from_user.id)
-    user_data = load_user_data()
+    user = repo.get(user_id)
     
-    if user_id not in user_data:
+    if user is None:
         return
         
-    language = user_data[user_id]['interface_lang']
-    cards = user_data[user_id]['cards']
-    page = int(callback.data.split('_')[1])
+    language = user['interface_lang']
+    cards = user['cards']
     total_pages = (len(cards) + 9) // 10  # 10 карточек на странице
     
     # Если всего одна страница
@@ -263,19 +277,15 @@ async def change_cards_page(callback: types.CallbackQuery):
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data == "add_card")
-async def add_card(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('add_card')
+async def add_card(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Начинает процесс добавления новой карточки"""
     user_id = str(callback.from_user.id)
-    fresh_user_data = load_user_data()  # Загружаем свежие данные
-    if user_id not in fresh_user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    # Обновляем глобальные данные
-    global user_data
-    user_data = fresh_user_data
-    
-    language = user_data[user_id]['interface_lang']
+    language = user['interface_lang']
     
     # Инициализируем пустой словарь для переводов
     await state.set_state(CardStates.adding_card)
@@ -294,17 +304,11 @@ async def add_card(callback: types.CallbackQuery, state: FSMContext):
         reply_markup=get_add_card_keyboard(language)
     )
 
-@dp.callback_query(lambda c: c.data.startswith('add_translation_'), CardStates.adding_card)
-async def start_translation_input(callback: types.CallbackQuery, state: FSMContext):
-    """Начинает процесс ввода перевода для выбранного языка"""
+@callbacks.route('add_translation', CardStates.adding_card, target_lang=str)
+async def start_translation_input(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository, target_lang: str):
+    """Начинает процесс ввода перевода для выбранного языка (add_translation_gpt обрабатывает show_gpt_prompt)"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
-    target_lang = callback.data.split('_')[2]
-    
-    # Если это GPT, показываем промт
-    if target_lang == 'gpt':
-        await show_gpt_prompt(callback, state)
-        return
+    language = repo.get(user_id)['interface_lang']
     
     # Сохраняем целевой язык и переходим к вводу перевода
     await state.update_data(current_lang=target_lang)
@@ -315,7 +319,7 @@ async def start_translation_input(callback: types.CallbackQuery, state: FSMConte
     keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['back_button'],
-            callback_data="back_to_add_card"
+            callback_data=pack('back_to_add_card')
         )
     ]])
     await callback.message.edit_text(
@@ -324,10 +328,11 @@ async def start_translation_input(callback: types.CallbackQuery, state: FSMConte
     )
 
 @dp.message(CardStates.adding_translation)
-async def process_translation_input(message: types.Message, state: FSMContext):
+async def process_translation_input(message: types.Message, state: FSMContext, repo: UserRepository):
     """Обрабатывает ввод перевода"""
     user_id = str(message.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    user = repo.get(user_id)
+    language = user['interface_lang']
     
     # Получаем текущие данные
     data = await state.get_data()
@@ -342,20 +347,18 @@ async def process_translation_input(message: types.Message, state: FSMContext):
     
     # Формируем текст с текущими переводами и проверяем на дубликаты
     text = f"{TRANSLATIONS[language]['add_new_card']}\n\n"
+    duplicates = repo.duplicate_languages(user_id, translations)
+    similar = repo.similar_translations(user_id, translations)
     for lang in ['ru', 'en', 'es', 'ro']:
         flag = {'ru': '🇷🇺', 'en': '🇬🇧', 'es': '🇪🇸', 'ro': '🇷🇴'}[lang]
         translation = translations.get(lang, '-')
         
         # Если есть перевод, проверяем на дубликаты
         if translation != '-':
-            has_duplicate = False
-            for card in user_data[user_id]['cards']:
-                if card['translations'].get(lang, '').lower() == translation.lower():
-                    has_duplicate = True
-                    break
-            
-            if has_duplicate:
+            if lang in duplicates:
                 text += f"{flag} {translation} - ⚠️ {TRANSLATIONS[language]['duplicate_translation']}\n"
+            elif lang in similar:
+                text += f"{flag} {translation} - ⚠️ {TRANSLATIONS[language]['similar_translation'].format(similar[lang])}\n"
             else:
                 text += f"{flag} {translation}\n"
         else:
@@ -369,19 +372,15 @@ async def process_translation_input(message: types.Message, state: FSMContext):
         reply_markup=get_add_card_keyboard(language, translations)
     )
 
-@dp.callback_query(lambda c: c.data == "save_card", CardStates.adding_card)
-async def save_new_card(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('save_card', CardStates.adding_card)
+async def save_new_card(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Сохраняет новую карточку"""
     user_id = str(callback.from_user.id)
-    fresh_user_data = load_user_data()  # Загружаем свежие данные
-    if user_id not in fresh_user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    # Обновляем глобальные данные
-    global user_data
-    user_data = fresh_user_data
-    
-    language = user_data[user_id]['interface_lang']
+    language = user['interface_lang']
     
     # Получаем переводы
     data = await state.get_data()
@@ -392,44 +391,29 @@ async def save_new_card(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer(TRANSLATIONS[language]['not_enough_translations'])
         return
     
-    # Создаем новую карточку
-    if 'cards' not in user_data[user_id]:
-        user_data[user_id]['cards'] = []
-    if 'last_card_id' not in user_data[user_id]:
-        user_data[user_id]['last_card_id'] = 0
-    
-    new_card_id = user_data[user_id]['last_card_id'] + 1
-    user_data[user_id]['cards'].append({
-        'id': new_card_id,
-        'translations': translations,
-        'statistics': create_statistics()
-    })
-    user_data[user_id]['last_card_id'] = new_card_id
-    
-    # Сохраняем изменения
-    save_user_data(user_data)
+    # Создаем новую карточку и сохраняем изменения
+    repo.add_card(user_id, translations)
     
     # Очищаем состояние
     await state.clear()
     
     # Показываем уведомление и возвращаемся к списку карточек
     await callback.answer(TRANSLATIONS[language]['card_added'])
-    await show_cards(callback.message, user_id, user_data)
+    await show_cards(callback.message, user)
 
-@dp.callback_query(lambda c: c.data.startswith('card_'))
-async def show_card(callback: types.CallbackQuery):
+@callbacks.route('card', card_id=int)
+async def show_card(callback: types.CallbackQuery, repo: UserRepository, card_id: int):
     """Показывает карточку для редактирования."""
     user_id = str(callback.from_user.id)
-    card_id = int(callback.data.split('_')[1])
     
-    user_data = load_user_data()
-    if user_id not in user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    language = user_data[user_id]['interface_lang']
+    language = user['interface_lang']
     
     # Находим карточку по ID
-    card = next((card for card in user_data[user_id]['cards'] if card['id'] == card_id), None)
+    card = repo.find_card(user_id, card_id)
     if not card:
         return
     
@@ -450,19 +434,17 @@ async def show_card(callback: types.CallbackQuery):
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data.startswith('edit_') and len(c.data.split('_')) == 3)
-async def edit_card_translation(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('edit', card_id=int, lang=str)
+async def edit_card_translation(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository, card_id: int, lang: str):
     """Запускает процесс редактирования перевода."""
     user_id = str(callback.from_user.id)
-    _, card_id, lang = callback.data.split('_')
-    card_id = int(card_id)
     
-    user_data = load_user_data()
-    if user_id not in user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
     # Находим карточку
-    card = next((card for card in user_data[user_id]['cards'] if card['id'] == card_id), None)
+    card = repo.find_card(user_id, card_id)
     if not card:
         return
         
@@ -471,13 +453,13 @@ async def edit_card_translation(callback: types.CallbackQuery, state: FSMContext
     
     # Получаем текущий перевод
     current_translation = card['translations'].get(lang, '-')
-    language = user_data[user_id]['interface_lang']
+    language = user['interface_lang']
     
     # Создаем клавиатуру с кнопкой "Назад"
     keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['back_button'],
-            callback_data=f"back_to_card_{card_id}"
+            callback_data=pack('back_to_card', card_id)
         )
     ]])
     
@@ -494,10 +476,9 @@ async def edit_card_translation(callback: types.CallbackQuery, state: FSMContext
     await state.set_state('waiting_for_translation')
 
 @dp.message(lambda message: True, StateFilter('waiting_for_translation'))
-async def process_new_translation(message: types.Message, state: FSMContext):
+async def process_new_translation(message: types.Message, state: FSMContext, repo: UserRepository):
     """Обрабатывает ввод нового перевода."""
     user_id = str(message.from_user.id)
-    user_data = load_user_data()
     
     # Получаем сохраненные данные
     data = await state.get_data()
@@ -505,13 +486,12 @@ async def process_new_translation(message: types.Message, state: FSMContext):
     edit_lang = data['edit_lang']
     
     # Находим и обновляем карточку
-    card = next((card for card in user_data[user_id]['cards'] if card['id'] == card_id), None)
-    if card:
-        card['translations'][edit_lang] = message.text.strip()
-        save_user_data(user_data)
+    card = repo.set_translation(user_id, card_id, edit_lang, message.text.strip())
     
     # Очищаем состояние
     await state.clear()
+    if not card:
+        return
     
     # Показываем обновленную карточку
     translations_text = '\n'.join([
@@ -521,30 +501,29 @@ async def process_new_translation(message: types.Message, state: FSMContext):
         f"🇷🇴 {card['translations'].get('ro', '-')}"
     ])
     
-    keyboard = get_card_view_keyboard(user_data[user_id]['interface_lang'], card_id)
+    keyboard = get_card_view_keyboard(repo.get(user_id)['interface_lang'], card_id)
     
     await message.answer(
         text=translations_text,
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data.startswith('delete_') and len(c.data.split('_')) == 2)
-async def confirm_delete_card(callback: types.CallbackQuery):
+@callbacks.route('delete', card_id=int)
+async def confirm_delete_card(callback: types.CallbackQuery, repo: UserRepository, card_id: int):
     """Запрашивает подтверждение удаления карточки."""
     user_id = str(callback.from_user.id)
-    card_id = int(callback.data.split('_')[1])
     
-    user_data = load_user_data()
-    if user_id not in user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
     # Находим карточку
-    card = next((card for card in user_data[user_id]['cards'] if card['id'] == card_id), None)
+    card = repo.find_card(user_id, card_id)
     if not card:
         return
     
     # Формируем текст подтверждения
-    text = TRANSLATIONS[user_data[user_id]['interface_lang']]['confirm_delete'] + '\n\n'
+    text = TRANSLATIONS[user['interface_lang']]['confirm_delete'] + '\n\n'
     text += '\n'.join([
         f"🇷🇺 {card['translations'].get('ru', '-')}",
         f"🇬🇧 {card['translations'].get('en', '-')}",
@@ -555,12 +534,12 @@ async def confirm_delete_card(callback: types.CallbackQuery):
     # Создаем клавиатуру для подтверждения
     keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
         types.InlineKeyboardButton(
-            text=TRANSLATIONS[user_data[user_id]['interface_lang']]['yes_button'],
-            callback_data=f"confirm_delete_{card_id}"
+            text=TRANSLATIONS[user['interface_lang']]['yes_button'],
+            callback_data=pack('confirm_delete', card_id)
         ),
         types.InlineKeyboardButton(
-            text=TRANSLATIONS[user_data[user_id]['interface_lang']]['no_button'],
-            callback_data=f"card_{card_id}"
+            text=TRANSLATIONS[user['interface_lang']]['no_button'],
+            callback_data=pack('card', card_id)
         )
     ]])
     
@@ -569,60 +548,49 @@ async def confirm_delete_card(callback: types.CallbackQuery):
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data.startswith('confirm_delete_'))
-async def delete_card(callback: types.CallbackQuery):
+@callbacks.route('confirm_delete', card_id=int)
+async def delete_card(callback: types.CallbackQuery, repo: UserRepository, card_id: int):
     """Удаляет карточку."""
     user_id = str(callback.from_user.id)
-    card_id = int(callback.data.split('_')[2])
     
-    user_data = load_user_data()
-    if user_id not in user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    language = user_data[user_id]['interface_lang']
+    language = user['interface_lang']
     
     # Удаляем карточку
-    user_data[user_id]['cards'] = [
-        card for card in user_data[user_id]['cards'] 
-        if card['id'] != card_id
-    ]
-    
-    # Если это была последняя карточка, сбрасываем last_card_id
-    if not user_data[user_id]['cards']:
-        user_data[user_id]['last_card_id'] = 0
-        
-    save_user_data(user_data)
+    repo.delete_card(user_id, card_id)
     
     # Показываем уведомление об успешном удалении
     await callback.answer(TRANSLATIONS[language]['card_deleted'])
     
     try:
         # Показываем обновленный список карточек
-        keyboard, header = get_cards_keyboard(language, user_data[user_id]['cards'])
+        keyboard, header = get_cards_keyboard(language, user['cards'])
         await callback.message.edit_text(
             text=header,
             reply_markup=keyboard
         )
     except Exception as e:
         # Если произошла ошибка при обновлении сообщения, отправляем новое
-        keyboard, header = get_cards_keyboard(language, user_data[user_id]['cards'])
+        keyboard, header = get_cards_keyboard(language, user['cards'])
         await callback.message.answer(
             text=header,
             reply_markup=keyboard
         )
 
-@dp.callback_query(lambda c: c.data == "back_to_cards")
-async def back_to_cards_list(callback: types.CallbackQuery):
+@callbacks.route('back_to_cards')
+async def back_to_cards_list(callback: types.CallbackQuery, repo: UserRepository):
     """Возвращает к списку карточек."""
     user_id = str(callback.from_user.id)
-    user_data = load_user_data()
     
-    await show_cards(callback.message, user_id, user_data)
+    await show_cards(callback.message, repo.get(user_id))
 
-async def show_cards(message: types.Message, user_id: str, user_data: dict):
+async def show_cards(message: types.Message, user: dict):
     """Показывает список карточек пользователя."""
-    language = user_data[user_id]['interface_lang']
-    cards = user_data[user_id]['cards']
+    language = user['interface_lang']
+    cards = user['cards']
     
     if not cards:
         await message.edit_text(
@@ -637,11 +605,11 @@ async def show_cards(message: types.Message, user_id: str, user_data: dict):
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data == "back_to_add_card", CardStates.adding_translation)
-async def back_to_add_card_from_translation(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('back_to_add_card', CardStates.adding_translation)
+async def back_to_add_card_from_translation(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Возвращает к интерфейсу добавления карточки из режима ввода перевода"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Получаем текущие переводы
     data = await state.get_data()
@@ -666,15 +634,14 @@ async def back_to_add_card_from_translation(callback: types.CallbackQuery, state
         reply_markup=get_add_card_keyboard(language, translations)
     )
 
-@dp.callback_query(lambda c: c.data.startswith('back_to_card_'), StateFilter('waiting_for_translation'))
-async def back_to_card_from_edit(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('back_to_card', 'waiting_for_translation', card_id=int)
+async def back_to_card_from_edit(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository, card_id: int):
     """Возвращает к просмотру карточки из режима редактирования"""
     user_id = str(callback.from_user.id)
-    card_id = int(callback.data.split('_')[3])
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Находим карточку
-    card = next((card for card in user_data[user_id]['cards'] if card['id'] == card_id), None)
+    card = repo.find_card(user_id, card_id)
     if not card:
         return
     
@@ -696,11 +663,11 @@ async def back_to_card_from_edit(callback: types.CallbackQuery, state: FSMContex
         reply_markup=get_card_view_keyboard(language, card_id)
     )
 
-@dp.callback_query(lambda c: c.data == "add_translation_gpt")
-async def show_gpt_prompt(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('add_translation_gpt')
+async def show_gpt_prompt(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Показывает промт для GPT"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Получаем промт на выбранном языке
     prompt = GPT_PROMPTS[language]
@@ -718,7 +685,7 @@ async def show_gpt_prompt(callback: types.CallbackQuery, state: FSMContext):
     keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['back_button'],
-            callback_data="back_to_add_card"
+            callback_data=pack('back_to_add_card')
         )
     ]])
     
@@ -733,10 +700,11 @@ async def show_gpt_prompt(callback: types.CallbackQuery, state: FSMContext):
     await state.set_state(CardStates.waiting_for_gpt)
 
 @dp.message(CardStates.waiting_for_gpt)
-async def process_gpt_response(message: types.Message, state: FSMContext):
+async def process_gpt_response(message: types.Message, state: FSMContext, repo: UserRepository):
     """Обрабатывает ответ от GPT"""
     user_id = str(message.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    user = repo.get(user_id)
+    language = user['interface_lang']
     
     # Парсим ответ
     translations_list = []
@@ -761,22 +729,12 @@ async def process_gpt_response(message: types.Message, state: FSMContext):
         if translations:
             translations_list.append(translations)
     
-    # Разделяем на новые и существующие карточки
-    new_cards = []
-    duplicate_cards = []
-    
-    for trans in translations_list:
-        is_duplicate = False
-        for card in user_data[user_id]['cards']:
-            if all(trans.get(lang, '').lower() == card['translations'].get(lang, '').lower() for lang in ['ru', 'en', 'es', 'ro']):
-                duplicate_cards.append(trans)
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            new_cards.append(trans)
+    # Разделяем на новые, существующие и похожие на существующие карточки
+    # (повторы внутри ответа тоже считаются дубликатами)
+    new_cards, duplicate_cards, similar_cards = repo.split_duplicate_cards(user_id, translations_list)
     
-    # Сохраняем в состояние только новые карточки
-    await state.update_data(gpt_translations=new_cards)
+    # Сохраняем в состояние новые карточки и отдельно похожие (их можно добавить по кнопке)
+    await state.update_data(gpt_translations=new_cards, gpt_similar_translations=similar_cards)
     
     # Формируем текст предпросмотра
     text = f"{TRANSLATIONS[language]['gpt_cards_found'].format(len(new_cards))}\n\n"
@@ -801,63 +759,69 @@ async def process_gpt_response(message: types.Message, state: FSMContext):
                 f"🇷🇴 {trans.get('ro', '-')}\n"
             )
     
+    # Похожие карточки (другая диакритика, пунктуация, артикль или опечатка) добавляются только по отдельной кнопке
+    if similar_cards:
+        text += f"\n{TRANSLATIONS[language]['similar_cards_warning']}:\n\n"
+        for trans in similar_cards:
+            text += (
+                f"🇷🇺 {trans.get('ru', '-')} | "
+                f"🇬🇧 {trans.get('en', '-')} | "
+                f"🇪🇸 {trans.get('es', '-')} | "
+                f"🇷🇴 {trans.get('ro', '-')}\n"
+            )
+    
     # Создаем клавиатуру с кнопками "Сохранить" и "Назад"
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
+    buttons = [[
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['save_button'],
-            callback_data="save_gpt_cards"
+            callback_data=pack('save_gpt_cards')
         ),
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['back_button'],
-            callback_data="back_to_add_card"
+            callback_data=pack('back_to_add_card')
         )
-    ]])
+    ]]
+    if similar_cards:
+        buttons.append([types.InlineKeyboardButton(
+            text=TRANSLATIONS[language]['save_with_similar_button'],
+            callback_data=pack('save_all_gpt_cards')
+        )])
+    keyboard = types.InlineKeyboardMarkup(inline_keyboard=buttons)
     
     await message.answer(
         text=text,
         reply_markup=keyboard
     )
 
-@dp.callback_query(lambda c: c.data == "save_gpt_cards")
-async def save_gpt_cards(callback: types.CallbackQuery, state: FSMContext):
-    """Сохраняет карточки, сгенерированные через GPT"""
+@callbacks.route('save_gpt_cards')
+@callbacks.route('save_all_gpt_cards')
+async def save_gpt_cards(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository, action: str):
+    """Сохраняет карточки, сгенерированные через GPT (save_all_gpt_cards — вместе с похожими на существующие)"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    user = repo.get(user_id)
+    language = user['interface_lang']
     
     # Получаем переводы из состояния
     data = await state.get_data()
     translations_list = data.get('gpt_translations', [])
+    if action == 'save_all_gpt_cards':
+        translations_list = translations_list + data.get('gpt_similar_translations', [])
     
-    # Добавляем карточки
-    if 'cards' not in user_data[user_id]:
-        user_data[user_id]['cards'] = []
-    if 'last_card_id' not in user_data[user_id]:
-        user_data[user_id]['last_card_id'] = 0
-    
-    for translations in translations_list:
-        new_card_id = user_data[user_id]['last_card_id'] + 1
-        user_data[user_id]['cards'].append({
-            'id': new_card_id,
-            'translations': translations,
-            'statistics': create_statistics()
-        })
-        user_data[user_id]['last_card_id'] = new_card_id
-    
-    # Сохраняем изменения
-    save_user_data(user_data)
+    # Добавляем карточки и сохраняем изменения
+    repo.add_cards(user_id, translations_list)
     
     # Очищаем состояние
     await state.clear()
     
     # Показываем уведомление и возвращаемся к списку карточек
     await callback.answer(TRANSLATIONS[language]['card_added'])
-    await show_cards(callback.message, user_id, user_data)
+    await show_cards(callback.message, user)
 
-@dp.callback_query(lambda c: c.data == "back_to_add_card", CardStates.waiting_for_gpt)
-async def back_to_add_card_from_gpt(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('back_to_add_card', CardStates.waiting_for_gpt)
+async def back_to_add_card_from_gpt(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Возвращает к интерфейсу добавления карточки из режима GPT"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Получаем текущие переводы
     data = await state.get_data()
@@ -882,20 +846,16 @@ async def back_to_add_card_from_gpt(callback: types.CallbackQuery, state: FSMCon
         reply_markup=get_add_card_keyboard(language, translations)
     )
 
-@dp.callback_query(lambda c: c.data == "learn")
-async def start_learning(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('learn')
+async def start_learning(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Начинает процесс обучения"""
     user_id = str(callback.from_user.id)
-    fresh_user_data = load_user_data()  # Загружаем свежие данные
-    if user_id not in fresh_user_data:
+    user = repo.get(user_id)
+    if user is None:
         return
     
-    # Обновляем глобальные данные
-    global user_data
-    user_data = fresh_user_data
-    
-    language = user_data[user_id]['interface_lang']
-    settings = user_data[user_id].get('settings', {})
+    language = user['interface_lang']
+    settings = user.get('settings', {})
     
     # Проверяем настройки языков
     if not settings.get('front_languages') or not settings.get('back_languages'):
@@ -909,41 +869,43 @@ async def start_learning(callback: types.CallbackQuery, state: FSMContext):
         )
         return
     
-    # Проверяем наличие карточек с выбранными языками
-    valid_cards = []
-    for card in user_data[user_id].get('cards', []):
-        # Проверяем, есть ли хотя бы один перевод для front и back языков
-        has_front = any(card['translations'].get(lang) for lang in settings['front_languages'])
-        has_back = any(card['translations'].get(lang) for lang in settings['back_languages'])
-        if has_front and has_back:
-            valid_cards.append(card)
-    
-    if not valid_cards:
+    # Проверяем наличие карточек с переводами хотя бы на один язык каждой стороны
+    if not repo.has_learning_cards(user_id):
         await callback.answer(TRANSLATIONS[language]['no_cards_for_selected_languages'], show_alert=True)
         return
     
     # Устанавливаем состояние обучения
     await state.set_state(CardStates.learning)
     
+    # План на день уже выполнен: спрашиваем, повторять ли дальше
+    if repo.daily_plan_done(user_id):
+        await show_daily_plan_done(callback.message, language)
+        return
+    
     # Показываем первую карточку
-    await show_learning_card(callback.message, user_id, state)
+    await show_learning_card(callback.message, user_id, state, repo)
+
+@callbacks.route('extra_practice')
+async def start_extra_practice(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
+    """Продолжает обучение сверх выполненного плана на день"""
+    user_id = str(callback.from_user.id)
+    if repo.get(user_id) is None:
+        return
+    repo.start_extra_practice(user_id)
+    await state.set_state(CardStates.learning)
+    await show_learning_card(callback.message, user_id, state, repo)
+
+def learning_render_context(user: dict) -> tuple:
+    """Настройки, от которых зависит отрисовка карточки в режиме обучения"""
+    settings = user['settings']
+    return user['interface_lang'], tuple(settings['front_languages']), tuple(settings['back_languages'])
 
-async def show_learning_card(message: types.Message, user_id: str, state: FSMContext):
-    """Показывает карточку для изучения"""
-    language = user_data[user_id]['interface_lang']
-    settings = user_data[user_id]['settings']
+def render_learning_card(card: dict, user: dict) -> tuple:
+    """Отрисовывает карточку для изучения, возвращает (контекст отрисовки, текст, клавиатура)"""
+    language = user['interface_lang']
+    settings = user['settings']
     flags = {'ru': '🇷🇺', 'en': '🇬🇧', 'es': '🇪🇸', 'ro': '🇷🇴'}
     
-    # Получаем ID текущей карточки из состояния
-    data = await state.get_data()
-    current_card_id = data.get('current_card_id')
-    
-    # Выбираем следующую карточку с помощью нового алгоритма
-    card = select_next_card(user_id, current_card_id, user_data)
-    
-    # Сохраняем ID текущей карточки в состоянии
-    await state.update_data(current_card_id=card['id'])
-    
     # Формируем текст сообщения
     text = f"{TRANSLATIONS[language]['how_to_translate']}\n\n"
     
@@ -961,29 +923,104 @@ async def show_learning_card(message: types.Message, user_id: str, state: FSMCon
     
     # Создаем клавиатуру с переводами кнопок
     keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
-        [types.InlineKeyboardButton(text=TRANSLATIONS[language]['back_to_menu'], callback_data="back_to_menu")],
-        [types.InlineKeyboardButton(text=TRANSLATIONS[language]['wrong'], callback_data="answer_wrong")],
-        [types.InlineKeyboardButton(text=TRANSLATIONS[language]['correct'], callback_data="answer_correct")]
+        [types.InlineKeyboardButton(text=TRANSLATIONS[language]['back_to_menu'], callback_data=pack('back_to_menu'))],
+        [types.InlineKeyboardButton(text=TRANSLATIONS[language]['wrong'], callback_data=pack('answer_wrong'))],
+        [types.InlineKeyboardButton(text=TRANSLATIONS[language]['correct'], callback_data=pack('answer_correct'))]
     ])
-    
+    return learning_render_context(user), text, keyboard
+
+def prefetch_learning_cards(repo: UserRepository, user_id: str):
+    """Заранее выбирает и отрисовывает следующие карточки, пока пользователь думает над текущей"""
+    queue = repo.prefetch_learning_cards(user_id)
+    user = repo.get(user_id)
+    if queue is None or user is None:
+        return
+    context = learning_render_context(user)
+    for entry in queue:
+        if entry['rendered'] is None or entry['rendered'][0] != context:
+            entry['rendered'] = render_learning_card(entry['card'], user)
+
+async def replace_learning_message(message: types.Message, text: str, keyboard: types.InlineKeyboardMarkup) -> int:
+    """Заменяет текст сообщения карточкой; если сообщение изменить нельзя, отправляет новое и удаляет старое.
+    Возвращает число запросов к Bot API"""
     try:
-        # Сначала отправляем новое сообщение
-        new_message = await message.answer(text, reply_markup=keyboard, parse_mode="MarkdownV2")
-        try:
-            # Затем пытаемся удалить старое
-            await message.delete()
-        except Exception:
-            pass  # Игнорируем ошибки при удалении
-        return new_message
-    except Exception as e:
-        # В случае ошибки просто отправляем новое сообщение
-        return await message.answer(text, reply_markup=keyboard, parse_mode="MarkdownV2")
+        await message.edit_text(text, reply_markup=keyboard, parse_mode="MarkdownV2")
+        return 1
+    except TelegramBadRequest as e:
+        if 'message is not modified' in e.message:
+            # Показана та же карточка (например, единственная подходящая)
+            return 1
+        print(f"Could not edit learning card message: {e.message}")
+    
+    await message.answer(text, reply_markup=keyboard, parse_mode="MarkdownV2")
+    try:
+        await message.delete()
+    except TelegramBadRequest as e:
+        # Сообщение уже удалено или слишком старое для удаления
+        print(f"Could not delete learning card message: {e.message}")
+    return 3
 
-@dp.callback_query(lambda c: c.data == "back_to_menu", CardStates.learning)
-async def back_to_menu_from_learning(callback: types.CallbackQuery, state: FSMContext):
+async def show_learning_card(message: types.Message, user_id: str, state: FSMContext, repo: UserRepository, answer=None) -> int:
+    """Показывает карточку для изучения в сообщении message.
+
+    answer — задача ответа на нажатие кнопки, она выполняется одновременно с
+    изменением сообщения. Возвращает число запросов к Bot API.
+    """
+    user = repo.get(user_id)
+    
+    # Получаем ID текущей карточки из состояния
+    data = await state.get_data()
+    current_card_id = data.get('current_card_id')
+    
+    # Следующая карточка обычно уже выбрана и отрисована заранее
+    entry = repo.next_learning_card(user_id, current_card_id)
+    if entry is None:
+        # Подходящих карточек не осталось (карточки удалены или изменены языки изучения)
+        await state.clear()
+        language = user['interface_lang']
+        text = TRANSLATIONS[language]['no_cards_for_selected_languages']
+        return await show_learning_notice(message, text, get_main_menu_keyboard(language), answer)
+    card = entry['card']
+    
+    # Сохраняем ID текущей карточки в состоянии
+    await state.update_data(current_card_id=card['id'])
+    
+    rendered = entry['rendered']
+    if rendered is None or rendered[0] != learning_render_context(user):
+        rendered = render_learning_card(card, user)
+    _, text, keyboard = rendered
+    
+    # Очередь дополняется, пока сообщение отправляется и пользователь думает над карточкой
+    asyncio.get_running_loop().call_soon(prefetch_learning_cards, repo, user_id)
+    
+    # Ответ 429 обрабатывает планировщик запросов
+    if answer is None:
+        return await replace_learning_message(message, text, keyboard)
+    _, calls = await asyncio.gather(answer, replace_learning_message(message, text, keyboard))
+    return calls + 1
+
+async def show_learning_notice(message: types.Message, text: str, keyboard: types.InlineKeyboardMarkup, answer=None) -> int:
+    """Заменяет карточку в сообщении текстом text (одновременно с ответом на нажатие answer).
+    Возвращает число запросов к Bot API"""
+    # edit_text возвращает объект запроса, а не корутину
+    edit = asyncio.ensure_future(message.edit_text(text, reply_markup=keyboard))
+    if answer is None:
+        await edit
+        return 1
+    await asyncio.gather(answer, edit)
+    return 2
+
+async def show_daily_plan_done(message: types.Message, language: str, answer=None) -> int:
+    """Сообщает, что план на день выполнен, и предлагает повторять дальше или вернуться в меню.
+    Возвращает число запросов к Bot API"""
+    text = TRANSLATIONS[language]['daily_plan_done']
+    return await show_learning_notice(message, text, get_daily_plan_done_keyboard(language), answer)
+
+@callbacks.route('back_to_menu', CardStates.learning)
+async def back_to_menu_from_learning(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository):
     """Возвращает пользователя в главное меню из режима обучения"""
     user_id = str(callback.from_user.id)
-    language = user_data[user_id]['interface_lang']
+    language = repo.get(user_id)['interface_lang']
     
     # Очищаем состояние
     await state.clear()
@@ -994,60 +1031,76 @@ async def back_to_menu_from_learning(callback: types.CallbackQuery, state: FSMCo
         reply_markup=get_main_menu_keyboard(language)
     )
 
-@dp.callback_query(lambda c: c.data in ["answer_correct", "answer_wrong"], CardStates.learning)
-async def process_answer(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.route('answer_correct', CardStates.learning)
+@callbacks.route('answer_wrong', CardStates.learning)
+async def process_answer(callback: types.CallbackQuery, state: FSMContext, repo: UserRepository, action: str):
     """Обрабатывает ответ пользователя (верно/неверно)"""
     user_id = str(callback.from_user.id)
-    is_correct = callback.data == "answer_correct"
+    is_correct = action == "answer_correct"
     
     # Получаем ID текущей карточки из состояния
     data = await state.get_data()
     current_card_id = data.get('current_card_id')
     
-    # Находим текущую карточку
-    current_card = next(
-        (card for card in user_data[user_id]['cards'] if card['id'] == current_card_id),
-        None
-    )
+    # Обновляем и сохраняем статистику текущей карточки
+    stats = repo.record_answer(user_id, current_card_id, is_correct)
     
-    if current_card:
-        # Инициализируем статистику, если её нет
-        if 'statistics' not in current_card:
-            current_card['statistics'] = create_statistics()
-        
-        stats = current_card['statistics']
-        
-        # Обновляем статистику
-        stats['total_attempts'] += 1
-        if is_correct:
-            stats['correct_answers'] += 1
-            stats['correct_streak'] += 1
-            stats['wrong_streak'] = 0
-        else:
-            stats['wrong_answers'] += 1
-            stats['wrong_streak'] += 1
-            stats['correct_streak'] = 0
-        
-        stats['last_shown'] = time.time()
-        stats['last_result'] = is_correct
-        
-        # Сохраняем изменения
-        save_user_data(user_data)
-        
-        # Показываем всплывающее сообщение со статистикой
+    answer = None
+    if stats:
+        # Всплывающее сообщение со статистикой
         stats_message = format_stats_message(stats, is_correct)
-        await callback.answer(stats_message, show_alert=False)
+        # Ответ уходит сразу, пока выбирается и отрисовывается следующая карточка
+        # callback.answer возвращает объект запроса, а не корутину
+        answer = asyncio.ensure_future(callback.answer(stats_message, show_alert=False))
     
-    # Показываем следующую карточку
-    await show_learning_card(callback.message, user_id, state)
+    if repo.daily_plan_done(user_id):
+        # План на день выполнен: карточки сверх плана — только по желанию пользователя
+        calls = await show_daily_plan_done(callback.message, repo.get(user_id)['interface_lang'], answer)
+    else:
+        # Показываем следующую карточку в том же сообщении, одновременно с ответом на нажатие
+        calls = await show_learning_card(callback.message, user_id, state, repo, answer)
+    metrics.observe('learning_api_calls_per_review', calls)
+
+async def run_webhook():
+    """Принимает обновления через вебхук на встроенном aiohttp-сервере"""
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL is required in webhook mode")
+    app = web.Application()
+    # Telegram передает секрет в заголовке X-Telegram-Bot-Api-Secret-Token, чужие запросы отклоняются
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        await bot.set_webhook(f"{WEBHOOK_URL}{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET)
+        print(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
 
 async def main():
     """Запуск бота"""
     print("Bot started!")  # Добавляем сообщение о запуске
+    # Фоновые задачи: отложенная запись и сворачивание журнала ответов
+    write_behind = asyncio.create_task(run_write_behind())
+    compactor = asyncio.create_task(run_journal_compactor())
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == 'webhook':
+            await run_webhook()
+        else:
+            # Telegram не отдает обновления через getUpdates, пока установлен вебхук
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     except Exception as e:
         print(f"Error: {e}")  # Добавляем вывод ошибок
+    finally:
+        # Останавливаем по очереди: сначала сбрасываем отложенные изменения, затем сворачиваем журнал
+        for task in (write_behind, compactor):
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
 if __name__ == "__main__":
     try:
@@ -2,6 +2,7 @@
 
 from aiogram import types
 from utils.constants import SUPPORTED_LANGUAGES
+from utils.callback_data import pack
 from locales.translations import TRANSLATIONS
 
 def get_language_keyboard() -> types.InlineKeyboardMarkup:
@@ -12,7 +13,7 @@ def get_language_keyboard() -> types.InlineKeyboardMarkup:
     for lang_code, lang_name in SUPPORTED_LANGUAGES.items():
         row.append(types.InlineKeyboardButton(
             text=lang_name,
-            callback_data=f"lang_{lang_code}"
+            callback_data=pack('lang', lang_code)
         ))
         
         if len(row) == 2:
@@ -29,19 +30,33 @@ def get_main_menu_keyboard(language: str) -> types.InlineKeyboardMarkup:
     keyboard = [
         [types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['learn'],
-            callback_data="learn"
+            callback_data=pack('learn')
         )],
         [types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['my_cards'],
-            callback_data="my_cards"
+            callback_data=pack('my_cards')
         )],
         [types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['settings'],
-            callback_data="settings"
+            callback_data=pack('settings')
         )],
         [types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['language'],
-            callback_data="change_language"
+            callback_data=pack('change_language')
+        )]
+    ]
+    return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_daily_plan_done_keyboard(language: str) -> types.InlineKeyboardMarkup:
+    """Создает клавиатуру после выполнения плана на день"""
+    keyboard = [
+        [types.InlineKeyboardButton(
+            text=TRANSLATIONS[language]['extra_practice'],
+            callback_data=pack('extra_practice')
+        )],
+        [types.InlineKeyboardButton(
+            text=TRANSLATIONS[language]['back_to_menu'],
+            callback_data=pack('back_to_menu')
         )]
     ]
     return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -61,11 +76,11 @@ def get_settings_keyboard(language: str, front_languages: list, back_languages:
         keyboard.append([
             types.InlineKeyboardButton(
                 text=f"{front_status} {flags[lang]}",
-                callback_data=f"front_{lang}"
+                callback_data=pack('front', lang)
             ),
             types.InlineKeyboardButton(
                 text=f"{back_status} {flags[lang]}",
-                callback_data=f"back_{lang}"
+                callback_data=pack('back', lang)
             )
         ])
     
@@ -73,7 +88,7 @@ def get_settings_keyboard(language: str, front_languages: list, back_languages:
     keyboard.append([
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['back_to_menu'],
-            callback_data="back_to_menu"
+            callback_data=pack('back_to_menu')
         )
     ])
     
@@ -81,7 +96,7 @@ def get_settings_keyboard(language: str, front_languages: list, back_languages:
     keyboard.append([
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['notifications'],
-            callback_data="notifications"
+            callback_data=pack('notifications')
         )
     ])
     
@@ -90,7 +105,7 @@ def get_settings_keyboard(language: str, front_languages: list, back_languages:
         keyboard.append([
             types.InlineKeyboardButton(
                 text=TRANSLATIONS[language]['learn'],
-                callback_data="learn"
+                callback_data=pack('learn')
             )
         ])
     
@@ -99,30 +114,30 @@ def get_settings_keyboard(language: str, front_languages: list, back_languages:
 def get_cards_keyboard(language: str, cards: list, page: int = 1, cards_per_page: int = 10) -> tuple[types.InlineKeyboardMarkup, str]:
     """Создает клавиатуру для отображения карточек с пагинацией."""
     keyboard = []
-    total_pages = (len(cards) + cards_per_page - 1) // cards_per_page if cards else 1
+    total_cards = len(cards)
+    start_idx = (page - 1) * cards_per_page
+    cards = cards[start_idx:start_idx + cards_per_page]
+    total_pages = (total_cards + cards_per_page - 1) // cards_per_page if total_cards else 1
     
     # Формируем заголовок в одну строку
-    if not cards:
+    if not total_cards:
         page_counter = TRANSLATIONS[language]['my_cards']
     else:
         page_counter = (
             f"{TRANSLATIONS[language]['my_cards']} | "
-            f"{TRANSLATIONS[language]['total_cards'].format(len(cards))} | "
+            f"{TRANSLATIONS[language]['total_cards'].format(total_cards)} | "
             f"{TRANSLATIONS[language]['page_counter'].format(page, total_pages)}"
         )
     
-    if not cards:
+    if not total_cards:
         # Добавляем кнопку "Пусто" если нет карточек
         keyboard.append([types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['empty_button'],
-            callback_data="add_card"
+            callback_data=pack('add_card')
         )])
     else:
-        start_idx = (page - 1) * cards_per_page
-        end_idx = min(start_idx + cards_per_page, len(cards))
-        
         # Добавляем карточки текущей страницы
-        for card in cards[start_idx:end_idx]:
+        for card in cards:
             translations = []
             for lang_code, word in card['translations'].items():
                 if lang_code == 'ru':
@@ -135,7 +150,7 @@ def get_cards_keyboard(language: str, cards: list, page: int = 1, cards_per_page
                     translations.append(f"🇷🇴 {word}")
             keyboard.append([types.InlineKeyboardButton(
                 text=' | '.join(translations),
-                callback_data=f"card_{card['id']}"
+                callback_data=pack('card', card['id'])
             )])
     
     # Кнопки навигации
@@ -145,30 +160,30 @@ def get_cards_keyboard(language: str, cards: list, page: int = 1, cards_per_page
     if page == 1:
         nav_buttons.append(types.InlineKeyboardButton(
             text="•••",
-            callback_data="page_0"
+            callback_data=pack('page', 0)
         ))
     else:
         nav_buttons.append(types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['prev_page'],
-            callback_data=f"page_{page-1}"
+            callback_data=pack('page', page - 1)
         ))
     
     # Кнопка "Добавить"
     nav_buttons.append(types.InlineKeyboardButton(
         text=TRANSLATIONS[language]['add_button'],
-        callback_data="add_card"
+        callback_data=pack('add_card')
     ))
     
     # Кнопка "Вперед"
     if page >= total_pages:
         nav_buttons.append(types.InlineKeyboardButton(
             text="•••",
-            callback_data=f"page_{total_pages+1}"
+            callback_data=pack('page', total_pages + 1)
         ))
     else:
         nav_buttons.append(types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['next_page'],
-            callback_data=f"page_{page+1}"
+            callback_data=pack('page', page + 1)
         ))
     
     keyboard.append(nav_buttons)
@@ -176,7 +191,7 @@ def get_cards_keyboard(language: str, cards: list, page: int = 1, cards_per_page
     # Добавляем кнопку возврата в меню
     keyboard.append([types.InlineKeyboardButton(
         text=TRANSLATIONS[language]['back_to_menu'],
-        callback_data="back_to_menu"
+        callback_data=pack('back_to_menu')
     )])
     
     return types.InlineKeyboardMarkup(inline_keyboard=keyboard), page_counter
@@ -190,21 +205,21 @@ def get_card_view_keyboard(language: str, card_id: int) -> types.InlineKeyboardM
         [
             types.InlineKeyboardButton(
                 text=f"🇷🇺 {TRANSLATIONS[language]['edit_button']}", 
-                callback_data=f"edit_{card_id}_ru"
+                callback_data=pack('edit', card_id, 'ru')
             ),
             types.InlineKeyboardButton(
                 text=f"🇬🇧 {TRANSLATIONS[language]['edit_button']}", 
-                callback_data=f"edit_{card_id}_en"
+                callback_data=pack('edit', card_id, 'en')
             )
         ],
         [
             types.InlineKeyboardButton(
                 text=f"🇪🇸 {TRANSLATIONS[language]['edit_button']}", 
-                callback_data=f"edit_{card_id}_es"
+                callback_data=pack('edit', card_id, 'es')
             ),
             types.InlineKeyboardButton(
                 text=f"🇷🇴 {TRANSLATIONS[language]['edit_button']}", 
-                callback_data=f"edit_{card_id}_ro"
+                callback_data=pack('edit', card_id, 'ro')
             )
         ]
     ]
@@ -214,11 +229,11 @@ def get_card_view_keyboard(language: str, card_id: int) -> types.InlineKeyboardM
     control_buttons = [
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['delete_button'],
-            callback_data=f"delete_{card_id}"
+            callback_data=pack('delete', card_id)
         ),
         types.InlineKeyboardButton(
             text=TRANSLATIONS[language]['back_button'],
-            callback_data="back_to_cards"
+            callback_data=pack('back_to_cards')
         )
     ]
     keyboard.append(control_buttons)
@@ -237,21 +252,21 @@ def get_add_card_keyboard(language: str, translations: dict = None) -> types.Inl
         [
             types.InlineKeyboardButton(
                 text=f"🇷🇺 {TRANSLATIONS[language]['add_button']}", 
-                callback_data="add_translation_ru"
+                callback_data=pack('add_translation', 'ru')
             ),
             types.InlineKeyboardButton(
                 text=f"🇬🇧 {TRANSLATIONS[language]['add_button']}", 
-                callback_data="add_translation_en"
+                callback_data=pack('add_translation', 'en')
             )
         ],
         [
             types.InlineKeyboardButton(
                 text=f"🇪🇸 {TRANSLATIONS[language]['add_button']}", 
-                callback_data="add_translation_es"
+                callback_data=pack('add_translation', 'es')
             ),
             types.InlineKeyboardButton(
                 text=f"🇷🇴 {TRANSLATIONS[language]['add_button']}", 
-                callback_data="add_translation_ro"
+                callback_data=pack('add_translation', 'ro')
             )
         ]
     ])
@@ -260,16 +275,16 @@ def get_add_card_keyboard(language: str, translations: dict = None) -> types.Inl
     control_buttons = [
         [types.InlineKeyboardButton(
             text="GPT",
-            callback_data="add_translation_gpt"
+            callback_data=pack('add_translation_gpt')
         )],
         [
             types.InlineKeyboardButton(
                 text=TRANSLATIONS[language]['save_button'],
-                callback_data="save_card"
+                callback_data=pack('save_card')
             ),
             types.InlineKeyboardButton(
                 text=TRANSLATIONS[language]['back_button'],
-                callback_data="back_to_cards"
+                callback_data=pack('back_to_cards')
             )
         ]
     ]
@@ -59,6 +59,9 @@ TRANSLATIONS = {
         'gpt_cards_found': 'Найдено {} новых карточек:',
         'duplicate_cards_warning': 'Эти карточки уже были, они не будут добавлены повторно',
         'duplicate_translation': 'Такой перевод уже существует',
+        'similar_translation': 'Похоже на «{}»',
+        'similar_cards_warning': 'Эти карточки похожи на уже существующие, они добавятся только кнопкой «Сохранить с похожими»',
+        'save_with_similar_button': '💾 Сохранить с похожими',
         'how_to_translate': 'Как переводится это слово?',
         'translation': 'Перевод',
         'no_cards': '⚠️ У вас пока нет карточек для изучения',
@@ -67,7 +70,9 @@ TRANSLATIONS = {
         'correct': '✅ Верно',
         'empty_button': 'Пусто',
         'no_cards_for_selected_languages': '⚠️ Нет карточек с выбранными языками.\n\n Добавьте карточки или измените настройки',
-        'total_cards': 'Всего {} карточек'
+        'total_cards': 'Всего {} карточек',
+        'daily_plan_done': '🎉 План на сегодня выполнен!\n\nПовторить ещё карточки сверх плана?',
+        'extra_practice': '🔁 Продолжить повторение'
     },
     'en': {
         'welcome': "🇷🇺 Выберите язык интерфейса бота\n"
@@ -127,6 +132,9 @@ TRANSLATIONS = {
         'gpt_cards_found': 'Found {} new cards:',
         'duplicate_cards_warning': 'These cards already exist, they will not be added again',
         'duplicate_translation': 'This translation already exists',
+        'similar_translation': 'Similar to "{}"',
+        'similar_cards_warning': 'These cards look like cards you already have, they are added only with «Save with similar»',
+        'save_with_similar_button': '💾 Save with similar',
         'how_to_translate': 'How do you translate this word?',
         'translation': 'Translation',
         'no_cards': '⚠️ You don\'t have any cards to learn yet',
@@ -135,7 +143,9 @@ TRANSLATIONS = {
         'correct': '✅ Correct',
         'empty_button': 'Empty',
         'no_cards_for_selected_languages': '⚠️ No cards with selected languages.\nAdd cards or change language settings',
-        'total_cards': 'Total {} cards'
+        'total_cards': 'Total {} cards',
+        'daily_plan_done': '🎉 Today\'s plan is done!\n\nWould you like to practice more cards beyond the plan?',
+        'extra_practice': '🔁 Keep practicing'
     },
     'es': {
         'welcome': "🇷🇺 Выберите язык интерфейса бота\n"
@@ -195,6 +205,9 @@ TRANSLATIONS = {
         'gpt_cards_found': 'Se encontraron {} tarjetas nuevas:',
         'duplicate_cards_warning': 'Estas tarjetas ya existen, no se agregarán nuevamente',
         'duplicate_translation': 'Esta traducción ya existe',
+        'similar_translation': 'Parecido a «{}»',
+        'similar_cards_warning': 'Estas tarjetas se parecen a las que ya tienes, solo se agregarán con «Guardar con similares»',
+        'save_with_similar_button': '💾 Guardar con similares',
         'how_to_translate': '¿Cómo se traduce esta palabra?',
         'translation': 'Traducción',
         'no_cards': '⚠️ Aún no tienes tarjetas para aprender',
@@ -203,7 +216,9 @@ TRANSLATIONS = {
         'correct': '✅ Correcto',
         'empty_button': 'Vacío',
         'no_cards_for_selected_languages': '⚠️ No hay tarjetas con los idiomas seleccionados.\nAgrega tarjetas o cambia la configuración de idiomas',
-        'total_cards': 'Total {} tarjetas'
+        'total_cards': 'Total {} tarjetas',
+        'daily_plan_done': '🎉 ¡Plan de hoy completado!\n\n¿Quieres practicar más tarjetas fuera del plan?',
+        'extra_practice': '🔁 Seguir practicando'
     },
     'ro': {
         'welcome': "🇷🇺 Выберите язык интерфейса бота\n"
@@ -263,6 +278,9 @@ TRANSLATIONS = {
         'gpt_cards_found': 'S-au găsit {} carduri noi:',
         'duplicate_cards_warning': 'Aceste carduri există deja, nu vor fi adăugate din nou',
         'duplicate_translation': 'Această traducere există deja',
+        'similar_translation': 'Seamănă cu „{}”',
+        'similar_cards_warning': 'Aceste carduri seamănă cu cele existente, vor fi adăugate doar cu «Salvează cu cele similare»',
+        'save_with_similar_button': '💾 Salvează cu cele similare',
         'how_to_translate': 'Cum se traduce acest cuvânt?',
         'translation': 'Traducere',
         'no_cards': '⚠️ Nu ai încă carduri pentru învățare',
@@ -271,7 +289,9 @@ TRANSLATIONS = {
         'correct': '✅ Corect',
         'empty_button': 'Gol',
         'no_cards_for_selected_languages': '⚠️ Nu există carduri cu limbile selectate.\nAdaugă carduri sau modifică setările de limbă',
-        'total_cards': 'Total {} carduri'
+        'total_cards': 'Total {} carduri',
+        'daily_plan_done': '🎉 Planul de azi este gata!\n\nVrei să exersezi mai multe carduri peste plan?',
+        'extra_practice': '🔁 Continuă să exersezi'
     }
 } 
 
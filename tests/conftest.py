@@ -0,0 +1,97 @@
+"""Общие фикстуры тестов: временное хранилище данных и бот без сети"""
+
+import asyncio
+import os
+import shutil
+import sys
+from collections import OrderedDict
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('BOT_TOKEN', '123456:TEST')
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.storage.base import StorageKey
+from utils import metrics
+
+def reset_storage():
+    """Закрывает журнал и бэкенд, чтобы следующее обращение открыло их заново (как после перезапуска)"""
+    from utils import data_manager
+    if data_manager._journal is not None:
+        data_manager._journal.close()
+    if data_manager._backend is not None:
+        data_manager._backend.close()
+    data_manager._journal = None
+    data_manager._backend = None
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Пустое хранилище в data/ временной директории с колодой по умолчанию"""
+    os.makedirs(tmp_path / 'data')
+    shutil.copy(os.path.join(ROOT, 'data', 'default_cards.json'), tmp_path / 'data')
+    monkeypatch.chdir(tmp_path)
+    reset_storage()
+    yield tmp_path
+    reset_storage()
+
+USER_ID = 42
+
+@pytest.fixture
+def app(data_dir, monkeypatch):
+    """Модуль бота, запросы которого к Bot API записываются вместо отправки"""
+    import bot
+    bot.repo.reload()
+    metrics.reset()
+    requests = []
+    sent = []
+    failing = set()
+
+    async def make_request(_bot, method, timeout=None):
+        name = method.__api_method__
+        requests.append(name)
+        sent.append(method)
+        if name in failing:
+            raise TelegramBadRequest(method=method, message="Bad Request: message can't be edited")
+        if name in ('sendMessage', 'editMessageText'):
+            return message(2, getattr(method, 'text', ''))
+        return True
+
+    monkeypatch.setattr(bot.bot.session, 'make_request', make_request)
+    # Лимиты частоты в тестах не нужны
+    monkeypatch.setattr(bot.outgoing, 'chat_rate', 1000)
+    monkeypatch.setattr(bot.outgoing.global_bucket, 'rate', 1000)
+    monkeypatch.setattr(bot.outgoing, '_chats', OrderedDict())
+    bot.requests = requests
+    bot.sent = sent
+    bot.failing = failing
+    yield bot
+    key = StorageKey(bot.bot.id, USER_ID, USER_ID)
+    asyncio.run(bot.dp.storage.set_state(key, None))
+    asyncio.run(bot.dp.storage.set_data(key, {}))
+
+def message(message_id: int, text: str = '') -> types.Message:
+    return types.Message(
+        message_id=message_id, date=0, text=text,
+        chat=types.Chat(id=USER_ID, type='private'),
+        from_user=types.User(id=1, is_bot=True, first_name='bot')
+    )
+
+async def tap(app, data: str, update_id: int):
+    """Отправляет в диспетчер нажатие кнопки с callback_data data"""
+    update = types.Update(update_id=update_id, callback_query=types.CallbackQuery(
+        id=str(update_id), chat_instance='chat', data=data,
+        from_user=types.User(id=USER_ID, is_bot=False, first_name='user'),
+        message=message(1)
+    ))
+    await app.dp.feed_update(app.bot, update)
+
+async def send(app, text: str, update_id: int):
+    """Отправляет в диспетчер сообщение пользователя с текстом text"""
+    update = types.Update(update_id=update_id, message=types.Message(
+        message_id=update_id, date=0, text=text,
+        chat=types.Chat(id=USER_ID, type='private'),
+        from_user=types.User(id=USER_ID, is_bot=False, first_name='user')
+    ))
+    await app.dp.feed_update(app.bot, update)
@@ -0,0 +1,44 @@
+"""Поиск похожих переводов: триграммный индекс совпадает с полным перебором"""
+
+import random
+import pytest
+from utils.duplicate_index import DuplicateIndex, TrigramIndex, fold_text, trigrams
+
+def dice(a: str, b: str) -> float:
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+def make_word(rng: random.Random) -> str:
+    return ''.join(rng.choice('aeioulnrst') for _ in range(rng.randint(2, 14)))
+
+def typo(word: str, rng: random.Random) -> str:
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice('aeioulnrst') + word[position + 1:]
+
+@pytest.mark.parametrize('threshold', [0.5, 0.75, 0.9])
+def test_similar_matches_brute_force(threshold):
+    rng = random.Random(7)
+    words = {card_id: make_word(rng) for card_id in range(1500)}
+    index = TrigramIndex()
+    for card_id, word in words.items():
+        index.add(card_id, word)
+    for card_id in rng.sample(sorted(words), 300):
+        index.remove(card_id)
+        del words[card_id]
+
+    queries = [typo(rng.choice(list(words.values())), rng) for _ in range(60)] + [make_word(rng) for _ in range(60)]
+    for query in queries:
+        expected = {card_id for card_id, word in words.items() if dice(query, word) >= threshold}
+        found = index.similar(query, threshold)
+        assert set(found) == expected
+        assert all(found[card_id] == pytest.approx(dice(query, words[card_id])) for card_id in found)
+
+def test_similar_cards_ignore_accents_articles_and_typos():
+    index = DuplicateIndex([
+        {'id': 1, 'translations': {'ro': 'Mulțumesc', 'en': 'Thank you'}},
+        {'id': 2, 'translations': {'en': 'the apple', 'es': 'la manzana'}},
+    ])
+    assert index.similar_cards({'ro': 'Multumesc!', 'en': 'Thank you'}) == {1}
+    assert index.similar_cards({'en': 'Apple', 'es': 'manzanna'}) == {2}
+    assert index.similar_cards({'en': 'pear'}) == set()
+    assert fold_text('The Apple!', 'en') == 'apple'
@@ -0,0 +1,41 @@
+"""Импорт карточек из ответа GPT: похожие карточки добавляются только по отдельной кнопке"""
+
+import asyncio
+import pytest
+from tests.conftest import USER_ID, send, tap
+from utils.callback_data import pack
+
+GPT_RESPONSE = (
+    "🇷🇺: Яблоко | 🇬🇧: Apple | 🇪🇸: Manzana | 🇷🇴: Măr\n"
+    "🇷🇺: Привет! | 🇬🇧: Hello! | 🇪🇸: ¡Hola! | 🇷🇴: Salut!"
+)
+
+async def import_cards(app, response: str) -> list:
+    """Открывает импорт через GPT, отправляет ответ и возвращает callback_data кнопок предпросмотра"""
+    await tap(app, pack('lang', 'en'), 1)
+    await tap(app, pack('add_card'), 2)
+    await tap(app, pack('add_translation_gpt'), 3)
+    await send(app, response, 4)
+    preview = [method for method in app.sent if method.__api_method__ == 'sendMessage'][-1]
+    return [button.callback_data for row in preview.reply_markup.inline_keyboard for button in row]
+
+def english_words(app) -> list:
+    return [card['translations'].get('en') for card in app.repo.get(str(USER_ID))['cards']]
+
+@pytest.mark.parametrize('action, added', [
+    ('save_gpt_cards', ['Apple']),
+    ('save_all_gpt_cards', ['Apple', 'Hello!']),
+])
+def test_similar_cards_are_added_only_on_request(app, action, added):
+    async def scenario():
+        buttons = await import_cards(app, GPT_RESPONSE)
+        assert buttons == [pack('save_gpt_cards'), pack('back_to_add_card'), pack('save_all_gpt_cards')]
+        before = english_words(app)
+        await tap(app, pack(action), 5)
+        assert english_words(app) == before + added
+
+    asyncio.run(scenario())
+
+def test_no_extra_button_without_similar_cards(app):
+    buttons = asyncio.run(import_cards(app, GPT_RESPONSE.split('\n')[0]))
+    assert buttons == [pack('save_gpt_cards'), pack('back_to_add_card')]
@@ -0,0 +1,89 @@
+"""Журнал ответов: восстановление после сбоя во время сворачивания"""
+
+import os
+from utils.backends import copy_users
+from utils.backends.json_backend import JSONBackend
+from utils.backends.sqlite_backend import SQLiteBackend
+from utils.constants import JOURNAL_FILE
+from utils.data_manager import create_statistics
+from utils.journal import ReviewJournal
+from utils.models import Card, Deck
+
+USER_ID = '7'
+
+def answered(attempts: int) -> dict:
+    stats = create_statistics().to_dict()
+    stats.update(total_attempts=attempts, correct_answers=attempts, last_result=True, correct_streak=attempts)
+    return stats
+
+def user_with_card(stats: dict) -> dict:
+    return {
+        'interface_lang': 'en',
+        'settings': {'front_languages': ['es'], 'back_languages': ['en']},
+        'cards': Deck([Card(id=1, translations={'en': 'cat'}, statistics=stats)]),
+        'last_card_id': 1
+    }
+
+def loaded_attempts(backend, journal) -> int:
+    user = journal.apply(USER_ID, backend.load_user(USER_ID))
+    return user['cards'][0]['statistics']['total_attempts']
+
+def test_resumed_compaction_does_not_replay_folded_entries(data_dir):
+    backend = JSONBackend()
+    backend.save_user(USER_ID, user_with_card(create_statistics()))
+
+    # Сбой сразу после переключения на новый файл: .compacting остался на диске
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    journal.append(USER_ID, 1, answered(1))
+    journal.close()
+    os.replace(JOURNAL_FILE, journal.compacting_path)
+
+    # Перезапуск: ответ на карточку и сворачивание
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    journal.append(USER_ID, 1, answered(3))
+    journal.compact(backend)
+    assert not os.path.exists(journal.compacting_path)
+    assert loaded_attempts(backend, journal) == 3
+
+    # Карточки удалены, новая карточка получила тот же id; затем сбой без сворачивания
+    journal.save_user(backend, USER_ID, user_with_card(create_statistics()))
+    journal.close()
+
+    # После перезапуска свернутые записи не накладываются на новую карточку
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    assert loaded_attempts(backend, journal) == 0
+    journal.close()
+
+def test_resumed_compaction_keeps_entries_until_folded(data_dir):
+    backend = JSONBackend()
+    backend.save_user(USER_ID, user_with_card(create_statistics()))
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    journal.append(USER_ID, 1, answered(1))
+    journal.close()
+    os.replace(JOURNAL_FILE, journal.compacting_path)
+
+    # Перезапуск и новый ответ, затем сбой до сворачивания: ничего не теряется
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    journal.append(USER_ID, 1, answered(2))
+    journal.close()
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    assert loaded_attempts(backend, journal) == 2
+    journal.compact(backend)
+    journal.close()
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    assert journal.apply(USER_ID, {'cards': []}) == {'cards': []}
+    assert backend.load_user(USER_ID)['cards'][0]['statistics']['total_attempts'] == 2
+    journal.close()
+
+def test_copy_users_keeps_journaled_answers(data_dir):
+    source = JSONBackend()
+    source.save_user(USER_ID, user_with_card(create_statistics()))
+    journal = ReviewJournal(JOURNAL_FILE, 1)
+    journal.append(USER_ID, 1, answered(2))
+
+    # Ответ есть только в журнале
+    target = SQLiteBackend()
+    assert copy_users(source, target, journal) == 1
+    assert target.load_user(USER_ID)['cards'][0]['statistics']['total_attempts'] == 2
+    journal.close()
+    target.close()
@@ -0,0 +1,86 @@
+"""Режим обучения через диспетчер: ответ на нажатие и смена карточки"""
+
+import asyncio
+from tests.conftest import USER_ID, tap
+from utils import metrics
+from utils.callback_data import pack
+
+async def review(app, answers: int, failing=()):
+    """Выбирает язык, начинает обучение и отвечает на answers карточек (запросы failing при ответах отклоняются)"""
+    await tap(app, pack('lang', 'en'), 1)
+    await tap(app, pack('learn'), 2)
+    app.requests.clear()
+    app.failing.update(failing)
+    for i in range(answers):
+        await tap(app, pack('answer_correct' if i % 2 else 'answer_wrong'), 3 + i)
+
+def test_review_edits_card_in_place(app):
+    asyncio.run(review(app, 4))
+    # Каждый ответ — ответ на нажатие и замена текста сообщения
+    assert app.requests == ['answerCallbackQuery', 'editMessageText'] * 4
+    snapshot = metrics.snapshot()
+    assert snapshot['learning_api_calls_per_review_count'] == 4
+    assert snapshot['learning_api_calls_per_review_avg'] == 2
+    attempts = sum(card['statistics']['total_attempts'] for card in app.repo.get(str(USER_ID))['cards'])
+    assert attempts == 4
+
+def test_review_falls_back_to_new_message(app):
+    asyncio.run(review(app, 2, failing={'editMessageText'}))
+    assert sorted(app.requests) == sorted(
+        ['answerCallbackQuery', 'editMessageText', 'sendMessage', 'deleteMessage'] * 2
+    )
+    assert metrics.snapshot()['learning_api_calls_per_review_avg'] == 4
+
+def test_concurrent_answer_taps_are_all_counted(app):
+    # Быстрые повторные нажатия одного пользователя обрабатываются по очереди
+    async def scenario():
+        await review(app, 0)
+        await asyncio.gather(*(
+            tap(app, pack('answer_correct' if i % 2 else 'answer_wrong'), 3 + i) for i in range(200)
+        ))
+
+    asyncio.run(scenario())
+    attempts = sum(card['statistics']['total_attempts'] for card in app.repo.get(str(USER_ID))['cards'])
+    assert attempts == 200
+    assert metrics.snapshot()['user_lock_contended'] > 0
+
+def last_buttons(app) -> list:
+    """callback_data кнопок последнего измененного сообщения"""
+    edit = [method for method in app.sent if method.__api_method__ == 'editMessageText'][-1]
+    return [button.callback_data for row in edit.reply_markup.inline_keyboard for button in row]
+
+def test_extra_practice_is_offered_after_daily_plan(app):
+    async def scenario():
+        await review(app, 0)
+        # В плане все шаблонные карточки: после правильного ответа на каждую план выполнен
+        for i in range(len(app.repo.get(str(USER_ID))['cards'])):
+            await tap(app, pack('answer_correct'), 3 + i)
+        assert last_buttons(app) == [pack('extra_practice'), pack('back_to_menu')]
+
+        # Новый заход в обучение снова спрашивает, повторять ли дальше
+        await tap(app, pack('learn'), 100)
+        assert last_buttons(app) == [pack('extra_practice'), pack('back_to_menu')]
+
+        await tap(app, pack('extra_practice'), 101)
+        assert last_buttons(app) == [pack('back_to_menu'), pack('answer_wrong'), pack('answer_correct')]
+        await tap(app, pack('answer_correct'), 102)
+        assert last_buttons(app) == [pack('back_to_menu'), pack('answer_wrong'), pack('answer_correct')]
+
+    asyncio.run(scenario())
+
+def test_learning_stops_when_no_eligible_cards_are_left(app):
+    async def scenario():
+        await review(app, 0)
+        # Все карточки удалены, пока пользователь в режиме обучения
+        for card in list(app.repo.get(str(USER_ID))['cards']):
+            app.repo.delete_card(str(USER_ID), card['id'])
+        await tap(app, pack('answer_correct'), 3)
+        assert last_buttons(app) == [pack(action) for action in ('learn', 'my_cards', 'settings', 'change_language')]
+        assert await app.dp.fsm.get_context(app.bot, USER_ID, USER_ID).get_state() is None
+
+        # Дополнительное повторение по старой кнопке тоже не падает
+        await tap(app, pack('extra_practice'), 4)
+        assert last_buttons(app) == [pack(action) for action in ('learn', 'my_cards', 'settings', 'change_language')]
+        assert await app.dp.fsm.get_context(app.bot, USER_ID, USER_ID).get_state() is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+"""Планировщик исходящих запросов: таблица корзин чатов и ответ 429"""
+
+import asyncio
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from utils import request_scheduler
+from utils.request_scheduler import OutgoingScheduler
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_idle_chat_buckets_are_evicted_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(request_scheduler, 'OUTGOING_MAX_CHAT_BUCKETS', 3)
+    scheduler = OutgoingScheduler(clock=Clock())
+    for chat_id in (1, 2, 3):
+        scheduler._chat_bucket(chat_id)
+    # Чат 1 снова в деле: самой давней становится корзина чата 2
+    asyncio.run(scheduler._chat_bucket(1).acquire())
+    scheduler._chat_bucket(4)
+    assert list(scheduler._chats) == [3, 1, 4]
+
+    # Самая давняя корзина (чат 1) ещё не пополнилась — её не вытесняем, даже если таблица заполнена
+    asyncio.run(scheduler._chat_bucket(3).acquire())
+    asyncio.run(scheduler._chat_bucket(4).acquire())
+    scheduler._chat_bucket(5)
+    assert list(scheduler._chats) == [1, 3, 4, 5]
+
+def test_retry_after_is_reported_and_retried(capsys):
+    scheduler = OutgoingScheduler()
+    method = SendMessage(chat_id=1, text='hi')
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(method)
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=0)
+        return True
+
+    async def send():
+        bot = Bot('123456:TEST')
+        try:
+            return await scheduler(make_request, bot, method)
+        finally:
+            await bot.session.close()
+
+    assert asyncio.run(send()) is True
+    assert len(calls) == 2
+    assert 'Flood control on sendMessage' in capsys.readouterr().out
+
+def test_second_flooded_chat_pauses_the_whole_bot():
+    clock = Clock()
+    scheduler = OutgoingScheduler(clock=clock)
+    # 429 в одном чате останавливает только этот чат
+    scheduler._pause(1, scheduler._chat_bucket(1), 10)
+    assert scheduler.global_bucket.blocked_until == 0
+    # Второй чат под ограничением, пока пауза первого не кончилась, — ограничение на весь бот
+    clock.now = 5
+    scheduler._pause(2, scheduler._chat_bucket(2), 10)
+    assert scheduler.global_bucket.blocked_until == 15
+    # После паузы 429 в другом чате снова касается только его
+    clock.now = 30
+    scheduler._pause(3, scheduler._chat_bucket(3), 10)
+    assert scheduler.global_bucket.blocked_until == 15
+    # Запрос без чата — всегда общая пауза
+    scheduler._pause(None, None, 10)
+    assert scheduler.global_bucket.blocked_until == 40
+
+def test_cancelled_request_returns_its_chat_token():
+    scheduler = OutgoingScheduler(global_rate=0.001, global_burst=1, chat_rate=0.001, chat_burst=1)
+    method = SendMessage(chat_id=1, text='hi')
+
+    async def make_request(bot, method):
+        return True
+
+    async def scenario():
+        # Общий токен уже занят: запрос получает токен чата и ждет в общей очереди
+        await scheduler.global_bucket.acquire()
+        task = asyncio.create_task(scheduler(make_request, None, method))
+        await asyncio.sleep(0.01)
+        chat_bucket = scheduler._chats[1]
+        assert chat_bucket.tokens < 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert chat_bucket.tokens >= 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,107 @@
+"""Выбор карточки: ScoreColumns и DueIndex совпадают с calculate_priority"""
+
+import math
+import random
+import time
+import pytest
+from utils import data_manager, due_index, scoring
+from utils.data_manager import RECENCY_PRIORITY, calculate_priority, create_statistics
+from utils.due_index import DueIndex
+from utils.models import Card
+from utils.scoring import ScoreColumns
+
+def make_card(card_id: int, rng: random.Random, now: float) -> Card:
+    stats = create_statistics().to_dict()
+    if rng.random() < 0.8:
+        total = rng.randint(1, 20)
+        wrong = rng.randint(0, total)
+        # Держимся подальше от порогов давности, чтобы баллы не менялись за время теста
+        hours = rng.choice([0.5, 6, 30]) + rng.uniform(-0.4, 0.4)
+        stats.update(total_attempts=total, correct_answers=total - wrong, wrong_answers=wrong,
+                     wrong_streak=rng.randint(0, min(wrong, 3)), last_shown=now - hours * 3600)
+    return Card(id=card_id, translations={'en': f'word {card_id}'}, statistics=stats)
+
+def reference_select(cards: dict, exclude_id):
+    """Старый выбор: полный проход с calculate_priority, при равенстве — меньший id"""
+    return max(cards.values(), key=lambda card: (calculate_priority(card, exclude_id), -card['id']))
+
+def reference_peek(cards: dict, count: int) -> list:
+    ranked = sorted(cards.values(), key=lambda card: (-calculate_priority(card), card['id']))
+    return [card['id'] for card in ranked[:count]]
+
+def brute_stable_until(cards: dict, now: float) -> float:
+    crossings = [
+        card['statistics']['last_shown'] + hours * 3600
+        for card in cards.values() if card['statistics']['last_shown'] is not None
+        for hours, _ in RECENCY_PRIORITY
+    ]
+    return min((crossing for crossing in crossings if crossing > now), default=math.inf)
+
+@pytest.fixture
+def no_random(monkeypatch):
+    for module in (data_manager, due_index, scoring):
+        monkeypatch.setattr(module, 'RANDOM_PRIORITY', 0)
+
+def use_columns(kind: str, monkeypatch):
+    """Выбирает реализацию ScoreColumns: на numpy или на чистом Python"""
+    if kind == 'numpy':
+        if scoring.np is None:
+            pytest.skip('numpy is not installed')
+    else:
+        monkeypatch.setattr(scoring, 'np', None)
+
+@pytest.fixture(params=['due_index', 'columns_numpy', 'columns_python'])
+def engine(request, no_random, monkeypatch):
+    if request.param == 'due_index':
+        return DueIndex
+    use_columns(request.param.removeprefix('columns_'), monkeypatch)
+    return ScoreColumns
+
+def check_parity(index, cards: dict, rng: random.Random):
+    for exclude_id in [None] + rng.sample(sorted(cards), 5):
+        assert index.select(exclude_id)['id'] == reference_select(cards, exclude_id)['id']
+    assert [card['id'] for card in index.peek(10)] == reference_peek(cards, 10)
+
+def test_selection_matches_reference(engine):
+    rng = random.Random(12)
+    now = time.time()
+    cards = {card_id: make_card(card_id, rng, now) for card_id in range(1, 301)}
+    index = engine(list(cards.values()))
+    check_parity(index, cards, rng)
+
+    # Ответы, новые карточки и удаления
+    for card_id in rng.sample(sorted(cards), 60):
+        stats = dict(cards[card_id]['statistics'])
+        stats['total_attempts'] += 1
+        stats['wrong_answers'] += 1
+        stats['wrong_streak'] += 1
+        stats['last_shown'] = now
+        cards[card_id] = Card(id=card_id, translations=cards[card_id]['translations'], statistics=stats)
+        index.update(cards[card_id])
+    for card_id in range(301, 341):
+        cards[card_id] = make_card(card_id, rng, now)
+        index.update(cards[card_id])
+    for card_id in rng.sample(sorted(cards), 80):
+        del cards[card_id]
+        index.remove(card_id)
+
+    assert len(index) == len(cards)
+    check_parity(index, cards, rng)
+
+# DueIndex хранит точные моменты повышения баллов, оценка нужна только ScoreColumns
+@pytest.mark.parametrize('kind', ['numpy', 'python'])
+def test_columns_stable_until_is_never_late(kind, no_random, monkeypatch):
+    use_columns(kind, monkeypatch)
+    rng = random.Random(5)
+    now = time.time()
+    cards = {card_id: make_card(card_id, rng, now) for card_id in range(1, 201)}
+    index = ScoreColumns(list(cards.values()))
+    assert index.stable_until() == brute_stable_until(cards, time.time())
+
+    for card_id in rng.sample(sorted(cards), 50):
+        stats = dict(cards[card_id]['statistics'])
+        stats['last_shown'] = now - rng.uniform(0, 20) * 3600
+        cards[card_id] = Card(id=card_id, translations=cards[card_id]['translations'], statistics=stats)
+        index.update(cards[card_id])
+        stable_until = index.stable_until()
+        assert time.time() < stable_until <= brute_stable_until(cards, time.time())
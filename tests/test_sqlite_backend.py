@@ -0,0 +1,50 @@
+"""SQLite-бэкенд: запись статистики ответов"""
+
+from utils import default_deck
+from utils.backends.sqlite_backend import SQLiteBackend
+from utils.data_manager import create_user
+
+USER_ID = '5'
+
+def answered(attempts: int) -> dict:
+    return {'total_attempts': attempts, 'correct_answers': attempts, 'last_result': True, 'correct_streak': attempts}
+
+def statements(backend) -> list:
+    """Подключает запись выполняемых SQL-запросов"""
+    executed = []
+    backend._conn.set_trace_callback(executed.append)
+    return executed
+
+def test_update_of_stored_card_is_single_update(data_dir):
+    backend = SQLiteBackend()
+    user = create_user(USER_ID, 'en')
+    card_id = max(default_deck.get_default_translations())
+    user['cards'][0]['statistics']['total_attempts'] = 1
+    backend.save_user(USER_ID, user)
+    stored_id = user['cards'][0]['id']
+
+    executed = statements(backend)
+    backend.update_statistics(USER_ID, stored_id, answered(2))
+    # Только UPDATE в транзакции: список карточек пользователя не читается
+    assert [sql.split()[0] for sql in executed] == ['BEGIN', 'UPDATE', 'COMMIT']
+    cards = {card['id']: card for card in backend.load_user(USER_ID)['cards']}
+    assert cards[stored_id]['statistics']['total_attempts'] == 2
+    assert cards[card_id]['statistics']['total_attempts'] == 0
+    backend.close()
+
+def test_first_answer_saves_default_card(data_dir):
+    backend = SQLiteBackend()
+    user = create_user(USER_ID, 'en')
+    backend.save_user(USER_ID, user)
+    first, second = user['cards'][0]['id'], user['cards'][1]['id']
+
+    user['cards'].remove(second)
+    backend.save_user(USER_ID, user)
+    backend.update_statistics_batch(USER_ID, {first: answered(1), second: answered(1)})
+
+    cards = {card['id']: card for card in backend.load_user(USER_ID)['cards']}
+    assert cards[first]['statistics']['total_attempts'] == 1
+    assert cards[first]['translations'] == default_deck.get_default_translations()[first]
+    # Удаленная шаблонная карточка не возвращается
+    assert second not in cards
+    backend.close()
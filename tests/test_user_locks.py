@@ -0,0 +1,73 @@
+"""Блокировки по пользователям под нагрузкой: тысячи одновременных нажатий"""
+
+import asyncio
+from collections import Counter
+from aiogram import Bot, Dispatcher, types
+from utils import metrics
+from utils.user_locks import UserLockMap, UserLockMiddleware
+
+USERS = 50
+UPDATES = 5000
+
+def callback_update(update_id: int, user_id: int) -> types.Update:
+    return types.Update(update_id=update_id, callback_query=types.CallbackQuery(
+        id=str(update_id), chat_instance='chat', data='tap',
+        from_user=types.User(id=user_id, is_bot=False, first_name='user')
+    ))
+
+async def stress(locks: UserLockMap = None) -> tuple:
+    """Отправляет UPDATES нажатий от USERS пользователей одновременно.
+
+    Обработчик читает счетчик пользователя, отдает управление и записывает
+    счетчик обратно, как обработчики бота между чтением и сохранением данных.
+    Возвращает счетчики и наибольшее число одновременно работающих обработчиков.
+    """
+    dp = Dispatcher()
+    if locks is not None:
+        dp.update.outer_middleware(UserLockMiddleware(locks))
+    counters = Counter()
+    running = Counter()
+    peak = {'user': 0, 'total': 0}
+
+    @dp.callback_query()
+    async def handler(callback: types.CallbackQuery):
+        user_id = callback.from_user.id
+        running[user_id] += 1
+        peak['user'] = max(peak['user'], running[user_id])
+        peak['total'] = max(peak['total'], sum(running.values()))
+        value = counters[user_id]
+        await asyncio.sleep(0)
+        counters[user_id] = value + 1
+        running[user_id] -= 1
+
+    bot = Bot('123456:TEST')
+    await asyncio.gather(*(
+        dp.feed_update(bot, callback_update(update_id, update_id % USERS + 1))
+        for update_id in range(UPDATES)
+    ))
+    await bot.session.close()
+    return counters, peak
+
+def test_updates_are_serialized_per_user():
+    metrics.reset()
+    locks = UserLockMap()
+    counters, peak = asyncio.run(stress(locks))
+
+    assert sum(counters.values()) == UPDATES
+    assert set(counters.values()) == {UPDATES // USERS}
+    # Один обработчик на пользователя, но разные пользователи работают одновременно
+    assert peak['user'] == 1
+    assert peak['total'] > 1
+    assert len(locks) == 0
+
+    snapshot = metrics.snapshot()
+    assert snapshot['user_lock_acquired'] == UPDATES
+    assert 0 < snapshot['user_lock_contended'] < UPDATES
+    assert snapshot['user_lock_wait_seconds_count'] == snapshot['user_lock_contended']
+    assert snapshot['user_locks_active'] == 0
+
+def test_updates_race_without_locks():
+    # Проверка самого теста: без блокировок обновления одного пользователя теряются
+    counters, peak = asyncio.run(stress())
+    assert peak['user'] > 1
+    assert sum(counters.values()) < UPDATES
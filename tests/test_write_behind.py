@@ -0,0 +1,61 @@
+"""Отложенная запись: пользователь, вытесненный во время записи пачки, перечитывается без потерь"""
+
+import asyncio
+import threading
+from utils import data_manager
+from utils.repository import UserRepository
+from utils.write_behind import WriteBehindCache
+
+def total_attempts(repo: UserRepository, user_id: str) -> int:
+    return sum(card['statistics']['total_attempts'] for card in repo.get(user_id)['cards'])
+
+def test_user_evicted_during_flush_keeps_pending_changes(data_dir, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_write_batch(users, statistics):
+        started.set()
+        release.wait(5)
+        data_manager._write_batch(users, statistics)
+
+    cache = WriteBehindCache(slow_write_batch, 60, 1000)
+    monkeypatch.setattr(data_manager, '_write_behind', cache)
+    # Кэш репозитория на одного пользователя: новый пользователь вытесняет предыдущего
+    repo = UserRepository(max_users=1)
+
+    async def flush_started() -> asyncio.Task:
+        started.clear()
+        release.clear()
+        task = asyncio.create_task(cache.flush())
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        return task
+
+    async def scenario():
+        # Пользователь целиком в записываемой пачке
+        card_id = repo.create('1', 'en')['cards'][0]['id']
+        task = await flush_started()
+        repo.create('2', 'en')
+        assert repo.get('1') is not None
+        release.set()
+        await task
+
+        # Статистика ответов в записываемой пачке, ещё один ответ — после её начала
+        repo.record_answer('1', card_id, True)
+        repo.record_answer('1', card_id, False)
+        task = await flush_started()
+        repo.create('3', 'en')
+        assert total_attempts(repo, '1') == 2
+        repo.record_answer('1', card_id, True)
+        repo.get('2')
+        assert total_attempts(repo, '1') == 3
+        release.set()
+        await task
+        await cache.flush()
+
+    asyncio.run(scenario())
+
+    # После записи всё читается из хранилища
+    monkeypatch.setattr(data_manager, '_write_behind', None)
+    repo.reload()
+    assert total_attempts(repo, '1') == 3
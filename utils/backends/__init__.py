@@ -0,0 +1,55 @@
+"""Пакет с бэкендами хранилища данных пользователей
+
+Каждый бэкенд реализует один и тот же набор методов:
+load_user, save_user, user_ids, update_statistics, update_statistics_batch
+и close.
+Бэкенды принимают и возвращают пользователя с полным списком карточек,
+а хранят только отличия от общей колоды шаблонных карточек (utils.default_deck).
+"""
+
+import json
+from utils.binary_format import pack_user, unpack_user, is_binary
+from utils.constants import STORAGE_BACKEND, USER_DATA_FORMAT
+from utils import default_deck
+from utils.models import to_json
+
+def create_backend(name: str = STORAGE_BACKEND):
+    """Создает бэкенд хранилища по имени ('json', 'sqlite' или 'records')"""
+    if name == 'json':
+        from utils.backends.json_backend import JSONBackend
+        return JSONBackend()
+    if name == 'sqlite':
+        from utils.backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    if name == 'records':
+        from utils.backends.record_backend import RecordBackend
+        return RecordBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+def encode_user(user: dict, data_format: str = USER_DATA_FORMAT) -> bytes:
+    """Сериализует данные пользователя в выбранном формате ('json' или 'binary')"""
+    user = default_deck.pack_user(user)
+    if data_format == 'binary':
+        return pack_user(user)
+    return json.dumps(user, ensure_ascii=False, separators=(',', ':'), default=to_json).encode('utf-8')
+
+def decode_user(data: bytes) -> dict:
+    """Десериализует данные пользователя, формат определяется автоматически"""
+    user = unpack_user(data) if is_binary(data) else json.loads(data)
+    return default_deck.unpack_user(user)
+
+def copy_users(source, target, journal=None) -> int:
+    """Копирует всех пользователей из одного бэкенда в другой.
+
+    Журнал ответов источника сначала сворачивается в источник,
+    иначе ответы, которых еще нет в снимке, не попадут в копию.
+    """
+    if journal:
+        journal.compact(source)
+    count = 0
+    for user_id in list(source.user_ids()):
+        user = source.load_user(user_id)
+        if user is not None:
+            target.save_user(user_id, user)
+            count += 1
+    return count
@@ -0,0 +1,96 @@
+"""Файловый бэкенд: каждый пользователь хранится в отдельном файле (JSON или двоичный формат)"""
+
+import json
+import os
+import zlib
+from utils.backends import encode_user, decode_user
+from utils.constants import USERS_DIR, USERS_INDEX_FILE, USER_BUCKETS, USER_DATA_FORMAT
+
+# Расширение файла пользователя для каждого формата
+EXTENSIONS = {'json': '.json', 'binary': '.bin'}
+
+def _write_file(path, data: bytes):
+    """Атомарно записывает файл: сначала во временный файл, затем переименовывает"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _write_json(path, data):
+    """Атомарно записывает JSON"""
+    _write_file(path, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+class JSONBackend:
+    """Хранилище в файлах data/users/<корзина>/<user_id>.json (или .bin) с общим индексом"""
+    
+    def __init__(self, users_dir: str = USERS_DIR, index_file: str = USERS_INDEX_FILE):
+        self.users_dir = users_dir
+        self.index_file = index_file
+        os.makedirs(self.users_dir, exist_ok=True)
+        
+        # Индекс держим в памяти, чтобы не читать index.json при каждом сохранении
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._index = set(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._index = set()
+    
+    def _user_file(self, user_id: str, data_format: str = USER_DATA_FORMAT) -> str:
+        """Возвращает путь к файлу пользователя (корзина выбирается по crc32 от user_id)"""
+        bucket = zlib.crc32(str(user_id).encode('utf-8')) % USER_BUCKETS
+        return os.path.join(self.users_dir, f"{bucket:02x}", f"{user_id}{EXTENSIONS[data_format]}")
+    
+    def user_ids(self):
+        """Возвращает идентификаторы всех пользователей"""
+        return set(self._index)
+    
+    def load_user(self, user_id: str):
+        """Загружает данные одного пользователя (None, если пользователя нет)"""
+        # Сначала файл в текущем формате, затем в другом (если формат недавно сменили)
+        for data_format in sorted(EXTENSIONS, key=lambda name: name != USER_DATA_FORMAT):
+            try:
+                with open(self._user_file(user_id, data_format), 'rb') as f:
+                    return decode_user(f.read())
+            except FileNotFoundError:
+                continue
+            except ValueError:
+                return None
+        return None
+    
+    def save_user(self, user_id: str, user: dict):
+        """Сохраняет данные одного пользователя, переписывая только его файл"""
+        path = self._user_file(user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_file(path, encode_user(user))
+        
+        # Файл в другом формате больше не актуален
+        for data_format in EXTENSIONS:
+            if data_format != USER_DATA_FORMAT:
+                old_path = self._user_file(user_id, data_format)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+        
+        # Индекс переписываем только при появлении нового пользователя
+        if user_id not in self._index:
+            self._index.add(user_id)
+            _write_json(self.index_file, sorted(self._index))
+    
+    def update_statistics(self, user_id: str, card_id: int, stats: dict):
+        """Обновляет статистику карточки (в JSON переписывается файл пользователя)"""
+        self.update_statistics_batch(user_id, {card_id: stats})
+    
+    def update_statistics_batch(self, user_id: str, stats_by_card: dict):
+        """Обновляет статистику нескольких карточек пользователя за одну запись файла"""
+        user = self.load_user(user_id)
+        if user is None:
+            return
+        changed = False
+        for card in user.get('cards', []):
+            if card['id'] in stats_by_card:
+                card['statistics'] = stats_by_card[card['id']]
+                changed = True
+        if changed:
+            self.save_user(user_id, user)
+    
+    def close(self):
+        """Файловому бэкенду закрывать нечего"""
@@ -0,0 +1,35 @@
+"""Перенос данных пользователей между бэкендами
+
+Пример: python -m utils.backends.migrate json sqlite
+"""
+
+import os
+import sys
+from utils.backends import create_backend, copy_users
+from utils.data_manager import ensure_data_dir, get_journal, migrate_user_data_file
+from utils.constants import STORAGE_BACKEND, USER_DATA_FILE
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python -m utils.backends.migrate <source> <target>")
+        sys.exit(1)
+    
+    ensure_data_dir()
+    source = create_backend(sys.argv[1])
+    target = create_backend(sys.argv[2])
+    
+    # Старый монолитный файл сначала импортируем в источник
+    if os.path.exists(USER_DATA_FILE):
+        migrate_user_data_file(source)
+    
+    # Журнал ответов ведется для рабочего бэкенда бота
+    journal = get_journal() if sys.argv[1] == STORAGE_BACKEND else None
+    count = copy_users(source, target, journal)
+    if journal:
+        journal.close()
+    source.close()
+    target.close()
+    print(f"Copied {count} users from {sys.argv[1]} to {sys.argv[2]}")
+
+if __name__ == "__main__":
+    main()
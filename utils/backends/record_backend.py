@@ -0,0 +1,225 @@
+"""Бэкенд с файлом записей: пользователи дописываются в один файл, индекс хранит смещения записей"""
+
+import mmap
+import os
+import struct
+import threading
+import zlib
+from utils.backends import encode_user, decode_user
+from utils.constants import RECORDS_FILE, RECORDS_INDEX_FILE, RECORDS_COMPACT_MIN_SIZE
+
+# Заголовок записи: длина user_id, длина данных (JSON или двоичный формат), crc32 данных
+RECORD_HEADER = struct.Struct('<HII')
+# Запись индекса: длина user_id, смещение записи, полная длина записи
+INDEX_ENTRY = struct.Struct('<HQI')
+
+class RecordBackend:
+    """Хранилище в файле записей с индексом user_id -> (смещение, длина).
+
+    Каждое сохранение дописывает новую запись пользователя в конец файла и
+    строку в индекс, чтение декодирует только одну запись через mmap. Старые
+    версии записей становятся мусором и удаляются при сжатии файла. Если индекс
+    поврежден или не совпадает с файлом данных, он перестраивается сканированием.
+    """
+
+    def __init__(self, path: str = RECORDS_FILE, index_path: str = RECORDS_INDEX_FILE):
+        self.path = path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        # user_id -> (смещение, длина записи)
+        self._index = {}
+        self._live_bytes = 0
+        self._mmap = None
+        self._index_file = None
+
+        open(self.path, 'ab').close()
+        if not self._load_index():
+            self._rebuild_index()
+        self._data_file = open(self.path, 'ab')
+        if self._index_file is None:
+            self._index_file = open(self.index_path, 'ab')
+
+    def _load_index(self) -> bool:
+        """Читает индекс с диска, возвращает False, если индекс не совпадает с файлом данных"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return os.path.getsize(self.path) == 0
+
+        index = {}
+        end = 0
+        position = 0
+        while position < len(data):
+            if position + INDEX_ENTRY.size > len(data):
+                return False
+            id_length, offset, length = INDEX_ENTRY.unpack_from(data, position)
+            position += INDEX_ENTRY.size
+            if position + id_length > len(data):
+                return False
+            user_id = data[position:position + id_length].decode('utf-8')
+            position += id_length
+            index[user_id] = (offset, length)
+            end = max(end, offset + length)
+
+        # Последняя проиндексированная запись должна заканчиваться ровно в конце файла данных
+        if end != os.path.getsize(self.path):
+            return False
+        self._index = index
+        self._live_bytes = sum(length for _, length in index.values())
+        return True
+
+    def _scan(self):
+        """Сканирует файл данных, возвращает (user_id, смещение, длина) для целых записей"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            id_length, payload_length, crc = RECORD_HEADER.unpack_from(data, position)
+            length = RECORD_HEADER.size + id_length + payload_length
+            if position + length > len(data):
+                break
+            payload_start = position + RECORD_HEADER.size + id_length
+            if zlib.crc32(data[payload_start:payload_start + payload_length]) != crc:
+                break
+            user_id = data[position + RECORD_HEADER.size:payload_start].decode('utf-8')
+            yield user_id, position, length
+            position += length
+
+    def _rebuild_index(self):
+        """Перестраивает индекс сканированием файла данных и обрезает оборванный хвост"""
+        index = {}
+        end = 0
+        for user_id, offset, length in self._scan():
+            index[user_id] = (offset, length)
+            end = offset + length
+        if end != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+        self._index = index
+        self._live_bytes = sum(length for _, length in index.values())
+        self._write_index_file()
+        self._close_mmap()
+        print(f"Rebuilt records index: {len(index)} users")
+
+    def _write_index_file(self):
+        """Полностью переписывает файл индекса"""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for user_id, (offset, length) in self._index.items():
+                encoded_id = user_id.encode('utf-8')
+                f.write(INDEX_ENTRY.pack(len(encoded_id), offset, length) + encoded_id)
+        os.replace(tmp_path, self.index_path)
+
+        # Дальнейшие записи индекса должны идти в новый файл
+        if self._index_file is not None:
+            self._index_file.close()
+        self._index_file = open(self.index_path, 'ab')
+
+    def _close_mmap(self):
+        """Закрывает отображение файла данных"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _read_record(self, user_id: str):
+        """Читает и декодирует одну запись пользователя через mmap"""
+        location = self._index.get(user_id)
+        if location is None:
+            return None
+        offset, length = location
+
+        # Файл мог вырасти после создания отображения
+        if self._mmap is None or offset + length > len(self._mmap):
+            self._close_mmap()
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        id_length, payload_length, crc = RECORD_HEADER.unpack_from(self._mmap, offset)
+        payload_start = offset + RECORD_HEADER.size + id_length
+        record_id = self._mmap[offset + RECORD_HEADER.size:payload_start]
+        payload = self._mmap[payload_start:payload_start + payload_length]
+        if (RECORD_HEADER.size + id_length + payload_length != length
+                or record_id != user_id.encode('utf-8') or zlib.crc32(payload) != crc):
+            raise ValueError(f"Corrupted record for user {user_id}")
+        return decode_user(payload)
+
+    def user_ids(self):
+        """Возвращает идентификаторы всех пользователей"""
+        with self._lock:
+            return set(self._index)
+
+    def load_user(self, user_id: str):
+        """Загружает данные одного пользователя (None, если пользователя нет)"""
+        with self._lock:
+            try:
+                return self._read_record(user_id)
+            except (ValueError, struct.error):
+                # Индекс указывает не туда — перестраиваем и пробуем ещё раз
+                self._rebuild_index()
+                return self._read_record(user_id)
+
+    def save_user(self, user_id: str, user: dict):
+        """Дописывает новую версию записи пользователя и обновляет индекс"""
+        payload = encode_user(user)
+        encoded_id = user_id.encode('utf-8')
+        record = RECORD_HEADER.pack(len(encoded_id), len(payload), zlib.crc32(payload)) + encoded_id + payload
+
+        with self._lock:
+            # Позиция берется от реального конца файла: хвост мог быть обрезан при перестройке индекса
+            offset = self._data_file.seek(0, os.SEEK_END)
+            self._data_file.write(record)
+            self._data_file.flush()
+            self._index_file.write(INDEX_ENTRY.pack(len(encoded_id), offset, len(record)) + encoded_id)
+            self._index_file.flush()
+
+            previous = self._index.get(user_id)
+            self._index[user_id] = (offset, len(record))
+            self._live_bytes += len(record) - (previous[1] if previous else 0)
+
+            # Сжимаем файл, когда мусора становится больше, чем живых данных
+            end = offset + len(record)
+            if end >= RECORDS_COMPACT_MIN_SIZE and end > 2 * self._live_bytes:
+                self._compact()
+
+    def _compact(self):
+        """Переписывает файл данных, оставляя только актуальные записи"""
+        tmp_path = f"{self.path}.tmp"
+        index = {}
+        with open(self.path, 'rb') as source, open(tmp_path, 'wb') as target:
+            for user_id, (offset, length) in self._index.items():
+                source.seek(offset)
+                index[user_id] = (target.tell(), length)
+                target.write(source.read(length))
+
+        self._close_mmap()
+        self._data_file.close()
+        os.replace(tmp_path, self.path)
+        self._data_file = open(self.path, 'ab')
+        self._index = index
+        self._write_index_file()
+
+    def update_statistics(self, user_id: str, card_id: int, stats: dict):
+        """Обновляет статистику карточки (дописывается новая запись пользователя)"""
+        self.update_statistics_batch(user_id, {card_id: stats})
+
+    def update_statistics_batch(self, user_id: str, stats_by_card: dict):
+        """Обновляет статистику нескольких карточек пользователя одной записью"""
+        user = self.load_user(user_id)
+        if user is None:
+            return
+        changed = False
+        for card in user.get('cards', []):
+            if card['id'] in stats_by_card:
+                card['statistics'] = stats_by_card[card['id']]
+                changed = True
+        if changed:
+            self.save_user(user_id, user)
+
+    def close(self):
+        """Закрывает файлы и отображение"""
+        with self._lock:
+            self._close_mmap()
+            self._data_file.close()
+            self._index_file.close()
@@ -0,0 +1,280 @@
+"""SQLite-бэкенд: нормализованные таблицы пользователей, настроек, карточек и статистики"""
+
+import json
+import sqlite3
+import threading
+from utils import default_deck
+from utils.constants import SQLITE_DB_FILE, SM2_INITIAL_EASE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    interface_lang TEXT,
+    last_card_id INTEGER NOT NULL DEFAULT 0,
+    deleted_default_cards TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    user_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (user_id, key)
+);
+CREATE TABLE IF NOT EXISTS cards (
+    user_id TEXT NOT NULL,
+    card_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, card_id)
+);
+CREATE TABLE IF NOT EXISTS translations (
+    user_id TEXT NOT NULL,
+    card_id INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (user_id, card_id, lang)
+);
+CREATE TABLE IF NOT EXISTS statistics (
+    user_id TEXT NOT NULL,
+    card_id INTEGER NOT NULL,
+    total_attempts INTEGER NOT NULL DEFAULT 0,
+    correct_answers INTEGER NOT NULL DEFAULT 0,
+    wrong_answers INTEGER NOT NULL DEFAULT 0,
+    last_shown REAL,
+    last_result INTEGER,
+    correct_streak INTEGER NOT NULL DEFAULT 0,
+    wrong_streak INTEGER NOT NULL DEFAULT 0,
+    ease REAL NOT NULL DEFAULT 2.5,
+    interval REAL NOT NULL DEFAULT 0,
+    due REAL,
+    PRIMARY KEY (user_id, card_id)
+);
+"""
+
+# Колонки, добавленные после первой версии схемы: таблица -> [(колонка, определение)]
+ADDED_COLUMNS = {
+    'users': [('deleted_default_cards', 'TEXT')],
+    'statistics': [
+        ('ease', 'REAL NOT NULL DEFAULT 2.5'),
+        ('interval', 'REAL NOT NULL DEFAULT 0'),
+        ('due', 'REAL')
+    ]
+}
+
+# Порядок колонок статистики совпадает с ключами словаря statistics
+STAT_FIELDS = (
+    'total_attempts', 'correct_answers', 'wrong_answers', 'last_shown',
+    'last_result', 'correct_streak', 'wrong_streak', 'ease', 'interval', 'due'
+)
+
+def _stats_from_row(row) -> dict:
+    """Преобразует строку таблицы statistics в словарь"""
+    stats = dict(zip(STAT_FIELDS, row))
+    if stats['last_result'] is not None:
+        stats['last_result'] = bool(stats['last_result'])
+    return stats
+
+def _stats_to_row(stats: dict) -> tuple:
+    """Преобразует словарь статистики в значения колонок"""
+    return (
+        stats.get('total_attempts', 0),
+        stats.get('correct_answers', 0),
+        stats.get('wrong_answers', 0),
+        stats.get('last_shown'),
+        stats.get('last_result'),
+        stats.get('correct_streak', 0),
+        stats.get('wrong_streak', 0),
+        stats.get('ease', SM2_INITIAL_EASE),
+        stats.get('interval', 0),
+        stats.get('due')
+    )
+
+class SQLiteBackend:
+    """Хранилище в базе SQLite в режиме WAL.
+
+    В таблицах лежат только карточки, отличающиеся от общей колоды; список
+    удаленных шаблонных карточек хранится в users.deleted_default_cards
+    (NULL — старая запись, где шаблонные карточки скопированы целиком).
+    """
+
+    def __init__(self, path: str = SQLITE_DB_FILE):
+        self.path = path
+        # Соединение используется и из пула потоков, поэтому доступ защищаем блокировкой
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Базы, созданные старыми версиями, дополняем новыми колонками
+        for table, added in ADDED_COLUMNS.items():
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in added:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def user_ids(self):
+        """Возвращает идентификаторы всех пользователей"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT user_id FROM users")}
+
+    def _load_profile(self, user_id: str):
+        """Загружает профиль пользователя вместе со списком удаленных шаблонных карточек"""
+        row = self._conn.execute(
+            "SELECT interface_lang, last_card_id, deleted_default_cards FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        settings = {
+            key: json.loads(value)
+            for key, value in self._conn.execute(
+                "SELECT key, value FROM settings WHERE user_id = ?", (user_id,)
+            )
+        }
+        user = {'interface_lang': row[0], 'settings': settings, 'last_card_id': row[1]}
+        if row[2] is not None:
+            user[default_deck.DELETED_FIELD] = json.loads(row[2])
+        return user
+
+    def _deleted_defaults(self, user_id: str):
+        """Возвращает список удаленных шаблонных карточек (None для старых записей)"""
+        row = self._conn.execute(
+            "SELECT deleted_default_cards FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return None if row is None or row[0] is None else json.loads(row[0])
+
+    def _select_cards(self, user_id: str) -> list:
+        """Собирает карточки из таблиц cards, translations и statistics"""
+        rows = self._conn.execute(
+            f"""SELECT c.card_id, {', '.join('s.' + field for field in STAT_FIELDS)}
+                FROM cards c LEFT JOIN statistics s
+                  ON s.user_id = c.user_id AND s.card_id = c.card_id
+                WHERE c.user_id = ?
+                ORDER BY c.card_id""",
+            (user_id,)
+        ).fetchall()
+        if not rows:
+            return []
+
+        cards = {}
+        for row in rows:
+            stats = _stats_from_row(row[1:] if row[1] is not None else _stats_to_row({}))
+            cards[row[0]] = {'id': row[0], 'translations': {}, 'statistics': stats}
+
+        # Переводы забираем только для выбранных карточек
+        placeholders = ','.join('?' * len(cards))
+        for card_id, lang, text in self._conn.execute(
+            f"SELECT card_id, lang, text FROM translations WHERE user_id = ? AND card_id IN ({placeholders})",
+            (user_id, *cards.keys())
+        ):
+            cards[card_id]['translations'][lang] = text
+        return list(cards.values())
+
+    def load_user(self, user_id: str):
+        """Загружает данные одного пользователя (None, если пользователя нет)"""
+        with self._lock:
+            user = self._load_profile(user_id)
+            if user is None:
+                return None
+            user['cards'] = self._select_cards(user_id)
+        return default_deck.unpack_user(user)
+
+    def save_user(self, user_id: str, user: dict):
+        """Полностью перезаписывает данные пользователя в одной транзакции"""
+        record = default_deck.pack_user(user)
+        cards = record['cards']
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                conn.execute(
+                    """INSERT INTO users (user_id, interface_lang, last_card_id, deleted_default_cards) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET
+                           interface_lang = excluded.interface_lang,
+                           last_card_id = excluded.last_card_id,
+                           deleted_default_cards = excluded.deleted_default_cards""",
+                    (user_id, user.get('interface_lang'), user.get('last_card_id', 0),
+                     json.dumps(record[default_deck.DELETED_FIELD]))
+                )
+                for table in ('settings', 'cards', 'translations', 'statistics'):
+                    conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+                conn.executemany(
+                    "INSERT INTO settings (user_id, key, value) VALUES (?, ?, ?)",
+                    [(user_id, key, json.dumps(value)) for key, value in user.get('settings', {}).items()]
+                )
+                conn.executemany(
+                    "INSERT INTO cards (user_id, card_id) VALUES (?, ?)",
+                    [(user_id, card['id']) for card in cards]
+                )
+                conn.executemany(
+                    "INSERT INTO translations (user_id, card_id, lang, text) VALUES (?, ?, ?, ?)",
+                    [
+                        (user_id, card['id'], lang, text)
+                        for card in cards
+                        for lang, text in card['translations'].items()
+                    ]
+                )
+                conn.executemany(
+                    f"INSERT INTO statistics (user_id, card_id, {', '.join(STAT_FIELDS)}) VALUES (?, ?, {', '.join('?' * len(STAT_FIELDS))})",
+                    [(user_id, card['id'], *_stats_to_row(card.get('statistics', {}))) for card in cards]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def update_statistics(self, user_id: str, card_id: int, stats: dict):
+        """Обновляет статистику карточки одним UPDATE"""
+        self.update_statistics_batch(user_id, {card_id: stats})
+
+    def _unsaved_defaults(self, user_id: str, card_ids: list) -> list:
+        """Возвращает id из card_ids, которые относятся к шаблонным карточкам пользователя и ещё не сохранены в таблицах"""
+        placeholders = ','.join('?' * len(card_ids))
+        stored = {
+            row[0] for row in self._conn.execute(
+                f"SELECT card_id FROM cards WHERE user_id = ? AND card_id IN ({placeholders})", (user_id, *card_ids)
+            )
+        }
+        deleted = self._deleted_defaults(user_id)
+        if deleted is None:
+            return []
+        deleted = set(deleted)
+        defaults = default_deck.get_default_translations()
+        return [card_id for card_id in card_ids if card_id not in stored and card_id in defaults and card_id not in deleted]
+
+    def update_statistics_batch(self, user_id: str, stats_by_card: dict):
+        """Обновляет статистику нескольких карточек пользователя в одной транзакции"""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                updated = conn.executemany(
+                    f"UPDATE statistics SET {', '.join(field + ' = ?' for field in STAT_FIELDS)} WHERE user_id = ? AND card_id = ?",
+                    [(*_stats_to_row(stats), user_id, card_id) for card_id, stats in stats_by_card.items()]
+                ).rowcount
+                if updated >= len(stats_by_card):
+                    conn.execute("COMMIT")
+                    return
+                # Шаблонные карточки, которых ещё нет в таблицах, сохраняем при первом ответе
+                defaults = self._unsaved_defaults(user_id, list(stats_by_card))
+                conn.executemany(
+                    "INSERT INTO cards (user_id, card_id) VALUES (?, ?)",
+                    [(user_id, card_id) for card_id in defaults]
+                )
+                conn.executemany(
+                    "INSERT INTO translations (user_id, card_id, lang, text) VALUES (?, ?, ?, ?)",
+                    [
+                        (user_id, card_id, lang, text)
+                        for card_id in defaults
+                        for lang, text in default_deck.get_default_translations()[card_id].items()
+                    ]
+                )
+                conn.executemany(
+                    f"INSERT INTO statistics (user_id, card_id, {', '.join(STAT_FIELDS)}) VALUES (?, ?, {', '.join('?' * len(STAT_FIELDS))})",
+                    [(user_id, card_id, *_stats_to_row(stats_by_card[card_id])) for card_id in defaults]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,178 @@
+"""Компактный двоичный формат данных пользователя
+
+Запись пользователя:
+    b'T2L' + версия (1 байт; версия 1 — статистика без расписания планировщика)
+    язык интерфейса (длина 1 байт + UTF-8)
+    last_card_id (4 байта)
+    настройки и прочие поля пользователя (длина 4 байта + JSON)
+    количество карточек (4 байта), затем карточки:
+        id (4 байта), флаги (1 байт), статистика (struct, если есть)
+        количество переводов (1 байт), затем язык (длина 1 байт + UTF-8)
+        и текст (длина 2 байта + UTF-8)
+
+Конвертация отдельного файла пользователя для отладки и резервных копий:
+    python -m utils.binary_format to-json <file.bin> [file.json]
+    python -m utils.binary_format from-json <file.json> [file.bin]
+"""
+
+import json
+import math
+import struct
+import sys
+from utils.constants import SM2_INITIAL_EASE
+
+MAGIC = b'T2L'
+VERSION = 2
+
+HEADER = struct.Struct('<3sB')
+U8 = struct.Struct('<B')
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+# id карточки и флаги
+CARD = struct.Struct('<IB')
+# total_attempts, correct_answers, wrong_answers, last_shown, last_result, correct_streak, wrong_streak,
+# ease, interval, due
+STATISTICS = struct.Struct('<IIIdbIIddd')
+# Статистика версии 1 (без ease, interval и due)
+STATISTICS_V1 = struct.Struct('<IIIdbII')
+
+HAS_STATISTICS = 1
+
+def _pack_str(value: str, length: struct.Struct) -> bytes:
+    """Упаковывает строку с префиксом длины"""
+    data = value.encode('utf-8')
+    return length.pack(len(data)) + data
+
+def pack_user(user: dict) -> bytes:
+    """Упаковывает данные пользователя в двоичный формат"""
+    # Карточки, язык и last_card_id пишем в двоичном виде, остальное — JSON-блоком
+    extra = {key: value for key, value in user.items() if key not in ('interface_lang', 'last_card_id', 'cards')}
+    extra_data = json.dumps(extra, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    cards = user.get('cards', [])
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION),
+        _pack_str(user.get('interface_lang') or '', U8),
+        U32.pack(user.get('last_card_id', 0)),
+        U32.pack(len(extra_data)), extra_data,
+        U32.pack(len(cards))
+    ]
+    for card in cards:
+        stats = card.get('statistics')
+        parts.append(CARD.pack(card['id'], HAS_STATISTICS if stats is not None else 0))
+        if stats is not None:
+            last_shown = stats.get('last_shown')
+            last_result = stats.get('last_result')
+            parts.append(STATISTICS.pack(
+                stats.get('total_attempts', 0),
+                stats.get('correct_answers', 0),
+                stats.get('wrong_answers', 0),
+                math.nan if last_shown is None else last_shown,
+                -1 if last_result is None else int(last_result),
+                stats.get('correct_streak', 0),
+                stats.get('wrong_streak', 0),
+                stats.get('ease', SM2_INITIAL_EASE),
+                stats.get('interval', 0),
+                math.nan if stats.get('due') is None else stats['due']
+            ))
+        translations = card.get('translations', {})
+        parts.append(U8.pack(len(translations)))
+        for lang, text in translations.items():
+            parts.append(_pack_str(lang, U8))
+            parts.append(_pack_str(text, U16))
+    return b''.join(parts)
+
+def unpack_user(data: bytes) -> dict:
+    """Распаковывает данные пользователя из двоичного формата"""
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ValueError(f"Unsupported binary user format: {magic!r} v{version}")
+    data = bytes(data)
+    position = HEADER.size
+
+    size = data[position]
+    interface_lang = data[position + 1:position + 1 + size].decode('utf-8')
+    position += 1 + size
+    last_card_id, extra_size = struct.unpack_from('<II', data, position)
+    position += 8
+    extra = json.loads(data[position:position + extra_size])
+    position += extra_size
+    (cards_count,) = U32.unpack_from(data, position)
+    position += U32.size
+
+    # Горячий цикл: локальные ссылки вместо обращений к атрибутам
+    unpack_card = CARD.unpack_from
+    statistics = STATISTICS if version == VERSION else STATISTICS_V1
+    unpack_stats = statistics.unpack_from
+    unpack_u16 = U16.unpack_from
+    isnan = math.isnan
+    cards = []
+    for _ in range(cards_count):
+        card_id, flags = unpack_card(data, position)
+        position += CARD.size
+        stats = None
+        if flags & HAS_STATISTICS:
+            (total, correct, wrong, last_shown, last_result,
+             correct_streak, wrong_streak, *schedule) = unpack_stats(data, position)
+            position += statistics.size
+            ease, interval, due = schedule or (SM2_INITIAL_EASE, 0, math.nan)
+            stats = {
+                'total_attempts': total,
+                'correct_answers': correct,
+                'wrong_answers': wrong,
+                'last_shown': None if isnan(last_shown) else last_shown,
+                'last_result': None if last_result < 0 else last_result == 1,
+                'correct_streak': correct_streak,
+                'wrong_streak': wrong_streak,
+                'ease': ease,
+                'interval': interval,
+                'due': None if isnan(due) else due
+            }
+        translations = {}
+        translations_count = data[position]
+        position += 1
+        for _ in range(translations_count):
+            size = data[position]
+            lang = data[position + 1:position + 1 + size].decode('utf-8')
+            position += 1 + size
+            (size,) = unpack_u16(data, position)
+            position += 2
+            translations[lang] = data[position:position + size].decode('utf-8')
+            position += size
+        card = {'id': card_id, 'translations': translations}
+        if stats is not None:
+            card['statistics'] = stats
+        cards.append(card)
+
+    user = {'interface_lang': interface_lang or None}
+    user.update(extra)
+    user['cards'] = cards
+    user['last_card_id'] = last_card_id
+    return user
+
+def is_binary(data: bytes) -> bool:
+    """Проверяет, записаны ли данные в двоичном формате"""
+    return data[:len(MAGIC)] == MAGIC
+
+def main():
+    if len(sys.argv) not in (3, 4) or sys.argv[1] not in ('to-json', 'from-json'):
+        print("Usage: python -m utils.binary_format to-json|from-json <source> [target]")
+        sys.exit(1)
+    command, source = sys.argv[1], sys.argv[2]
+
+    if command == 'to-json':
+        target = sys.argv[3] if len(sys.argv) == 4 else source.rsplit('.', 1)[0] + '.json'
+        with open(source, 'rb') as f:
+            user = unpack_user(f.read())
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(user, f, ensure_ascii=False, indent=4)
+    else:
+        target = sys.argv[3] if len(sys.argv) == 4 else source.rsplit('.', 1)[0] + '.bin'
+        with open(source, 'r', encoding='utf-8') as f:
+            user = json.load(f)
+        with open(target, 'wb') as f:
+            f.write(pack_user(user))
+    print(f"Converted {source} -> {target}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Компактный формат callback_data кнопок
+
+Строка кнопки: версия формата, однобуквенный код действия и аргументы через
+точку, числа — в base36. Например, edit_1234_en записывается как 1eya.en,
+а confirm_delete_1234 — как 1xya. Длина не зависит от имени действия и растет
+с id медленно, так что строка остается далеко от лимита Telegram в 64 байта.
+
+Коды действий нельзя переназначать: кнопки старых сообщений остаются в чатах.
+Новое действие получает свободный код, несовместимое изменение формата —
+новую версию.
+"""
+
+CALLBACK_VERSION = '1'
+SEPARATOR = '.'
+CALLBACK_DATA_LIMIT = 64
+
+# действие -> (код, типы аргументов)
+CALLBACK_ACTIONS = {
+    'back_to_menu': ('m', ()),
+    'change_language': ('L', ()),
+    'settings': ('s', ()),
+    'notifications': ('n', ()),
+    'my_cards': ('k', ()),
+    'learn': ('l', ()),
+    'add_card': ('a', ()),
+    'back_to_cards': ('K', ()),
+    'save_card': ('S', ()),
+    'add_translation_gpt': ('g', ()),
+    'save_gpt_cards': ('G', ()),
+    'save_all_gpt_cards': ('H', ()),
+    'back_to_add_card': ('A', ()),
+    'answer_correct': ('y', ()),
+    'answer_wrong': ('w', ()),
+    'extra_practice': ('E', ()),
+    'lang': ('i', (str,)),
+    'front': ('f', (str,)),
+    'back': ('b', (str,)),
+    'page': ('p', (int,)),
+    'add_translation': ('t', (str,)),
+    'card': ('c', (int,)),
+    'edit': ('e', (int, str)),
+    'delete': ('d', (int,)),
+    'confirm_delete': ('x', (int,)),
+    'back_to_card': ('C', (int,))
+}
+
+# код -> (действие, типы аргументов)
+_BY_CODE = {code: (action, types) for action, (code, types) in CALLBACK_ACTIONS.items()}
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+def _to_base36(number: int) -> str:
+    """Записывает целое число в base36"""
+    if number < 0:
+        return '-' + _to_base36(-number)
+    digits = []
+    while True:
+        number, digit = divmod(number, 36)
+        digits.append(_DIGITS[digit])
+        if not number:
+            return ''.join(reversed(digits))
+
+def pack(action: str, *args) -> str:
+    """Собирает callback_data кнопки для действия action с аргументами args"""
+    code, types = CALLBACK_ACTIONS[action]
+    if len(args) != len(types):
+        raise ValueError(f"Callback action {action} takes {len(types)} arguments, got {len(args)}")
+    parts = []
+    for value, kind in zip(args, types):
+        value = _to_base36(value) if kind is int else str(value)
+        if SEPARATOR in value:
+            raise ValueError(f"Callback argument {value!r} contains '{SEPARATOR}'")
+        parts.append(value)
+    data = CALLBACK_VERSION + code + SEPARATOR.join(parts)
+    if len(data.encode()) > CALLBACK_DATA_LIMIT:
+        raise ValueError(f"Callback data for {action} is longer than {CALLBACK_DATA_LIMIT} bytes")
+    return data
+
+def is_packed(data: str) -> bool:
+    """Проверяет, записана ли строка в компактном формате (старые строки начинаются с буквы)"""
+    return data[:1].isdigit()
+
+def unpack(data: str):
+    """Разбирает компактную callback_data в (действие, значения аргументов); None, если строка не разбирается"""
+    if data[:1] != CALLBACK_VERSION or len(data) < 2:
+        return None
+    entry = _BY_CODE.get(data[1])
+    if entry is None:
+        return None
+    action, types = entry
+    parts = data[2:].split(SEPARATOR) if types else []
+    if len(parts) != len(types) or (not types and len(data) > 2):
+        return None
+    try:
+        values = [int(part, 36) if kind is int else part for part, kind in zip(parts, types)]
+    except ValueError:
+        return None
+    return action, values
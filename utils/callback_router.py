@@ -0,0 +1,121 @@
+"""Табличная маршрутизация callback-запросов"""
+
+import inspect
+from aiogram.fsm.state import State
+from utils.callback_data import CALLBACK_ACTIONS, is_packed, pack, unpack
+
+class CallbackRouter:
+    """Таблица действий для callback_data.
+
+    Кнопки собираются в компактном формате utils.callback_data (pack), такая
+    строка разбирается по коду действия. Строки старого вида action или
+    action_arg1_arg2 (кнопки уже отправленных сообщений) тоже понимаются.
+    Строка callback_data разбирается один раз: действие без аргументов находится
+    поиском в словаре, действие с аргументами — проходом по префиксному дереву
+    частей строки (разделитель '_'), после чего аргументы приводятся к своим
+    типам. Для одного действия может быть несколько обработчиков с разными
+    состояниями FSM: сначала проверяются обработчики для текущего состояния,
+    затем обработчики без состояния.
+    """
+
+    def __init__(self):
+        # callback_data (в старом и компактном формате) -> действие без аргументов
+        self._exact = {}
+        # Дерево частей имени действия: часть -> [вложенные части, действие или None]
+        self._tree = {}
+        # действие -> (имена и типы аргументов, {состояние или None: обработчик})
+        self._actions = {}
+
+    def route(self, action: str, state=None, **args):
+        """Декоратор: обработчик действия action в состоянии state (None — в любом).
+
+        Аргументы задаются как имя=тип и передаются обработчику именованными
+        параметрами. Кроме них обработчик получает те из параметров callback,
+        action, state и данных диспетчера (например, repo), которые объявил.
+        """
+        if isinstance(state, State):
+            state = state.state
+
+        def decorator(handler):
+            spec, handlers = self._actions.setdefault(action, (tuple(args.items()), {}))
+            if spec != tuple(args.items()):
+                raise ValueError(f"Conflicting arguments for callback action {action}")
+            packed = CALLBACK_ACTIONS.get(action)
+            if packed is not None and packed[1] != tuple(args.values()):
+                raise ValueError(f"Arguments of callback action {action} do not match its packed format")
+            if state in handlers:
+                raise ValueError(f"Duplicate handler for callback action {action} in state {state}")
+            handlers[state] = (handler, _accepts(handler))
+            if args:
+                node = [self._tree, None]
+                for part in action.split('_'):
+                    node = node[0].setdefault(part, [{}, None])
+                node[1] = action
+            else:
+                self._exact[action] = action
+                if packed is not None:
+                    self._exact[pack(action)] = action
+            return handler
+        return decorator
+
+    def parse(self, data: str):
+        """Разбирает callback_data в (действие, аргументы); None, если действие неизвестно"""
+        action = self._exact.get(data)
+        if action is not None:
+            return action, {}
+
+        if is_packed(data):
+            unpacked = unpack(data)
+            if unpacked is None or unpacked[0] not in self._actions:
+                return None
+            action, values = unpacked
+            spec = self._actions[action][0]
+            return action, {name: value for (name, _), value in zip(spec, values)}
+
+        # Самое длинное действие, которому подходят оставшиеся части как аргументы
+        parts = data.split('_')
+        node = [self._tree, None]
+        matches = []
+        for position, part in enumerate(parts):
+            node = node[0].get(part)
+            if node is None:
+                break
+            if node[1] is not None:
+                matches.append((node[1], position + 1))
+        for action, position in reversed(matches):
+            spec = self._actions[action][0]
+            values = parts[position:]
+            if len(values) != len(spec):
+                continue
+            try:
+                return action, {name: convert(value) for (name, convert), value in zip(spec, values)}
+            except ValueError:
+                continue
+        return None
+
+    def resolve(self, data: str, state):
+        """Находит обработчик для callback_data в состоянии state: (обработчик, параметры, действие, аргументы)"""
+        parsed = self.parse(data)
+        if parsed is None:
+            return None
+        action, args = parsed
+        handlers = self._actions[action][1]
+        entry = handlers.get(state) or handlers.get(None)
+        if entry is None:
+            return None
+        return (*entry, action, args)
+
+    async def dispatch(self, callback, state, **data) -> bool:
+        """Вызывает обработчик callback-запроса; False, если подходящего обработчика нет"""
+        current_state = await state.get_state() if state is not None else None
+        resolved = self.resolve(callback.data or '', current_state)
+        if resolved is None:
+            return False
+        handler, accepts, action, args = resolved
+        available = {'callback': callback, 'action': action, 'state': state, **data}
+        await handler(**{name: available[name] for name in accepts if name in available}, **args)
+        return True
+
+def _accepts(handler) -> tuple:
+    """Имена параметров обработчика, которые передаются из контекста (кроме аргументов действия)"""
+    return tuple(inspect.signature(handler).parameters)
@@ -7,6 +7,77 @@ DATA_DIR = 'data'
 USER_DATA_FILE = os.path.join(DATA_DIR, 'user_data.json')
 DEFAULT_CARDS_FILE = os.path.join(DATA_DIR, 'default_cards.json')
 
+# Шардированное хранилище: каждый пользователь в отдельном файле
+USERS_DIR = os.path.join(DATA_DIR, 'users')
+USERS_INDEX_FILE = os.path.join(USERS_DIR, 'index.json')
+USER_BUCKETS = 256  # Количество подкаталогов-корзин для файлов пользователей
+SQLITE_DB_FILE = os.path.join(DATA_DIR, 'user_data.sqlite3')
+RECORDS_FILE = os.path.join(DATA_DIR, 'user_data.records')
+RECORDS_INDEX_FILE = os.path.join(DATA_DIR, 'user_data.idx')
+RECORDS_COMPACT_MIN_SIZE = 16 * 1024 * 1024  # Файл записей сжимается не раньше, чем дорастет до этого размера
+
+# Бэкенд хранилища: 'json' (файлы пользователей), 'sqlite' или 'records' (файл записей с индексом смещений)
+STORAGE_BACKEND = 'json'
+
+# Формат данных пользователя в бэкендах 'json' и 'records': 'json' или компактный 'binary'
+USER_DATA_FORMAT = 'json'
+
+# Журнал ответов: статистика дописывается в журнал и периодически сворачивается в снимок
+JOURNAL_ENABLED = True
+JOURNAL_FILE = os.path.join(DATA_DIR, 'reviews.journal')
+JOURNAL_FSYNC_BATCH = 32  # fsync после стольких записей
+JOURNAL_FSYNC_INTERVAL = 1.0  # и не реже, чем раз в столько секунд
+JOURNAL_COMPACT_INTERVAL = 300  # Сворачивание журнала раз в столько секунд
+JOURNAL_COMPACT_SIZE = 1024 * 1024  # или когда журнал вырос до стольких байт
+
+# Отложенная запись: изменения сбрасываются на диск в фоне
+WRITE_BEHIND_ENABLED = True
+WRITE_BEHIND_INTERVAL = 2.0  # Сброс раз в столько секунд
+WRITE_BEHIND_MAX_DIRTY = 100  # или сразу, когда столько пользователей ждут записи
+
+# Кэш пользователей в памяти: неактивные пользователи вытесняются при превышении любого из лимитов
+USER_CACHE_MAX_USERS = 10000
+USER_CACHE_MAX_CARDS = 1000000  # Суммарное число карточек в кэше (оценка занимаемой памяти)
+
+# Выбор следующей карточки: 'heap' (куча с инкрементальным обновлением)
+# или 'columns' (пакетный расчет приоритетов по колонкам, с NumPy, если он установлен)
+CARD_SELECTION_ENGINE = 'heap'
+
+# Планировщик повторений: 'sm2' (интервалы и сроки повторения в стиле SM-2)
+# или 'heuristic' (порядок по приоритетам calculate_priority, см. CARD_SELECTION_ENGINE)
+SCHEDULER = 'sm2'
+SM2_INITIAL_EASE = 2.5
+SM2_MIN_EASE = 1.3
+SM2_EASE_PENALTY = 0.2  # Снижение легкости карточки после ошибки
+SM2_FIRST_INTERVAL = 24 * 3600  # Интервал после первого правильного ответа подряд (секунды)
+SM2_SECOND_INTERVAL = 6 * 24 * 3600  # после второго; дальше интервал умножается на легкость
+SM2_RELEARN_INTERVAL = 10 * 60  # Повтор после ошибки
+
+# Сколько следующих карточек режима обучения выбирать и отрисовывать заранее
+LEARNING_LOOKAHEAD = 3
+
+# Порог похожести переводов (коэффициент Дайса по триграммам, 0-1), начиная с которого
+# карточка считается похожей на существующую при добавлении
+FUZZY_DUPLICATE_THRESHOLD = 0.75
+
+# Исходящие запросы к Bot API: запросов в секунду и размер всплеска — общий лимит бота
+# и лимит на один чат (для запросов с chat_id)
+OUTGOING_GLOBAL_RATE = 30
+OUTGOING_GLOBAL_BURST = 30
+OUTGOING_CHAT_RATE = 1
+OUTGOING_CHAT_BURST = 5
+OUTGOING_MAX_CHAT_BUCKETS = 10000  # Сверх этого числа забываются корзины чатов без очереди
+OUTGOING_RETRY_LIMIT = 3  # Сколько раз повторять запрос после ответа 429
+# Приоритеты запросов (меньше — раньше): ответ на нажатие кнопки ждет пользователь,
+# удаление старого сообщения может подождать
+OUTGOING_PRIORITIES = {
+    'answerCallbackQuery': 0,
+    'deleteMessage': 2
+}
+OUTGOING_DEFAULT_PRIORITY = 1
+# Запросы без ограничений (длинный опрос обновлений)
+OUTGOING_UNLIMITED_METHODS = {'getUpdates'}
+
 # Настройки по умолчанию
 DEFAULT_SETTINGS = {
     'daily_cards_limit': 20,
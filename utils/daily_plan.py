@@ -0,0 +1,116 @@
+"""План карточек на день с учетом настройки daily_cards_limit"""
+
+import datetime
+import math
+from collections import OrderedDict
+from itertools import islice
+from utils.constants import DEFAULT_SETTINGS
+
+def daily_limit(settings: dict) -> int:
+    """Дневной лимит карточек из настроек пользователя"""
+    return int(settings.get('daily_cards_limit', DEFAULT_SETTINGS['daily_cards_limit']))
+
+def day_bounds(now: float) -> tuple:
+    """Возвращает (день, начало дня, начало следующего дня) по местному времени"""
+    day = datetime.date.fromtimestamp(now)
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return day, start.timestamp(), (start + datetime.timedelta(days=1)).timestamp()
+
+class DailyPlan:
+    """Карточки, которые пользователь повторяет сегодня, поверх индекса выбора карточек.
+
+    План строится один раз в день: из индекса берется столько новых карточек и
+    карточек с наступившим сроком, сколько осталось от дневного лимита после
+    ответов, данных сегодня. Карточки плана показываются по порядку, выбор и
+    ответ стоят O(1): правильный ответ убирает карточку из плана, после ошибки
+    она переносится в конец. Когда план выполнен, выбор передается индексу;
+    бот показывает карточки сверх плана, только если пользователь согласился
+    на дополнительное повторение (extra_practice).
+    Интерфейс совпадает с индексами: select, peek, rank_key, stable_until,
+    update, remove.
+    """
+
+    def __init__(self, index, day: datetime.date, limit: int, cards: list):
+        self.index = index
+        self.day = day
+        self.limit = limit
+        # card_id -> (порядковый номер, карточка)
+        self._pending = OrderedDict()
+        self._sequence = 0
+        for card in cards:
+            self._append(card)
+        self.total = len(self._pending)
+        # Пользователь решил повторять карточки сверх выполненного плана
+        self.extra_practice = False
+
+    @classmethod
+    def build(cls, index, scheduler, cards: list, limit: int, now: float):
+        """Строит план на сегодня по индексу карточек (cards — все карточки индекса)"""
+        day, start, end = day_bounds(now)
+        reviewed = {card['id'] for card in cards if ((card.get('statistics') or {}).get('last_shown') or 0) >= start}
+        count = max(0, limit - len(reviewed))
+        planned = [
+            card for card in index.peek(count, reviewed)
+            if scheduler.is_due(card.get('statistics') or {}, end)
+        ] if count else []
+        return cls(index, day, limit, planned)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def remaining(self) -> int:
+        """Сколько карточек плана ещё не выучено сегодня"""
+        return len(self._pending)
+
+    @property
+    def done(self) -> bool:
+        """План выполнен, а дополнительное повторение не начато"""
+        return not self._pending and not self.extra_practice
+
+    def _append(self, card: dict):
+        """Ставит карточку в конец плана"""
+        self._sequence += 1
+        self._pending[card['id']] = (self._sequence, card)
+        self._pending.move_to_end(card['id'])
+
+    def select(self, exclude_id=None):
+        """Возвращает первую карточку плана, кроме exclude_id; после выполнения плана — выбор индекса"""
+        for card_id in islice(self._pending, 2):
+            if card_id != exclude_id:
+                return self._pending[card_id][1]
+        return self.index.select(exclude_id)
+
+    def peek(self, count: int, exclude=()) -> list:
+        """Возвращает до count следующих карточек плана (пока план не выполнен, только из плана)"""
+        if not self._pending:
+            return self.index.peek(count, exclude)
+        cards = (card for card_id, (_, card) in self._pending.items() if card_id not in exclude)
+        return list(islice(cards, count))
+
+    def rank_key(self, card_id: int):
+        """Ключ порядка показа: карточки плана идут раньше всех остальных"""
+        entry = self._pending.get(card_id)
+        if entry is not None:
+            return (0, entry[0], card_id)
+        key = self.index.rank_key(card_id)
+        return None if key is None else (1, *key)
+
+    def stable_until(self) -> float:
+        """Порядок карточек плана от времени не зависит"""
+        return math.inf if self._pending else self.index.stable_until()
+
+    def update(self, card: dict):
+        """Учитывает ответ на карточку плана и обновляет её в индексе"""
+        self.index.update(card)
+        if card['id'] not in self._pending:
+            return
+        if (card.get('statistics') or {}).get('last_result'):
+            del self._pending[card['id']]
+        else:
+            self._append(card)
+
+    def remove(self, card_id: int):
+        """Удаляет карточку из плана и индекса"""
+        self._pending.pop(card_id, None)
+        self.index.remove(card_id)
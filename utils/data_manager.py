@@ -1,53 +1,185 @@
 """Модуль для работы с данными пользователей"""
 
+import asyncio
 import json
 import os
-from utils.constants import DATA_DIR, USER_DATA_FILE, DEFAULT_CARDS_FILE
+from utils.constants import (
+    DATA_DIR, USER_DATA_FILE, SM2_INITIAL_EASE, JOURNAL_ENABLED, JOURNAL_FILE,
+    JOURNAL_FSYNC_BATCH, JOURNAL_FSYNC_INTERVAL, JOURNAL_COMPACT_INTERVAL, JOURNAL_COMPACT_SIZE,
+    WRITE_BEHIND_ENABLED, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_DIRTY
+)
+from utils.backends import create_backend
+from utils.default_deck import create_default_cards
+from utils.journal import ReviewJournal
+from utils.models import Deck, Statistics, to_cards
+from utils.write_behind import WriteBehindCache
 import time
 import random
 
+# Текущий бэкенд хранилища и журнал ответов (создаются при первом обращении)
+_backend = None
+_journal = None
+# Кэш отложенной записи (активен, пока запущена run_write_behind)
+_write_behind = None
+
+def get_backend():
+    """Возвращает бэкенд хранилища, выбранный в STORAGE_BACKEND"""
+    global _backend
+    if _backend is None:
+        ensure_data_dir()
+        _backend = create_backend()
+        
+        # Однократная миграция из монолитного файла
+        if os.path.exists(USER_DATA_FILE):
+            migrate_user_data_file(_backend)
+    return _backend
+
+def get_journal():
+    """Возвращает журнал ответов (None, если журнал выключен)"""
+    global _journal
+    if _journal is None and JOURNAL_ENABLED:
+        ensure_data_dir()
+        # При создании журнал восстанавливает несвернутые записи
+        _journal = ReviewJournal(JOURNAL_FILE, JOURNAL_FSYNC_BATCH)
+    return _journal
+
 def ensure_data_dir():
-    """Создает директорию для данных и инициализирует файлы, если они не существуют"""
-    # Создаем директорию, если её нет
+    """Создает директорию для данных, если её нет"""
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
-    
-    # Проверяем и инициализируем файл с данными пользователей
-    if not os.path.exists(USER_DATA_FILE):
-        with open(USER_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump({}, f, ensure_ascii=False, indent=4)
+
+def _write_user(user_id: str, user: dict):
+    """Синхронно записывает пользователя в бэкенд"""
+    journal = get_journal()
+    if journal:
+        journal.save_user(get_backend(), user_id, user)
+    else:
+        get_backend().save_user(user_id, user)
+
+def _write_statistics(user_id: str, stats_by_card: dict):
+    """Синхронно записывает статистику карточек в журнал или бэкенд"""
+    journal = get_journal()
+    if journal:
+        for card_id, stats in stats_by_card.items():
+            journal.append(user_id, card_id, stats)
+    else:
+        get_backend().update_statistics_batch(user_id, stats_by_card)
+
+def _write_batch(users: dict, statistics: dict):
+    """Записывает пачку отложенных изменений"""
+    for user_id, user in users.items():
+        _write_user(user_id, user)
+    for user_id, stats_by_card in statistics.items():
+        _write_statistics(user_id, stats_by_card)
+
+def _apply_pending_statistics(user_id: str, cards: list):
+    """Накладывает ещё не записанную статистику на карточки"""
+    if _write_behind:
+        pending = _write_behind.pending_statistics(user_id)
+        for card in cards:
+            if card['id'] in pending:
+                card['statistics'] = dict(pending[card['id']])
+
+def load_user(user_id: str):
+    """Загружает данные одного пользователя (None, если пользователя нет)"""
+    if _write_behind and (user := _write_behind.get(user_id)) is not None:
+        return user
+    user = get_backend().load_user(user_id)
+    if user is not None:
+        journal = get_journal()
+        if journal:
+            journal.apply(user_id, user)
+        _apply_pending_statistics(user_id, user.get('cards', []))
+        if 'cards' in user:
+            user['cards'] = Deck(to_cards(user['cards']))
+    return user
+
+def save_user(user_id: str, user: dict):
+    """Сохраняет данные одного пользователя (в фоне, если работает отложенная запись)"""
+    if _write_behind:
+        _write_behind.mark_dirty(user_id, user)
+    else:
+        _write_user(user_id, user)
+
+def save_card_statistics(user_id: str, card_id: int, stats: dict):
+    """Сохраняет статистику одной карточки после ответа"""
+    if _write_behind:
+        _write_behind.mark_statistics(user_id, card_id, stats)
     else:
-        # Проверяем, не пустой ли файл
-        if os.path.getsize(USER_DATA_FILE) == 0:
-            with open(USER_DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump({}, f, ensure_ascii=False, indent=4)
-
-def load_default_cards():
-    """Загружает шаблонные карточки из файла"""
-    if os.path.exists(DEFAULT_CARDS_FILE):
-        with open(DEFAULT_CARDS_FILE, 'r', encoding='utf-8') as f:
+        # С журналом это дозапись, снимок обновит фоновое сворачивание
+        _write_statistics(user_id, {card_id: stats})
+
+async def run_write_behind():
+    """Фоновая задача отложенной записи; при остановке сбрасывает все изменения"""
+    global _write_behind
+    if not WRITE_BEHIND_ENABLED:
+        return
+    _write_behind = WriteBehindCache(_write_batch, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_DIRTY)
+    try:
+        await _write_behind.run()
+    finally:
+        _write_behind = None
+
+def compact_journal():
+    """Сворачивает журнал ответов в основной снимок"""
+    journal = get_journal()
+    if journal:
+        journal.compact(get_backend())
+
+async def run_journal_compactor():
+    """Фоновая задача: пачечный fsync журнала и периодическое сворачивание в снимок"""
+    journal = get_journal()
+    if not journal:
+        return
+    last_compaction = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(JOURNAL_FSYNC_INTERVAL)
+            await asyncio.to_thread(journal.sync)
+            if (journal.size() >= JOURNAL_COMPACT_SIZE
+                    or time.monotonic() - last_compaction >= JOURNAL_COMPACT_INTERVAL):
+                await asyncio.to_thread(journal.compact, get_backend())
+                last_compaction = time.monotonic()
+    finally:
+        # При остановке бота сворачиваем всё, что накопилось
+        journal.compact(get_backend())
+        journal.sync()
+
+def migrate_user_data_file(backend):
+    """Импортирует данные из монолитного user_data.json в бэкенд"""
+    try:
+        with open(USER_DATA_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            return data.get('cards', [])
-    return []
-
-def load_user_data():
-    """Загружает данные пользователей из файла"""
-    ensure_data_dir()
-    with open(USER_DATA_FILE, 'r', encoding='utf-8') as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-
-def save_user_data(data):
-    """Сохраняет данные пользователей в файл"""
-    ensure_data_dir()
-    with open(USER_DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    except json.JSONDecodeError:
+        data = {}
+    
+    for user_id, user in data.items():
+        backend.save_user(user_id, user)
+    
+    # Старый файл оставляем как резервную копию, чтобы миграция не повторялась
+    os.replace(USER_DATA_FILE, f"{USER_DATA_FILE}.migrated")
+    print(f"Migrated {len(data)} users from {USER_DATA_FILE}")
+
+def create_statistics():
+    """Создает начальную статистику для карточки"""
+    return Statistics(
+        total_attempts=0,
+        correct_answers=0,
+        wrong_answers=0,
+        last_shown=None,
+        last_result=None,
+        correct_streak=0,
+        wrong_streak=0,
+        # Расписание планировщика: легкость, последний интервал (секунды) и срок повторения
+        ease=SM2_INITIAL_EASE,
+        interval=0,
+        due=None
+    )
 
 def create_user(user_id: str, language: str) -> dict:
     """Создает структуру данных для нового пользователя"""
-    default_cards = load_default_cards()
+    # Переводы шаблонных карточек общие для всех пользователей, файл колоды читается один раз
+    default_cards = create_default_cards()
     
     # Устанавливаем языки карточек в зависимости от выбранного языка интерфейса
     if language == 'ru':
@@ -69,32 +201,34 @@ def create_user(user_id: str, language: str) -> dict:
             'front_languages': front_lang,
             'back_languages': back_lang
         },
-        'cards': default_cards,
-        'last_card_id': len(default_cards)
+        'cards': Deck(default_cards),
+        'last_card_id': max((card['id'] for card in default_cards), default=0)
     } 
 
-def calculate_priority(card, last_card_id=None):
-    """Вычисляет приоритет карточки для показа"""
+# Баллы за давность показа: новая карточка и пороги в часах (от большего к меньшему)
+NEW_CARD_PRIORITY = 30
+RECENCY_PRIORITY = ((12, 20), (1, 10))
+# Верхняя граница случайного фактора
+RANDOM_PRIORITY = 35
+
+def recency_priority(stats, current_time):
+    """Баллы за давность показа карточки (0-30)"""
+    if stats['last_shown'] is None:  # Новая карточка
+        return NEW_CARD_PRIORITY
+    hours_since_last = (current_time - stats['last_shown']) / 3600
+    for hours, priority in RECENCY_PRIORITY:
+        if hours_since_last > hours:
+            return priority
+    return 0
+
+def error_priority(stats):
+    """Баллы за ошибки и стрик ошибок (0-45), меняются только после ответа"""
     priority = 0
-    current_time = time.time()
-    
-    # Если это та же карточка, что была показана последней - исключаем её
-    if last_card_id and card['id'] == last_card_id:
-        return -1
-    
-    # Базовый приоритет на основе времени (0-30 баллов)
-    hours_since_last = (current_time - (card['statistics']['last_shown'] or 0)) / 3600
-    if card['statistics']['last_shown'] is None:  # Новая карточка
-        priority += 30
-    elif hours_since_last > 12:    # Давно не показывали
-        priority += 20
-    elif hours_since_last > 1:     # Показывали недавно
-        priority += 10
     
     # Фактор ошибок (0-30 баллов)
-    total = card['statistics']['total_attempts']
+    total = stats['total_attempts']
     if total > 0:
-        error_rate = card['statistics']['wrong_answers'] / total
+        error_rate = stats['wrong_answers'] / total
         if error_rate > 0.5:          # Больше 50% ошибок
             priority += 30
         elif error_rate > 0.3:        # Больше 30% ошибок
@@ -103,46 +237,23 @@ def calculate_priority(card, last_card_id=None):
             priority += 10
     
     # Фактор стрика ошибок (0-15 баллов)
-    if card['statistics']['wrong_streak'] >= 2:
+    if stats['wrong_streak'] >= 2:
         priority += 15
-    elif card['statistics']['wrong_streak'] == 1:
+    elif stats['wrong_streak'] == 1:
         priority += 7
     
-    # Случайный фактор (0-35 баллов)
-    priority += random.randint(0, 35)
-    
-    return priority 
+    return priority
 
-def select_next_card(user_id, current_card_id=None, user_data=None):
-    """Выбирает следующую карточку для показа"""
-    if not user_data:
-        user_data = load_user_data()
-        
-    cards = user_data[user_id]['cards']
-    
-    # Если карточек нет, возвращаем None
-    if not cards:
-        return None
-        
-    # Если карточка всего одна, возвращаем её
-    if len(cards) == 1:
-        return cards[0]
-    
-    # Вычисляем приоритеты для всех карточек
-    cards_with_priority = [
-        (card, calculate_priority(card, current_card_id))
-        for card in cards
-    ]
-    
-    # Сортируем по приоритету (исключая карточки с приоритетом -1)
-    valid_cards = [(c, p) for c, p in cards_with_priority if p >= 0]
+def calculate_priority(card, last_card_id=None):
+    """Вычисляет приоритет карточки для показа"""
+    # Если это та же карточка, что была показана последней - исключаем её
+    if last_card_id and card['id'] == last_card_id:
+        return -1
     
-    # Если все карточки имеют приоритет -1, сбрасываем исключение последней карточки
-    if not valid_cards:
-        valid_cards = [(c, calculate_priority(c)) for c in cards]
+    stats = card['statistics']
+    priority = recency_priority(stats, time.time()) + error_priority(stats)
     
-    # Сортируем по приоритету
-    valid_cards.sort(key=lambda x: x[1], reverse=True)
+    # Случайный фактор (0-35 баллов)
+    priority += random.randint(0, RANDOM_PRIORITY)
     
-    # Возвращаем карточку с наивысшим приоритетом
-    return valid_cards[0][0] 
\ No newline at end of file
+    return priority
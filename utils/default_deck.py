@@ -0,0 +1,79 @@
+"""Общая колода шаблонных карточек
+
+Шаблонные карточки загружаются из default_cards.json один раз и разделяются
+всеми пользователями. В хранилище у пользователя остаются только отличия от
+общей колоды: изменённые или уже показанные шаблонные карточки сохраняются
+как обычные карточки, а удалённые перечисляются в deleted_default_cards.
+Словари переводов шаблонных карточек общие и не изменяются на месте —
+при редактировании карточке назначается новый словарь.
+"""
+
+import json
+import os
+from utils.constants import DEFAULT_CARDS_FILE
+from utils.models import Card
+
+# Поле записи пользователя со списком удалённых шаблонных карточек
+DELETED_FIELD = 'deleted_default_cards'
+
+# id -> общий словарь переводов (загружается один раз)
+_default_translations = None
+
+def get_default_translations() -> dict:
+    """Возвращает переводы шаблонных карточек, загружая файл только при первом обращении"""
+    global _default_translations
+    if _default_translations is None:
+        cards = []
+        if os.path.exists(DEFAULT_CARDS_FILE):
+            with open(DEFAULT_CARDS_FILE, 'r', encoding='utf-8') as f:
+                cards = json.load(f).get('cards', [])
+        _default_translations = {card['id']: card['translations'] for card in cards}
+    return _default_translations
+
+def create_default_card(card_id: int) -> Card:
+    """Создает карточку пользователя из общей колоды (переводы разделяются, статистика своя)"""
+    from utils.data_manager import create_statistics
+    return Card(id=card_id, translations=get_default_translations()[card_id], statistics=create_statistics())
+
+def create_default_cards(exclude=()) -> list:
+    """Создает карточки пользователя из общей колоды, кроме перечисленных в exclude"""
+    return [create_default_card(card_id) for card_id in get_default_translations() if card_id not in exclude]
+
+def _is_untouched(card: dict) -> bool:
+    """Проверяет, совпадает ли карточка с шаблонной и не показывалась ли она"""
+    translations = get_default_translations().get(card['id'])
+    stats = card.get('statistics') or {}
+    return (
+        translations is not None
+        and card['translations'] == translations
+        and not stats.get('total_attempts')
+        and stats.get('last_shown') is None
+    )
+
+def pack_user(user: dict) -> dict:
+    """Готовит пользователя к сохранению: убирает нетронутые шаблонные карточки"""
+    cards = user.get('cards', [])
+    card_ids = {card['id'] for card in cards}
+    record = dict(user)
+    record['cards'] = [card for card in cards if not _is_untouched(card)]
+    record[DELETED_FIELD] = [card_id for card_id in get_default_translations() if card_id not in card_ids]
+    return record
+
+def unpack_user(record: dict) -> dict:
+    """Восстанавливает полный список карточек пользователя из записи хранилища"""
+    if DELETED_FIELD not in record:
+        # Старая запись с полными копиями шаблонных карточек
+        return record
+    user = dict(record)
+    deleted = set(user.pop(DELETED_FIELD))
+    stored = user.get('cards', [])
+    stored_ids = {card['id'] for card in stored}
+    defaults = create_default_cards(exclude=deleted | stored_ids)
+    if defaults:
+        user['cards'] = sorted(stored + defaults, key=lambda card: card['id'])
+    return user
+
+def visible_default_ids(deleted) -> list:
+    """Возвращает id шаблонных карточек, которые пользователь не удалял"""
+    deleted = set(deleted)
+    return [card_id for card_id in get_default_translations() if card_id not in deleted]
@@ -0,0 +1,180 @@
+"""Индекс карточек пользователя для выбора следующей карточки за O(log n)"""
+
+import heapq
+import math
+import random
+import time
+from utils.data_manager import (
+    NEW_CARD_PRIORITY, RECENCY_PRIORITY, RANDOM_PRIORITY,
+    create_statistics, error_priority, recency_priority
+)
+
+# Баллы за давность образуют несколько уровней, внутри уровня порядок не зависит от времени
+TIERS = (NEW_CARD_PRIORITY, *(priority for _, priority in RECENCY_PRIORITY), 0)
+
+class DueIndex:
+    """Приоритетная очередь карточек одного пользователя.
+
+    Приоритет карточки из calculate_priority раскладывается на баллы за давность
+    показа (уровень) и остаток — ошибки, стрик ошибок и случайный фактор, который
+    вычисляется при изменении статистики карточки. Для каждого уровня есть
+    max-куча по остатку, а отдельная min-куча хранит моменты, когда карточка
+    переходит на следующий уровень давности. Выбор карточки сравнивает вершины
+    нескольких куч; устаревшие записи удаляются лениво по номеру версии.
+    """
+
+    def __init__(self, cards: list):
+        # уровень -> куча (-остаток, card_id, версия)
+        self._heaps = {tier: [] for tier in TIERS}
+        # (момент перехода, card_id, версия)
+        self._promotions = []
+        # card_id -> (версия, уровень, остаток)
+        self._entries = {}
+        self._cards = {}
+        self._version = 0
+
+        now = time.time()
+        for card in cards:
+            self._insert(card, now)
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        heapq.heapify(self._promotions)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, card: dict, now: float, push=list.append):
+        """Добавляет карточку с новой версией (по умолчанию без восстановления свойства кучи)"""
+        stats = card.get('statistics') or create_statistics()
+        score = error_priority(stats) + random.randint(0, RANDOM_PRIORITY)
+        self._version += 1
+        card_id = card['id']
+        tier = recency_priority(stats, now)
+        self._entries[card_id] = (self._version, tier, score)
+        self._cards[card_id] = card
+        push(self._heaps[tier], (-score, card_id, self._version))
+        self._schedule_promotion(card_id, self._version, stats['last_shown'], now, push)
+
+    def _schedule_promotion(self, card_id: int, version: int, last_shown, now: float, push=heapq.heappush):
+        """Запоминает ближайший момент перехода карточки на более высокий уровень давности"""
+        if last_shown is None:
+            return
+        hours_since_last = (now - last_shown) / 3600
+        for hours, _ in reversed(RECENCY_PRIORITY):
+            if hours_since_last <= hours:
+                push(self._promotions, (last_shown + hours * 3600, card_id, version))
+                return
+
+    def _promote(self, now: float):
+        """Переносит карточки, которые давно не показывались, на их текущий уровень"""
+        promotions = self._promotions
+        while promotions and promotions[0][0] < now:
+            _, card_id, version = heapq.heappop(promotions)
+            entry = self._entries.get(card_id)
+            if entry is None or entry[0] != version:
+                continue
+            stats = self._cards[card_id].get('statistics') or create_statistics()
+            tier = recency_priority(stats, now)
+            self._entries[card_id] = (version, tier, entry[2])
+            heapq.heappush(self._heaps[tier], (-entry[2], card_id, version))
+            self._schedule_promotion(card_id, version, stats['last_shown'], now)
+
+    def _is_current(self, tier: int, item: tuple) -> bool:
+        """Проверяет, что запись кучи соответствует текущей версии карточки"""
+        entry = self._entries.get(item[1])
+        return entry is not None and entry[0] == item[2] and entry[1] == tier
+
+    def _top(self, tier: int, exclude_id):
+        """Возвращает лучшую актуальную запись уровня, пропуская exclude_id"""
+        heap = self._heaps[tier]
+        while heap and not self._is_current(tier, heap[0]):
+            heapq.heappop(heap)
+        if not heap or heap[0][1] != exclude_id:
+            return heap[0] if heap else None
+
+        # Вершина исключена — временно снимаем её и смотрим следующую
+        excluded = heapq.heappop(heap)
+        while heap and not self._is_current(tier, heap[0]):
+            heapq.heappop(heap)
+        top = heap[0] if heap else None
+        heapq.heappush(heap, excluded)
+        return top
+
+    def select(self, exclude_id=None):
+        """Возвращает карточку с наибольшим приоритетом, кроме exclude_id (None, если карточек нет)"""
+        if not self._entries:
+            return None
+        if len(self._entries) == 1:
+            return next(iter(self._cards.values()))
+
+        self._promote(time.time())
+        best = None
+        for tier in TIERS:
+            top = self._top(tier, exclude_id)
+            if top is None:
+                continue
+            # При равном приоритете выигрывает карточка, добавленная раньше
+            key = (tier - top[0], -top[1])
+            if best is None or key > best[0]:
+                best = (key, top[1])
+        if best is None:
+            # Кроме исключенной карточки выбирать не из чего
+            return self._cards.get(exclude_id)
+        return self._cards[best[1]]
+
+    def rank_key(self, card_id: int):
+        """Ключ порядка показа карточки: меньший ключ показывается раньше"""
+        entry = self._entries.get(card_id)
+        if entry is None:
+            return None
+        return (-(entry[1] + entry[2]), card_id)
+
+    def stable_until(self) -> float:
+        """Момент, до которого порядок карточек не меняется сам по себе (ближайший переход уровня)"""
+        return self._promotions[0][0] if self._promotions else math.inf
+
+    def peek(self, count: int, exclude=()) -> list:
+        """Возвращает до count карточек в порядке показа, пропуская exclude (кучи не меняются)"""
+        self._promote(time.time())
+        candidates = []
+        for tier in TIERS:
+            heap = self._heaps[tier]
+            taken = []
+            found = 0
+            while heap and found < count:
+                item = heapq.heappop(heap)
+                if not self._is_current(tier, item):
+                    continue
+                taken.append(item)
+                if item[1] not in exclude:
+                    candidates.append((item[0] - tier, item[1]))
+                    found += 1
+            for item in taken:
+                heapq.heappush(heap, item)
+        candidates.sort()
+        return [self._cards[card_id] for _, card_id in candidates[:count]]
+
+    def update(self, card: dict):
+        """Пересчитывает карточку после изменения её статистики или добавления"""
+        self._insert(card, time.time(), heapq.heappush)
+        self._maybe_rebuild()
+
+    def remove(self, card_id: int):
+        """Удаляет карточку из индекса (записи в кучах удаляются лениво)"""
+        self._entries.pop(card_id, None)
+        self._cards.pop(card_id, None)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        """Перестраивает кучи, когда устаревших записей становится больше актуальных"""
+        stored = sum(len(heap) for heap in self._heaps.values())
+        if stored <= 2 * len(self._entries) + 64:
+            return
+        for tier in TIERS:
+            self._heaps[tier] = []
+        for card_id, (version, tier, score) in self._entries.items():
+            self._heaps[tier].append((-score, card_id, version))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        self._promotions = [item for item in self._promotions if self._entries.get(item[1], (None,))[0] == item[2]]
+        heapq.heapify(self._promotions)
@@ -0,0 +1,235 @@
+"""Индексы переводов карточек пользователя для поиска дубликатов и похожих карточек"""
+
+import math
+import unicodedata
+from collections import Counter
+from itertools import chain
+from utils.constants import FUZZY_DUPLICATE_THRESHOLD
+
+# Языки, по которым сравниваются карточки целиком
+CARD_LANGUAGES = ('ru', 'en', 'es', 'ro')
+
+# Артикли, которые отбрасываются в начале перевода при поиске похожих
+ARTICLES = {
+    'en': ('the', 'a', 'an'),
+    'es': ('el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas'),
+    'ro': ('un', 'o', 'niste')
+}
+
+def normalize_text(text: str) -> str:
+    """Приводит перевод к виду, в котором сравниваются дубликаты"""
+    return text.strip().lower()
+
+def card_signature(translations: dict) -> tuple:
+    """Ключ карточки целиком: нормализованные переводы на все языки (пустая строка, если перевода нет)"""
+    return tuple(normalize_text(translations.get(lang) or '') for lang in CARD_LANGUAGES)
+
+def _fold_char(char: str) -> str:
+    """Снимает диакритику с латинской буквы (ț -> t, ñ -> n); остальные символы не меняются"""
+    if char.isascii():
+        return char
+    if char == 'ё':
+        return 'е'
+    decomposed = unicodedata.normalize('NFKD', char)
+    if decomposed[0].isascii():
+        return ''.join(part for part in decomposed if not unicodedata.combining(part))
+    return char
+
+def fold_text(text: str, lang: str = None) -> str:
+    """Приводит перевод к виду для поиска похожих: без регистра, диакритики, пунктуации и начального артикля"""
+    text = unicodedata.normalize('NFC', text).casefold()
+    text = ''.join(_fold_char(char) if char.isalnum() else ' ' for char in text)
+    words = text.split()
+    if len(words) > 1 and words[0] in ARTICLES.get(lang, ()):
+        words = words[1:]
+    return ' '.join(words)
+
+def trigrams(text: str) -> set:
+    """Триграммы строки, дополненной пробелами по краям"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Триграммный индекс переводов на один язык: поиск похожих строк по коэффициенту Дайса.
+
+    Похожесть двух строк — 2·|общие триграммы| / (|триграммы A| + |триграммы B|).
+    Из порога следуют границы числа триграмм кандидата, поэтому списки
+    карточек по триграмме разложены по числу триграмм строки и просматриваются
+    только подходящие по размеру. Для каждого размера кандидат обязан делить
+    с запросом хотя бы одну из самых редких триграмм запроса (префиксная
+    фильтрация): кандидаты собираются только по спискам редких триграмм,
+    а их общие триграммы досчитываются пересечением с остальными списками.
+    """
+
+    def __init__(self):
+        # триграмма -> число триграмм строки -> множество card_id
+        self._postings = {}
+        # card_id -> (свернутый перевод, число триграмм)
+        self._texts = {}
+
+    def add(self, card_id: int, text: str):
+        """Добавляет свернутый перевод карточки"""
+        grams = trigrams(text)
+        size = len(grams)
+        self._texts[card_id] = (text, size)
+        for gram in grams:
+            self._postings.setdefault(gram, {}).setdefault(size, set()).add(card_id)
+
+    def remove(self, card_id: int):
+        """Удаляет перевод карточки"""
+        entry = self._texts.pop(card_id, None)
+        if entry is None:
+            return
+        text, size = entry
+        for gram in trigrams(text):
+            buckets = self._postings[gram]
+            ids = buckets[size]
+            ids.discard(card_id)
+            if not ids:
+                del buckets[size]
+                if not buckets:
+                    del self._postings[gram]
+
+    def text(self, card_id: int):
+        """Свернутый перевод карточки (None, если его нет)"""
+        entry = self._texts.get(card_id)
+        return entry[0] if entry else None
+
+    def similar(self, text: str, threshold: float) -> dict:
+        """Возвращает {card_id: похожесть} для переводов с похожестью не ниже threshold"""
+        grams = trigrams(text)
+        size = len(grams)
+        gram_buckets = [buckets for buckets in map(self._postings.get, grams) if buckets]
+        # Границы числа триграмм кандидата, при которых порог достижим
+        min_size = math.ceil(threshold * size / (2 - threshold) - 1e-9)
+        max_size = math.floor((2 - threshold) * size / threshold + 1e-9)
+
+        found = {}
+        for other_size in range(min_size, max_size + 1):
+            lists = sorted(
+                (buckets[other_size] for buckets in gram_buckets if other_size in buckets), key=len
+            )
+            if not lists:
+                continue
+            # Сколько общих триграмм нужно для порога; триграммы запроса, которых нет в
+            # индексе, занимают начало префикса и кандидатов не дают
+            min_shared = math.ceil(threshold * (size + other_size) / 2 - 1e-9)
+            prefix = size - min_shared + 1 - (size - len(lists))
+            if prefix <= 0:
+                continue
+            # Кандидаты и число их общих триграмм: по спискам префикса, затем пересечением с остальными
+            shared = Counter(chain.from_iterable(lists[:prefix]))
+            for ids in lists[prefix:]:
+                shared.update(ids.intersection(shared))
+            for card_id, count in shared.items():
+                if count >= min_shared:
+                    found[card_id] = 2 * count / (size + other_size)
+        return found
+
+class DuplicateIndex:
+    """Нормализованные переводы карточек одного пользователя.
+
+    Для каждого языка хранится счетчик переводов, а для карточек целиком —
+    счетчик ключей card_signature, поэтому проверка дубликата — поиск в
+    словаре вместо перебора карточек. Похожие переводы (другой регистр,
+    диакритика, пунктуация, артикль, опечатка) ищутся по триграммным индексам
+    свернутых переводов. Индекс обновляется при добавлении, изменении и
+    удалении карточек.
+    """
+
+    def __init__(self, cards, threshold: float = FUZZY_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        # язык -> нормализованный перевод -> число карточек
+        self._texts = {}
+        # ключ карточки -> число карточек
+        self._signatures = Counter()
+        # card_id -> ключ карточки, с которым она учтена
+        self._cards = {}
+        # язык -> триграммный индекс свернутых переводов
+        self._fuzzy = {lang: TrigramIndex() for lang in CARD_LANGUAGES}
+        for card in cards:
+            self.update(card)
+
+    def update(self, card: dict):
+        """Учитывает добавленную или изменённую карточку"""
+        self.remove(card['id'])
+        signature = card_signature(card['translations'])
+        self._cards[card['id']] = signature
+        self._signatures[signature] += 1
+        for lang, text in zip(CARD_LANGUAGES, signature):
+            if text:
+                self._texts.setdefault(lang, Counter())[text] += 1
+                self._fuzzy[lang].add(card['id'], fold_text(text, lang))
+
+    def remove(self, card_id: int):
+        """Забывает карточку"""
+        signature = self._cards.pop(card_id, None)
+        if signature is None:
+            return
+        self._signatures[signature] -= 1
+        if not self._signatures[signature]:
+            del self._signatures[signature]
+        for lang, text in zip(CARD_LANGUAGES, signature):
+            if text:
+                self._fuzzy[lang].remove(card_id)
+                texts = self._texts[lang]
+                texts[text] -= 1
+                if not texts[text]:
+                    del texts[text]
+
+    def has_translation(self, lang: str, text: str) -> bool:
+        """Проверяет, есть ли у какой-нибудь карточки такой перевод на язык lang"""
+        return normalize_text(text) in self._texts.get(lang, ())
+
+    def similar_translation(self, lang: str, text: str):
+        """Возвращает card_id карточки с самым похожим переводом на язык lang (None, если похожих нет)"""
+        index = self._fuzzy.get(lang)
+        folded = fold_text(text, lang)
+        if index is None or not folded:
+            return None
+        found = index.similar(folded, self.threshold)
+        return max(found, key=found.get) if found else None
+
+    def similar_cards(self, translations: dict) -> set:
+        """Карточки, похожие на переданную на всех общих языках (хотя бы на одном)"""
+        return _similar_cards(self._fuzzy, translations, self.threshold)
+
+    def has_card(self, translations: dict) -> bool:
+        """Проверяет, есть ли карточка с такими же переводами на все языки"""
+        return card_signature(translations) in self._signatures
+
+    def split_new(self, translations_list: list) -> tuple:
+        """Делит карточки на (новые, дубликаты, похожие) относительно существующих карточек и уже встреченных в списке"""
+        seen = set()
+        # Принятые карточки списка, чтобы находить похожие внутри него
+        batch = {lang: TrigramIndex() for lang in CARD_LANGUAGES}
+        new_cards = []
+        duplicates = []
+        similar = []
+        for translations in translations_list:
+            signature = card_signature(translations)
+            if signature in self._signatures or signature in seen:
+                duplicates.append(translations)
+                continue
+            seen.add(signature)
+            if self.similar_cards(translations) or _similar_cards(batch, translations, self.threshold):
+                similar.append(translations)
+            else:
+                for lang, text in zip(CARD_LANGUAGES, signature):
+                    if text:
+                        batch[lang].add(len(new_cards), fold_text(text, lang))
+                new_cards.append(translations)
+        return new_cards, duplicates, similar
+
+def _similar_cards(fuzzy: dict, translations: dict, threshold: float) -> set:
+    """Карточки из триграммных индексов fuzzy, похожие на переводы на всех общих языках"""
+    matches = {}
+    for lang in CARD_LANGUAGES:
+        folded = fold_text(translations.get(lang) or '', lang)
+        if folded:
+            matches[lang] = fuzzy[lang].similar(folded, threshold)
+    candidates = set().union(*matches.values())
+    return {
+        card_id for card_id in candidates
+        if all(card_id in found for lang, found in matches.items() if fuzzy[lang].text(card_id) is not None)
+    }
@@ -0,0 +1,253 @@
+"""Журнал ответов: статистика карточек дописывается записями фиксированного размера"""
+
+import math
+import os
+import struct
+import threading
+import zlib
+from utils.constants import SM2_INITIAL_EASE
+
+# Заголовок файла журнала; файлы без заголовка записаны в версии 1
+HEADER = struct.Struct('<4sB')
+MAGIC = b'T2LJ'
+VERSION = 2
+
+# user_id, card_id, total_attempts, correct_answers, wrong_answers,
+# last_shown, last_result, correct_streak, wrong_streak, ease, interval, due + crc32 записи
+ENTRY = struct.Struct('<qIIIIdbIIddd')
+CRC = struct.Struct('<I')
+ENTRY_SIZE = ENTRY.size + CRC.size
+# Запись версии 1 (без ease, interval и due)
+ENTRY_V1 = struct.Struct('<qIIIIdbII')
+
+# card_id = 0 — маркер полного сохранения пользователя: более ранние записи неактуальны
+USER_SAVED = 0
+
+def pack_entry(user_id: str, card_id: int, stats: dict) -> bytes:
+    """Упаковывает статистику карточки в запись журнала"""
+    last_shown = stats.get('last_shown')
+    last_result = stats.get('last_result')
+    body = ENTRY.pack(
+        int(user_id),
+        card_id,
+        stats.get('total_attempts', 0),
+        stats.get('correct_answers', 0),
+        stats.get('wrong_answers', 0),
+        math.nan if last_shown is None else last_shown,
+        -1 if last_result is None else int(last_result),
+        stats.get('correct_streak', 0),
+        stats.get('wrong_streak', 0),
+        stats.get('ease', SM2_INITIAL_EASE),
+        stats.get('interval', 0),
+        math.nan if stats.get('due') is None else stats['due']
+    )
+    return body + CRC.pack(zlib.crc32(body))
+
+def unpack_entry(data: bytes, entry: struct.Struct = ENTRY):
+    """Распаковывает запись журнала, возвращает (user_id, card_id, stats) или None при повреждении"""
+    body, (crc,) = data[:entry.size], CRC.unpack(data[entry.size:])
+    if zlib.crc32(body) != crc:
+        return None
+    (user_id, card_id, total, correct, wrong,
+     last_shown, last_result, correct_streak, wrong_streak, *schedule) = entry.unpack(body)
+    ease, interval, due = schedule or (SM2_INITIAL_EASE, 0, math.nan)
+    stats = {
+        'total_attempts': total,
+        'correct_answers': correct,
+        'wrong_answers': wrong,
+        'last_shown': None if math.isnan(last_shown) else last_shown,
+        'last_result': None if last_result < 0 else bool(last_result),
+        'correct_streak': correct_streak,
+        'wrong_streak': wrong_streak,
+        'ease': ease,
+        'interval': interval,
+        'due': None if math.isnan(due) else due
+    }
+    return str(user_id), card_id, stats
+
+def _file_format(data: bytes):
+    """Определяет формат файла журнала, возвращает (структура записи, смещение первой записи)"""
+    if data[:len(MAGIC)] == MAGIC:
+        return ENTRY, HEADER.size
+    return ENTRY_V1, 0
+
+def read_entries(path: str):
+    """Читает записи журнала; на оборванном или поврежденном хвосте чтение прекращается"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return
+    entry_struct, start = _file_format(data)
+    entry_size = entry_struct.size + CRC.size
+    for offset in range(start, len(data) - entry_size + 1, entry_size):
+        entry = unpack_entry(data[offset:offset + entry_size], entry_struct)
+        if entry is None:
+            return
+        yield entry
+
+class ReviewJournal:
+    """Журнал изменений статистики, который периодически сворачивается в основной снимок.
+
+    Пока записи не свернуты, последняя статистика каждой карточки хранится в памяти
+    (overlay) и накладывается на данные, загруженные из бэкенда.
+    """
+
+    def __init__(self, path: str, fsync_batch: int):
+        self.path = path
+        self.compacting_path = f"{path}.compacting"
+        self.fsync_batch = fsync_batch
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._unsynced = 0
+        # user_id -> {card_id: (поколение, статистика)}
+        self._overlay = {}
+
+        # Быстрое восстановление: сначала незавершенное сворачивание, затем основной журнал
+        for journal_path in (self.compacting_path, self.path):
+            for user_id, card_id, stats in read_entries(journal_path):
+                self._remember(user_id, card_id, stats)
+
+        self._prepare_file()
+        self._file = open(self.path, 'ab')
+
+    def _prepare_file(self):
+        """Готовит основной файл к дозаписи: создает заголовок, переписывает журнал версии 1
+        в текущем формате и обрезает поврежденный хвост"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION))
+            return
+
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if header != HEADER.pack(MAGIC, VERSION):
+            entries = list(read_entries(self.path))
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION))
+                for user_id, card_id, stats in entries:
+                    f.write(pack_entry(user_id, card_id, stats))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            return
+
+        # Обрезаем поврежденный хвост, чтобы новые записи шли с границы записи
+        size = os.path.getsize(self.path)
+        valid = HEADER.size + sum(1 for _ in read_entries(self.path)) * ENTRY_SIZE
+        if valid != size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid)
+
+    def _remember(self, user_id: str, card_id: int, stats: dict):
+        """Запоминает запись в overlay"""
+        if card_id == USER_SAVED:
+            self._overlay.pop(user_id, None)
+        else:
+            self._overlay.setdefault(user_id, {})[card_id] = (self._generation, stats)
+
+    def _write(self, entry: bytes):
+        """Дописывает запись, fsync выполняется пачками"""
+        self._file.write(entry)
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_batch:
+            self._sync()
+
+    def _sync(self):
+        """Сбрасывает буфер и синхронизирует файл с диском"""
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def append(self, user_id: str, card_id: int, stats: dict):
+        """Записывает новую статистику карточки"""
+        entry = pack_entry(user_id, card_id, stats)
+        with self._lock:
+            self._write(entry)
+            self._remember(user_id, card_id, dict(stats))
+
+    def save_user(self, backend, user_id: str, user: dict):
+        """Сохраняет пользователя целиком в снимок; более ранние записи журнала становятся неактуальны"""
+        with self._lock:
+            backend.save_user(user_id, user)
+            if user_id in self._overlay:
+                self._write(pack_entry(user_id, USER_SAVED, {}))
+                self._remember(user_id, USER_SAVED, {})
+
+    def sync(self):
+        """Принудительно синхронизирует журнал с диском"""
+        with self._lock:
+            self._sync()
+
+    def size(self) -> int:
+        """Возвращает размер журнала в байтах"""
+        with self._lock:
+            return self._file.tell()
+
+    def apply(self, user_id: str, user: dict) -> dict:
+        """Накладывает несвернутую статистику на данные пользователя из снимка"""
+        with self._lock:
+            pending = self._overlay.get(user_id)
+            if pending:
+                for card in user.get('cards', []):
+                    if card['id'] in pending:
+                        card['statistics'] = dict(pending[card['id']][1])
+        return user
+
+    def _merge_into_compacting(self):
+        """Переписывает записи незавершенного сворачивания и основного журнала в файл сворачивания"""
+        tmp_path = f"{self.compacting_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION))
+            for journal_path in (self.compacting_path, self.path):
+                for user_id, card_id, stats in read_entries(journal_path):
+                    f.write(pack_entry(user_id, card_id, stats))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.compacting_path)
+
+    def compact(self, backend):
+        """Сворачивает журнал в основной снимок бэкенда"""
+        with self._lock:
+            if not self._overlay and self._file.tell() <= HEADER.size and not os.path.exists(self.compacting_path):
+                return
+            # Переключаемся на новый файл, чтобы не блокировать новые записи
+            self._sync()
+            self._file.close()
+            if os.path.exists(self.compacting_path):
+                # Незавершенное сворачивание: основной журнал дописывается к нему, иначе свернутые
+                # записи остались бы в основном файле и повторились бы после перезапуска
+                self._merge_into_compacting()
+            else:
+                os.replace(self.path, self.compacting_path)
+            self._file = open(self.path, 'wb')
+            self._file.write(HEADER.pack(MAGIC, VERSION))
+            generation = self._generation
+            self._generation += 1
+            user_ids = list(self._overlay)
+
+        # Каждого пользователя сворачиваем под блокировкой, чтобы не пересечься с его сохранением
+        for user_id in user_ids:
+            with self._lock:
+                cards = self._overlay.get(user_id, {})
+                stats_by_card = {
+                    card_id: stats for card_id, (gen, stats) in cards.items() if gen <= generation
+                }
+                if not stats_by_card:
+                    continue
+                backend.update_statistics_batch(user_id, stats_by_card)
+                for card_id in stats_by_card:
+                    del cards[card_id]
+                if not cards:
+                    del self._overlay[user_id]
+
+        with self._lock:
+            os.remove(self.compacting_path)
+
+    def close(self):
+        """Синхронизирует и закрывает журнал"""
+        with self._lock:
+            self._sync()
+            self._file.close()
@@ -0,0 +1,70 @@
+"""Индекс языков карточек: какие карточки подходят для изучения при выбранных языках"""
+
+from utils.constants import SUPPORTED_LANGUAGES
+
+# Язык -> номер бита в маске; незнакомые языки получают следующий свободный бит
+_language_bits = {lang: bit for bit, lang in enumerate(SUPPORTED_LANGUAGES)}
+
+def language_mask(languages) -> int:
+    """Возвращает битовую маску набора языков"""
+    mask = 0
+    for lang in languages:
+        mask |= 1 << _language_bits.setdefault(lang, len(_language_bits))
+    return mask
+
+def card_mask(card: dict) -> int:
+    """Маска языков, для которых у карточки есть непустой перевод"""
+    return language_mask(lang for lang, text in card['translations'].items() if text)
+
+def settings_key(settings: dict) -> tuple:
+    """Ключ набора языков изучения: (маска передней стороны, маска обратной стороны)"""
+    return language_mask(settings.get('front_languages', [])), language_mask(settings.get('back_languages', []))
+
+class LanguageIndex:
+    """Маски языков карточек одного пользователя и множества подходящих карточек.
+
+    Карточка подходит для изучения, если у неё есть перевод хотя бы на один язык
+    передней стороны и хотя бы на один язык обратной. Множество подходящих
+    карточек строится один раз для каждого набора языков и затем обновляется
+    при добавлении, изменении и удалении карточек.
+    """
+
+    def __init__(self, cards: list):
+        # card_id -> маска языков
+        self._masks = {card['id']: card_mask(card) for card in cards}
+        # (маска передней стороны, маска обратной) -> множество card_id
+        self._eligible = {}
+
+    @staticmethod
+    def _matches(mask: int, key: tuple) -> bool:
+        """Проверяет, подходит ли карточка с маской mask для набора языков key"""
+        return bool(mask & key[0]) and bool(mask & key[1])
+
+    def eligible(self, key: tuple) -> set:
+        """Возвращает множество подходящих карточек (не изменять снаружи)"""
+        ids = self._eligible.get(key)
+        if ids is None:
+            ids = self._eligible[key] = {
+                card_id for card_id, mask in self._masks.items() if self._matches(mask, key)
+            }
+        return ids
+
+    def is_eligible(self, card_id: int, key: tuple) -> bool:
+        """Проверяет, подходит ли карточка для набора языков"""
+        mask = self._masks.get(card_id)
+        return mask is not None and self._matches(mask, key)
+
+    def update(self, card: dict):
+        """Пересчитывает маску добавленной или измененной карточки"""
+        mask = self._masks[card['id']] = card_mask(card)
+        for key, ids in self._eligible.items():
+            if self._matches(mask, key):
+                ids.add(card['id'])
+            else:
+                ids.discard(card['id'])
+
+    def remove(self, card_id: int):
+        """Удаляет карточку из индекса"""
+        self._masks.pop(card_id, None)
+        for ids in self._eligible.values():
+            ids.discard(card_id)
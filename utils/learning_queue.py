@@ -0,0 +1,87 @@
+"""Очередь заранее выбранных следующих карточек режима обучения"""
+
+import math
+from collections import deque
+
+class LookaheadQueue:
+    """Следующие карточки одного пользователя, выбранные заранее.
+
+    Очередь упорядочена так же, как карточки выбрал бы индекс, и для каждой
+    карточки хранит ключ порядка (rank_key индекса). Когда меняется статистика
+    карточки, все записи с ключом не меньше её нового ключа могли сдвинуться и
+    удаляются; первая запись сохраняется, если ответили на текущую карточку —
+    она всё равно исключается из следующего выбора. Если порядок в индексе
+    зависит от времени, очередь годна только до момента valid_until. К записи
+    можно приложить отрисованную карточку (rendered), при редактировании она
+    сбрасывается.
+    """
+
+    def __init__(self, size: int, current_card_id=None):
+        self.size = size
+        # Карточка, которая сейчас показана пользователю
+        self.current_card_id = current_card_id
+        # Записи {'card': карточка, 'key': ключ порядка, 'rendered': отрисовка или None}
+        self._entries = deque()
+        self.valid_until = math.inf
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def fill(self, index):
+        """Дополняет очередь следующими карточками из индекса"""
+        missing = self.size - len(self._entries)
+        if missing <= 0:
+            return
+        exclude = {entry['card']['id'] for entry in self._entries}
+        if self.current_card_id is not None:
+            exclude.add(self.current_card_id)
+        self.valid_until = min(self.valid_until, index.stable_until())
+        for card in index.peek(missing, exclude):
+            self._entries.append({'card': card, 'key': index.rank_key(card['id']), 'rendered': None})
+
+    def pop(self, now: float):
+        """Забирает следующую карточку, она становится текущей (None, если очередь пуста или устарела)"""
+        if now >= self.valid_until:
+            self._entries.clear()
+        if not self._entries:
+            self.valid_until = math.inf
+            return None
+        entry = self._entries.popleft()
+        self.current_card_id = entry['card']['id']
+        return entry
+
+    def _truncate(self, key, start: int):
+        """Удаляет записи, начиная с позиции start, ключ которых не меньше key (все, если ключа нет)"""
+        for position in range(start, len(self._entries)):
+            entry_key = self._entries[position]['key']
+            if key is None or entry_key is None or entry_key >= key:
+                for _ in range(len(self._entries) - position):
+                    self._entries.pop()
+                return
+
+    def card_answered(self, card_id: int, key, stable_until: float = math.inf):
+        """Статистика карточки изменилась после ответа (stable_until — новое значение из индекса)"""
+        self.valid_until = min(self.valid_until, stable_until)
+        if card_id == self.current_card_id:
+            self._truncate(key, 1)
+        else:
+            self.card_removed(card_id)
+            self._truncate(key, 0)
+
+    def card_added(self, key, stable_until: float = math.inf):
+        """Добавлена новая карточка"""
+        self.valid_until = min(self.valid_until, stable_until)
+        self._truncate(key, 0)
+
+    def card_edited(self, card_id: int):
+        """Изменились переводы карточки: отрисовку нужно повторить"""
+        for entry in self._entries:
+            if entry['card']['id'] == card_id:
+                entry['rendered'] = None
+
+    def card_removed(self, card_id: int):
+        """Карточка удалена"""
+        self._entries = deque(entry for entry in self._entries if entry['card']['id'] != card_id)
@@ -0,0 +1,40 @@
+"""Простые счетчики и замеры для мониторинга бота"""
+
+from collections import defaultdict
+
+# Счетчики и текущие значения: имя -> число
+_counters = defaultdict(float)
+_gauges = {}
+# Замеры: имя -> [количество, сумма, максимум]
+_observations = defaultdict(lambda: [0, 0.0, 0.0])
+
+def increment(name: str, value: float = 1):
+    """Увеличивает счетчик"""
+    _counters[name] += value
+
+def set_gauge(name: str, value: float):
+    """Запоминает текущее значение (например, длину очереди)"""
+    _gauges[name] = value
+
+def observe(name: str, value: float):
+    """Добавляет замер (задержку, размер пачки и т.п.)"""
+    stats = _observations[name]
+    stats[0] += 1
+    stats[1] += value
+    stats[2] = max(stats[2], value)
+
+def snapshot() -> dict:
+    """Возвращает текущие значения всех метрик"""
+    result = dict(_counters)
+    result.update(_gauges)
+    for name, (count, total, maximum) in _observations.items():
+        result[f"{name}_count"] = count
+        result[f"{name}_avg"] = total / count if count else 0.0
+        result[f"{name}_max"] = maximum
+    return result
+
+def reset():
+    """Сбрасывает все метрики"""
+    _counters.clear()
+    _gauges.clear()
+    _observations.clear()
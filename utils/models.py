@@ -0,0 +1,196 @@
+"""Компактные модели карточки и статистики
+
+Card и Statistics хранят поля в __slots__ вместо словаря экземпляра и ведут
+себя как словари: card['id'], stats.get('due'), 'statistics' in card и т.д.,
+поэтому остальной код работает с ними так же, как со словарями из хранилища.
+Преобразование в словари и обратно без потерь: отсутствующие поля остаются
+отсутствующими, а незнакомые ключи сохраняются в отдельном словаре.
+"""
+
+from collections.abc import MutableMapping
+from itertools import islice
+
+class _SlotMapping(MutableMapping):
+    """Словарь с фиксированным набором полей в __slots__"""
+
+    __slots__ = ('_extra',)
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Имя поля -> дескриптор слота
+        cls._slots = {name: cls.__dict__[name] for name in cls.FIELDS}
+
+    def __init__(self, **fields):
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        """Создает модель из словаря (или другой модели)"""
+        obj = cls.__new__(cls)
+        obj._extra = None
+        slots = cls._slots
+        for key, value in data.items():
+            slot = slots.get(key)
+            if slot is not None:
+                slot.__set__(obj, value)
+            else:
+                if obj._extra is None:
+                    obj._extra = {}
+                obj._extra[key] = value
+        return obj
+
+    def to_dict(self) -> dict:
+        """Возвращает словарь в прежнем формате хранилища"""
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        try:
+            return slot.__get__(self)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        slot = self._slots.get(key)
+        if slot is not None:
+            slot.__set__(self, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+            return
+        try:
+            slot.__delete__(self)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        for name, slot in self._slots.items():
+            try:
+                slot.__get__(self)
+            except AttributeError:
+                continue
+            yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        # Без подсчета всех полей: достаточно первого заполненного
+        return next(iter(self), None) is not None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class Statistics(_SlotMapping):
+    """Статистика ответов и расписание повторения карточки"""
+
+    FIELDS = (
+        'total_attempts', 'correct_answers', 'wrong_answers', 'last_shown', 'last_result',
+        'correct_streak', 'wrong_streak', 'ease', 'interval', 'due'
+    )
+    __slots__ = FIELDS
+
+class Card(_SlotMapping):
+    """Карточка: id, словарь переводов (может быть общим с шаблонной колодой) и статистика"""
+
+    FIELDS = ('id', 'translations', 'statistics')
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_dict(cls, data):
+        card = super().from_dict(data)
+        stats = data.get('statistics')
+        if stats is not None:
+            card.statistics = Statistics.from_dict(stats)
+        return card
+
+    def to_dict(self) -> dict:
+        data = dict(self.items())
+        if data.get('statistics') is not None:
+            data['statistics'] = data['statistics'].to_dict()
+        return data
+
+    def __setitem__(self, key, value):
+        # Статистика всегда хранится как Statistics, даже если присвоен словарь
+        if key == 'statistics' and value is not None and not isinstance(value, Statistics):
+            value = Statistics.from_dict(value)
+        super().__setitem__(key, value)
+
+class Deck:
+    """Карточки пользователя: индекс id -> карточка в порядке добавления.
+
+    Поиск, замена и удаление карточки по id стоят O(1). Для страниц и старого
+    кода колода ведет себя как список: итерация, len и срезы по позициям.
+    """
+
+    __slots__ = ('_cards',)
+
+    def __init__(self, cards=()):
+        self._cards = {card['id']: card for card in cards}
+
+    def __iter__(self):
+        return iter(self._cards.values())
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __getitem__(self, position):
+        """Карточка или срез карточек по позиции в порядке добавления (как у списка)"""
+        if isinstance(position, slice):
+            start, stop, step = position.indices(len(self._cards))
+            if step != 1:
+                return list(self)[position]
+            return list(islice(self._cards.values(), start, max(start, stop)))
+        if position < 0:
+            position += len(self._cards)
+        if not 0 <= position < len(self._cards):
+            raise IndexError('deck index out of range')
+        return next(islice(self._cards.values(), position, None))
+
+    def __repr__(self) -> str:
+        return f"Deck({list(self)!r})"
+
+    def get(self, card_id: int, default=None):
+        """Возвращает карточку по id"""
+        return self._cards.get(card_id, default)
+
+    def append(self, card):
+        """Добавляет карточку в конец (карточка с тем же id заменяется на месте)"""
+        self._cards[card['id']] = card
+
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+
+    def remove(self, card_id: int):
+        """Удаляет карточку по id, возвращает её (None, если карточки нет)"""
+        return self._cards.pop(card_id, None)
+
+def to_cards(cards: list) -> list:
+    """Преобразует карточки из хранилища в модели Card"""
+    return [card if isinstance(card, Card) else Card.from_dict(card) for card in cards]
+
+def to_json(value):
+    """Параметр default для json.dumps: модели записываются как словари"""
+    if isinstance(value, _SlotMapping):
+        return value.to_dict()
+    if isinstance(value, Deck):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
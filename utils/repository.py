@@ -0,0 +1,377 @@
+"""Репозиторий пользователей: единственный владелец данных пользователей в памяти"""
+
+import time
+from collections import OrderedDict
+from utils import metrics
+from utils.constants import USER_CACHE_MAX_USERS, USER_CACHE_MAX_CARDS, SCHEDULER, LEARNING_LOOKAHEAD
+from utils.daily_plan import DailyPlan, daily_limit, day_bounds
+from utils.duplicate_index import DuplicateIndex
+from utils.data_manager import load_user, save_user, save_card_statistics, create_user, create_statistics
+from utils.language_index import LanguageIndex, settings_key
+from utils.learning_queue import LookaheadQueue
+from utils.models import Card, Deck
+from utils.scheduler import create_scheduler
+
+class UserRepository:
+    """Хранит данные активных пользователей в памяти.
+
+    Пользователь загружается из хранилища при первом обращении, а неактивные
+    пользователи вытесняются (LRU), когда кэш превышает лимит по числу
+    пользователей или суммарному числу карточек. Все изменения проходят через
+    методы репозитория и сразу отправляются в хранилище (с отложенной записью —
+    в фоне), поэтому вытеснение не теряет данные.
+    """
+
+    def __init__(self, max_users: int = USER_CACHE_MAX_USERS, max_cards: int = USER_CACHE_MAX_CARDS,
+                 scheduler: str = SCHEDULER):
+        self.max_users = max_users
+        self.max_cards = max_cards
+        self.scheduler = create_scheduler(scheduler)
+        self._users = OrderedDict()
+        # Число карточек каждого пользователя в кэше и их сумма
+        self._card_counts = {}
+        self._cached_cards = 0
+        # Планы на день поверх индексов выбора следующей карточки (строятся при
+        # первом выборе) и наборы языков изучения, для которых построены индексы
+        self._due = {}
+        self._due_keys = {}
+        # Индексы языков карточек
+        self._languages = {}
+        # Очереди заранее выбранных карточек режима обучения
+        self._lookahead = {}
+        # Индексы переводов для поиска дубликатов
+        self._duplicates = {}
+
+    def _drop_indexes(self, user_id: str):
+        """Забывает индексы и очередь карточек пользователя"""
+        self._due.pop(user_id, None)
+        self._due_keys.pop(user_id, None)
+        self._languages.pop(user_id, None)
+        self._lookahead.pop(user_id, None)
+        self._duplicates.pop(user_id, None)
+
+    def reload(self):
+        """Сбрасывает кэш: данные будут перечитаны из хранилища при следующем обращении"""
+        self._users.clear()
+        self._card_counts.clear()
+        self._cached_cards = 0
+        self._due.clear()
+        self._due_keys.clear()
+        self._languages.clear()
+        self._lookahead.clear()
+        self._duplicates.clear()
+        metrics.set_gauge('user_cache_size', 0)
+
+    def _update_card_count(self, user_id: str):
+        """Пересчитывает число карточек пользователя в кэше"""
+        count = len(self._users[user_id].get('cards', []))
+        self._cached_cards += count - self._card_counts.get(user_id, 0)
+        self._card_counts[user_id] = count
+
+    def _put(self, user_id: str, user: dict):
+        """Кладет пользователя в кэш и вытесняет самых давно неактивных"""
+        if self._users.get(user_id) is not user:
+            self._drop_indexes(user_id)
+        if not isinstance(user.get('cards'), Deck):
+            user['cards'] = Deck(user.get('cards', []))
+        self._users[user_id] = user
+        self._users.move_to_end(user_id)
+        self._update_card_count(user_id)
+
+        while len(self._users) > 1 and (
+            len(self._users) > self.max_users or self._cached_cards > self.max_cards
+        ):
+            evicted_id, _ = self._users.popitem(last=False)
+            self._cached_cards -= self._card_counts.pop(evicted_id)
+            self._drop_indexes(evicted_id)
+            metrics.increment('user_cache_evictions')
+        metrics.set_gauge('user_cache_size', len(self._users))
+
+    def get(self, user_id: str):
+        """Возвращает данные пользователя (None, если пользователя нет)"""
+        user = self._users.get(user_id)
+        if user is not None:
+            self._users.move_to_end(user_id)
+            metrics.increment('user_cache_hits')
+            return user
+
+        metrics.increment('user_cache_misses')
+        user = load_user(user_id)
+        if user is not None:
+            self._put(user_id, user)
+        return user
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    def cache_stats(self) -> dict:
+        """Возвращает статистику кэша"""
+        stats = metrics.snapshot()
+        return {
+            'size': len(self._users),
+            'cards': self._cached_cards,
+            'hits': stats.get('user_cache_hits', 0),
+            'misses': stats.get('user_cache_misses', 0),
+            'evictions': stats.get('user_cache_evictions', 0)
+        }
+
+    def create(self, user_id: str, language: str) -> dict:
+        """Создает нового пользователя"""
+        user = create_user(user_id, language)
+        self._put(user_id, user)
+        self.save(user_id, user)
+        return user
+
+    def save(self, user_id: str, user: dict = None):
+        """Сохраняет пользователя в хранилище.
+
+        Обработчик передает объект, который он изменял: если пользователя успели
+        вытеснить из кэша, этот объект снова становится актуальной копией.
+        """
+        if user is None:
+            user = self.get(user_id)
+        elif self._users.get(user_id) is not user:
+            self._put(user_id, user)
+        save_user(user_id, user)
+
+    def find_card(self, user_id: str, card_id: int):
+        """Находит карточку пользователя по ID за O(1)"""
+        user = self.get(user_id)
+        if user is None:
+            return None
+        return user['cards'].get(card_id)
+
+    def add_cards(self, user_id: str, translations_list: list) -> list:
+        """Добавляет карточки с переданными переводами"""
+        user = self.get(user_id)
+        user.setdefault('last_card_id', 0)
+
+        new_cards = []
+        for translations in translations_list:
+            new_card_id = user['last_card_id'] + 1
+            card = Card(id=new_card_id, translations=translations, statistics=create_statistics())
+            user['cards'].append(card)
+            user['last_card_id'] = new_card_id
+            new_cards.append(card)
+            self._reindex_card(user_id, card)
+            if user_id in self._duplicates:
+                self._duplicates[user_id].update(card)
+
+        self._update_card_count(user_id)
+        self.save(user_id, user)
+        return new_cards
+
+    def add_card(self, user_id: str, translations: dict) -> dict:
+        """Добавляет одну карточку"""
+        return self.add_cards(user_id, [translations])[0]
+
+    def set_translation(self, user_id: str, card_id: int, lang: str, text: str):
+        """Изменяет перевод карточки, возвращает карточку (None, если её нет)"""
+        card = self.find_card(user_id, card_id)
+        if card:
+            # Словарь переводов может быть общим с колодой шаблонных карточек — заменяем, а не меняем
+            card['translations'] = {**card['translations'], lang: text}
+            self._reindex_card(user_id, card)
+            if user_id in self._duplicates:
+                self._duplicates[user_id].update(card)
+            self.save(user_id)
+        return card
+
+    def delete_card(self, user_id: str, card_id: int):
+        """Удаляет карточку"""
+        user = self.get(user_id)
+        user['cards'].remove(card_id)
+
+        # Если это была последняя карточка, сбрасываем last_card_id
+        if not user['cards']:
+            user['last_card_id'] = 0
+        if user_id in self._languages:
+            self._languages[user_id].remove(card_id)
+        if user_id in self._due:
+            self._due[user_id].remove(card_id)
+        if user_id in self._lookahead:
+            self._lookahead[user_id].card_removed(card_id)
+        if user_id in self._duplicates:
+            self._duplicates[user_id].remove(card_id)
+        self._update_card_count(user_id)
+        self.save(user_id, user)
+
+    def record_answer(self, user_id: str, card_id: int, is_correct: bool):
+        """Обновляет статистику карточки после ответа, возвращает статистику (None, если карточки нет)"""
+        card = self.find_card(user_id, card_id)
+        if not card:
+            return None
+
+        # Инициализируем статистику, если её нет
+        if 'statistics' not in card:
+            card['statistics'] = create_statistics()
+        stats = card['statistics']
+
+        stats['total_attempts'] += 1
+        if is_correct:
+            stats['correct_answers'] += 1
+            stats['correct_streak'] += 1
+            stats['wrong_streak'] = 0
+        else:
+            stats['wrong_answers'] += 1
+            stats['wrong_streak'] += 1
+            stats['correct_streak'] = 0
+
+        stats['last_shown'] = time.time()
+        stats['last_result'] = is_correct
+        self.scheduler.review(stats, is_correct, stats['last_shown'])
+        self._reindex_card(user_id, card, answered=True)
+
+        # Сохраняем только статистику этой карточки
+        save_card_statistics(user_id, card_id, stats)
+        return stats
+
+    def _reindex_card(self, user_id: str, card: dict, answered: bool = False):
+        """Обновляет индексы пользователя после добавления, изменения карточки или ответа на неё"""
+        languages = self._languages.get(user_id)
+        if languages is None:
+            return
+        card_id = card['id']
+        index = self._due.get(user_id)
+        key = self._due_keys.get(user_id)
+        was_eligible = index is not None and languages.is_eligible(card_id, key)
+        languages.update(card)
+        if index is None:
+            return
+
+        queue = self._lookahead.get(user_id)
+        if not languages.is_eligible(card_id, key):
+            # Карточка больше не подходит под языки изучения
+            if was_eligible:
+                index.remove(card_id)
+                if queue is not None:
+                    queue.card_removed(card_id)
+        elif answered or not was_eligible:
+            index.update(card)
+            if queue is not None and answered:
+                queue.card_answered(card_id, index.rank_key(card_id), index.stable_until())
+            elif queue is not None:
+                queue.card_added(index.rank_key(card_id), index.stable_until())
+        elif queue is not None:
+            queue.card_edited(card_id)
+
+    def _language_index(self, user_id: str, user: dict) -> LanguageIndex:
+        """Возвращает индекс языков карточек пользователя"""
+        languages = self._languages.get(user_id)
+        if languages is None:
+            languages = self._languages[user_id] = LanguageIndex(user.get('cards', []))
+        return languages
+
+    def _duplicate_index(self, user_id: str) -> DuplicateIndex:
+        """Возвращает индекс переводов пользователя (строится при первой проверке)"""
+        index = self._duplicates.get(user_id)
+        if index is None:
+            index = self._duplicates[user_id] = DuplicateIndex(self.get(user_id)['cards'])
+        return index
+
+    def duplicate_languages(self, user_id: str, translations: dict) -> set:
+        """Возвращает языки, на которых такой перевод уже есть у другой карточки"""
+        index = self._duplicate_index(user_id)
+        return {lang for lang, text in translations.items() if text and index.has_translation(lang, text)}
+
+    def similar_translations(self, user_id: str, translations: dict) -> dict:
+        """Возвращает {язык: похожий перевод другой карточки} для переводов, у которых нет точного дубликата"""
+        index = self._duplicate_index(user_id)
+        user = self.get(user_id)
+        similar = {}
+        for lang, text in translations.items():
+            if not text or index.has_translation(lang, text):
+                continue
+            card_id = index.similar_translation(lang, text)
+            if card_id is not None:
+                similar[lang] = user['cards'].get(card_id)['translations'][lang]
+        return similar
+
+    def split_duplicate_cards(self, user_id: str, translations_list: list) -> tuple:
+        """Делит новые карточки на (новые, дубликаты, похожие), в том числе повторы внутри списка"""
+        return self._duplicate_index(user_id).split_new(translations_list)
+
+    def has_learning_cards(self, user_id: str) -> bool:
+        """Проверяет, есть ли карточки с переводами на выбранные языки изучения"""
+        user = self.get(user_id)
+        if user is None:
+            return False
+        return bool(self._language_index(user_id, user).eligible(settings_key(user.get('settings', {}))))
+
+    def _index(self, user_id: str):
+        """Возвращает план на день с индексом для выбора карточек пользователя (None, если пользователя нет).
+
+        В индекс попадают только карточки, подходящие под языки изучения; при смене
+        языков индекс строится заново. План перестраивается при смене языков,
+        дневного лимита и с наступлением нового дня.
+        """
+        user = self.get(user_id)
+        if user is None:
+            return None
+        settings = user.get('settings', {})
+        key = settings_key(settings)
+        limit = daily_limit(settings)
+        now = time.time()
+        plan = self._due.get(user_id)
+        if plan is not None and self._due_keys[user_id] == key and plan.limit == limit and plan.day == day_bounds(now)[0]:
+            return plan
+
+        eligible = self._language_index(user_id, user).eligible(key)
+        cards = [card for card in user.get('cards', []) if card['id'] in eligible]
+        if plan is None or self._due_keys[user_id] != key:
+            index = self.scheduler.create_index(cards)
+        else:
+            index = plan.index
+        plan = self._due[user_id] = DailyPlan.build(index, self.scheduler, cards, limit, now)
+        self._due_keys[user_id] = key
+        self._lookahead.pop(user_id, None)
+        return plan
+
+    def daily_plan_done(self, user_id: str) -> bool:
+        """Проверяет, выполнен ли план на день (и пользователь ещё не решил повторять дальше).
+        Если подходящих карточек нет вовсе, план не считается выполненным"""
+        plan = self._index(user_id)
+        return plan is not None and plan.done and len(plan) > 0
+
+    def start_extra_practice(self, user_id: str):
+        """Разрешает показывать карточки сверх выполненного плана до конца дня"""
+        plan = self._index(user_id)
+        if plan is not None:
+            plan.extra_practice = True
+
+    def select_next_card(self, user_id: str, current_card_id=None):
+        """Выбирает следующую карточку для изучения по индексу карточек пользователя"""
+        index = self._index(user_id)
+        return index.select(current_card_id) if index is not None else None
+
+    def next_learning_card(self, user_id: str, current_card_id=None):
+        """Возвращает запись очереди со следующей карточкой режима обучения (None, если карточек нет).
+
+        Если очередь ещё не заполнена или построена для другой текущей карточки,
+        карточка выбирается сразу.
+        """
+        if self._index(user_id) is None:
+            return None
+        queue = self._lookahead.get(user_id)
+        if queue is None or queue.current_card_id != current_card_id:
+            queue = self._lookahead[user_id] = LookaheadQueue(LEARNING_LOOKAHEAD, current_card_id)
+        entry = queue.pop(time.time())
+        if entry is not None:
+            metrics.increment('learning_queue_hits')
+            return entry
+
+        metrics.increment('learning_queue_misses')
+        card = self.select_next_card(user_id, current_card_id)
+        if card is None:
+            return None
+        queue.current_card_id = card['id']
+        return {'card': card, 'key': None, 'rendered': None}
+
+    def prefetch_learning_cards(self, user_id: str):
+        """Дополняет очередь следующих карточек, возвращает её (None, если очереди нет)"""
+        index = self._index(user_id)
+        queue = self._lookahead.get(user_id)
+        if queue is None or index is None:
+            return None
+        queue.fill(index)
+        return queue
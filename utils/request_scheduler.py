@@ -0,0 +1,203 @@
+"""Исходящие запросы к Bot API: ограничение частоты, приоритеты и ожидание после 429"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from utils import metrics
+from utils.constants import (
+    OUTGOING_GLOBAL_RATE, OUTGOING_GLOBAL_BURST, OUTGOING_CHAT_RATE, OUTGOING_CHAT_BURST,
+    OUTGOING_MAX_CHAT_BUCKETS, OUTGOING_RETRY_LIMIT, OUTGOING_PRIORITIES, OUTGOING_DEFAULT_PRIORITY,
+    OUTGOING_UNLIMITED_METHODS
+)
+
+class TokenBucket:
+    """Корзина токенов с очередью ожидающих по приоритету.
+
+    Токены пополняются со скоростью rate в секунду до burst. Запрос забирает
+    токен сразу, если очередь пуста, иначе встает в очередь: токены выдаются
+    сначала запросам с меньшим номером приоритета, при равном — по порядку.
+    pause запрещает выдачу токенов на время (ответ 429 с retry_after).
+    """
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        # До этого момента токены не выдаются
+        self.blocked_until = 0.0
+        # (приоритет, порядковый номер, future)
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+
+    def __len__(self) -> int:
+        """Число запросов в очереди"""
+        return len(self._waiters)
+
+    @property
+    def idle(self) -> bool:
+        """Корзина полна и никто не ждет: её можно забыть и создать заново"""
+        self._refill()
+        return not self._waiters and self.tokens >= self.burst and self.clock() >= self.blocked_until
+
+    def _refill(self):
+        now = self.clock()
+        start = max(self.updated, self.blocked_until)
+        if now > start:
+            self.tokens = min(self.burst, self.tokens + (now - start) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def _try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1 and self.clock() >= self.blocked_until:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, priority: int = 0):
+        """Ждет токен; запросы с меньшим priority обслуживаются раньше"""
+        if not self._waiters and self._try_take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Токен уже выдан, но запрос отменен — возвращаем токен следующему
+                self.refund()
+            raise
+
+    def refund(self):
+        """Возвращает неиспользованный токен и будит очередь"""
+        self.tokens = min(self.burst, self.tokens + 1)
+        self._wake()
+
+    def pause(self, seconds: float):
+        """Останавливает выдачу токенов на seconds секунд"""
+        self._refill()
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+        self.tokens = 0
+        self._schedule()
+
+    def _schedule(self):
+        """Планирует выдачу токена первому в очереди, когда он появится"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._waiters:
+            return
+        self._refill()
+        now = self.clock()
+        delay = max(self.blocked_until - now, 0.0, (1 - self.tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self._timer = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_take():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+        self._schedule()
+
+class OutgoingScheduler(BaseRequestMiddleware):
+    """Middleware сессии бота: каждый запрос к Bot API сначала получает токен
+    корзины своего чата (если в запросе есть chat_id), затем общей корзины.
+
+    Ответы на нажатия кнопок идут раньше обычных сообщений, удаление старых
+    сообщений — позже (OUTGOING_PRIORITIES). После ответа 429 корзина, к
+    которой относится запрос, останавливается на retry_after секунд, и запрос
+    повторяется (не больше OUTGOING_RETRY_LIMIT раз). Telegram не сообщает,
+    касается ли 429 одного чата или всего бота: общая корзина останавливается,
+    если у запроса нет чата или если под ограничением оказался уже второй чат.
+    """
+
+    def __init__(self, global_rate: float = OUTGOING_GLOBAL_RATE, global_burst: float = OUTGOING_GLOBAL_BURST,
+                 chat_rate: float = OUTGOING_CHAT_RATE, chat_burst: float = OUTGOING_CHAT_BURST,
+                 retry_limit: int = OUTGOING_RETRY_LIMIT, clock=time.monotonic):
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.retry_limit = retry_limit
+        # chat_id -> корзина чата, от давно не использованных к недавним
+        self._chats = OrderedDict()
+        # Сколько запросов сейчас ждут токен
+        self.queue_depth = 0
+        # Последний чат, получивший 429, и момент окончания его паузы
+        self._flooded_chat = None
+        self._flooded_until = 0.0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+            return bucket
+        # Полные корзины без очереди ничем не отличаются от новых: забываем самые давние,
+        # пока таблица заполнена (занятую корзину не трогаем, она освободится позже)
+        while len(self._chats) >= OUTGOING_MAX_CHAT_BUCKETS and next(iter(self._chats.values())).idle:
+            self._chats.popitem(last=False)
+        bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, self.clock)
+        return bucket
+
+    async def __call__(self, make_request, bot, method):
+        name = method.__api_method__
+        if name in OUTGOING_UNLIMITED_METHODS:
+            return await make_request(bot, method)
+        priority = OUTGOING_PRIORITIES.get(name, OUTGOING_DEFAULT_PRIORITY)
+        chat_id = getattr(method, 'chat_id', None)
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+
+        for attempt in range(self.retry_limit + 1):
+            started = self.clock()
+            self.queue_depth += 1
+            metrics.set_gauge('outgoing_queue_depth', self.queue_depth)
+            try:
+                if chat_bucket is not None:
+                    await chat_bucket.acquire(priority)
+                try:
+                    await self.global_bucket.acquire(priority)
+                except asyncio.CancelledError:
+                    # Запрос отменен в общей очереди: токен чата ему больше не нужен
+                    if chat_bucket is not None:
+                        chat_bucket.refund()
+                    raise
+            finally:
+                self.queue_depth -= 1
+                metrics.set_gauge('outgoing_queue_depth', self.queue_depth)
+            metrics.observe('outgoing_wait_seconds', self.clock() - started)
+            metrics.increment('outgoing_requests')
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                metrics.increment('outgoing_retry_after')
+                print(f"Flood control on {name}: retry in {e.retry_after}s")
+                self._pause(chat_id, chat_bucket, e.retry_after)
+                if attempt == self.retry_limit:
+                    raise
+
+    def _pause(self, chat_id, chat_bucket, seconds: float):
+        """Останавливает корзину чата после 429, а при ограничении на весь бот — и общую корзину"""
+        now = self.clock()
+        bot_wide = chat_bucket is None or (
+            self._flooded_chat is not None and self._flooded_chat != chat_id and now < self._flooded_until
+        )
+        if chat_bucket is not None:
+            chat_bucket.pause(seconds)
+            self._flooded_chat = chat_id
+            self._flooded_until = now + seconds
+        if bot_wide:
+            metrics.increment('outgoing_global_pauses')
+            self.global_bucket.pause(seconds)
@@ -0,0 +1,178 @@
+"""Планировщики повторений: как ответ меняет расписание карточки и как выбрать следующую карточку"""
+
+import heapq
+import math
+from utils.constants import (
+    SCHEDULER, CARD_SELECTION_ENGINE, SM2_INITIAL_EASE, SM2_MIN_EASE, SM2_EASE_PENALTY,
+    SM2_FIRST_INTERVAL, SM2_SECOND_INTERVAL, SM2_RELEARN_INTERVAL
+)
+from utils.due_index import DueIndex
+from utils.scoring import ScoreColumns
+
+# Движки выбора следующей карточки для эвристики (см. CARD_SELECTION_ENGINE)
+SELECTION_ENGINES = {'heap': DueIndex, 'columns': ScoreColumns}
+
+def due_time(stats: dict) -> float:
+    """Срок повторения карточки.
+
+    Новые карточки идут первыми, а карточки, показанные до появления планировщика,
+    считаются подлежащими повторению с момента последнего показа.
+    """
+    if stats.get('due') is not None:
+        return stats['due']
+    return stats.get('last_shown') or 0
+
+class DueQueue:
+    """Min-куча карточек по сроку повторения: выбор карточки с самым ранним сроком за O(log n).
+
+    Изменённые и удалённые карточки остаются в куче до тех пор, пока не окажутся
+    на вершине, и пропускаются по номеру версии.
+    """
+
+    def __init__(self, cards: list):
+        # card_id -> (версия, карточка)
+        self._entries = {}
+        # (срок, card_id, версия)
+        self._heap = []
+        self._version = 0
+        for card in cards:
+            self._insert(card)
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, card: dict, push=list.append):
+        """Добавляет карточку с новой версией"""
+        self._version += 1
+        self._entries[card['id']] = (self._version, card)
+        push(self._heap, (due_time(card.get('statistics') or {}), card['id'], self._version))
+
+    def _clean_top(self):
+        """Снимает с вершины устаревшие записи"""
+        heap = self._heap
+        while heap and self._entries.get(heap[0][1], (None,))[0] != heap[0][2]:
+            heapq.heappop(heap)
+
+    def select(self, exclude_id=None):
+        """Возвращает карточку с самым ранним сроком, кроме exclude_id (None, если карточек нет)"""
+        if not self._entries:
+            return None
+        if len(self._entries) == 1:
+            return next(iter(self._entries.values()))[1]
+
+        self._clean_top()
+        if self._heap[0][1] != exclude_id:
+            return self._entries[self._heap[0][1]][1]
+
+        # Вершина исключена — временно снимаем её и смотрим следующую
+        excluded = heapq.heappop(self._heap)
+        self._clean_top()
+        card = self._entries[self._heap[0][1]][1]
+        heapq.heappush(self._heap, excluded)
+        return card
+
+    def rank_key(self, card_id: int):
+        """Ключ порядка показа карточки: меньший ключ показывается раньше"""
+        entry = self._entries.get(card_id)
+        if entry is None:
+            return None
+        return (due_time(entry[1].get('statistics') or {}), card_id)
+
+    def stable_until(self) -> float:
+        """Момент, до которого порядок карточек не меняется сам по себе (срок повторения от времени не зависит)"""
+        return math.inf
+
+    def peek(self, count: int, exclude=()) -> list:
+        """Возвращает до count карточек в порядке показа, пропуская exclude (очередь не меняется)"""
+        taken = []
+        cards = []
+        while self._heap and len(cards) < count:
+            item = heapq.heappop(self._heap)
+            if self._entries.get(item[1], (None,))[0] != item[2]:
+                continue
+            taken.append(item)
+            if item[1] not in exclude:
+                cards.append(self._entries[item[1]][1])
+        for item in taken:
+            heapq.heappush(self._heap, item)
+        return cards
+
+    def update(self, card: dict):
+        """Переставляет карточку после изменения её срока или добавляет новую"""
+        self._insert(card, heapq.heappush)
+        self._maybe_rebuild()
+
+    def remove(self, card_id: int):
+        """Удаляет карточку из очереди"""
+        self._entries.pop(card_id, None)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        """Перестраивает кучу, когда устаревших записей становится больше актуальных"""
+        if len(self._heap) <= 2 * len(self._entries) + 64:
+            return
+        self._heap = [
+            (due_time(card.get('statistics') or {}), card_id, version)
+            for card_id, (version, card) in self._entries.items()
+        ]
+        heapq.heapify(self._heap)
+
+class HeuristicScheduler:
+    """Прежняя эвристика: ответ не меняет расписание, порядок задает calculate_priority"""
+
+    def __init__(self, engine: str = CARD_SELECTION_ENGINE):
+        self.index_class = SELECTION_ENGINES[engine]
+
+    def review(self, stats: dict, is_correct: bool, now: float):
+        """Эвристике нечего обновлять: приоритет считается по базовой статистике"""
+
+    def is_due(self, stats: dict, until: float) -> bool:
+        """У эвристики нет сроков: повторять можно любую карточку"""
+        return True
+
+    def create_index(self, cards: list):
+        """Создает индекс для выбора следующей карточки"""
+        return self.index_class(cards)
+
+class SM2Scheduler:
+    """Интервальные повторения в стиле SM-2.
+
+    После правильного ответа интервал растет: SM2_FIRST_INTERVAL, SM2_SECOND_INTERVAL,
+    затем предыдущий интервал умножается на легкость карточки. Ошибка снижает легкость
+    и возвращает карточку через SM2_RELEARN_INTERVAL. Следующей показывается карточка
+    с самым ранним сроком повторения.
+    """
+
+    def review(self, stats: dict, is_correct: bool, now: float):
+        """Обновляет легкость, интервал и срок повторения после ответа (стрики уже обновлены)"""
+        ease = stats.get('ease') or SM2_INITIAL_EASE
+        if is_correct:
+            if stats['correct_streak'] <= 1:
+                interval = SM2_FIRST_INTERVAL
+            elif stats['correct_streak'] == 2:
+                interval = SM2_SECOND_INTERVAL
+            else:
+                interval = max(stats.get('interval') or 0, SM2_SECOND_INTERVAL) * ease
+        else:
+            ease = max(SM2_MIN_EASE, ease - SM2_EASE_PENALTY)
+            interval = SM2_RELEARN_INTERVAL
+        stats['ease'] = ease
+        stats['interval'] = interval
+        stats['due'] = now + interval
+
+    def is_due(self, stats: dict, until: float) -> bool:
+        """Проверяет, наступает ли срок повторения карточки до момента until"""
+        return due_time(stats) < until
+
+    def create_index(self, cards: list):
+        """Создает очередь карточек по сроку повторения"""
+        return DueQueue(cards)
+
+SCHEDULERS = {'sm2': SM2Scheduler, 'heuristic': HeuristicScheduler}
+
+def create_scheduler(name: str = SCHEDULER):
+    """Создает планировщик по имени ('sm2' или 'heuristic')"""
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unknown scheduler: {name}")
+    return SCHEDULERS[name]()
@@ -0,0 +1,199 @@
+"""Пакетный расчет приоритетов карточек по статистике, разложенной по колонкам"""
+
+import heapq
+import math
+import random
+import time
+from array import array
+from utils.data_manager import NEW_CARD_PRIORITY, RECENCY_PRIORITY, RANDOM_PRIORITY, create_statistics
+
+try:
+    import numpy as np
+except ImportError:  # numpy необязателен: без него считаем циклом по колонкам
+    np = None
+
+class ScoreColumns:
+    """Статистика карточек пользователя в виде колонок (struct of arrays).
+
+    Приоритеты всех карточек считаются одной векторной операцией NumPy по тем же
+    правилам, что и calculate_priority (давность показа, доля ошибок, стрик ошибок,
+    случайный фактор). Колонки хранятся в array.array, NumPy читает их без
+    копирования; если NumPy не установлен, используется цикл по колонкам.
+    Порядок строк не важен: удаление переносит на место карточки последнюю
+    строку, а при равном приоритете выигрывает карточка с меньшим id.
+    Интерфейс совпадает с DueIndex: select, peek, rank_key, update, remove.
+    """
+
+    def __init__(self, cards: list):
+        self._cards = []
+        self._positions = {}
+        # id, last_shown (NaN — карточку ещё не показывали), total_attempts, wrong_answers, wrong_streak
+        self.card_ids = array('q')
+        self.last_shown = array('d')
+        self.total_attempts = array('q')
+        self.wrong_answers = array('q')
+        self.wrong_streak = array('q')
+        self._rng = np.random.default_rng() if np is not None else None
+        # Ближайший переход порога давности (None — не вычислен); может быть раньше настоящего, но не позже
+        self._stable_until = None
+        for card in cards:
+            self.update(card)
+
+    def _columns(self) -> tuple:
+        return (self._cards, self.card_ids, self.last_shown, self.total_attempts, self.wrong_answers, self.wrong_streak)
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def update(self, card: dict):
+        """Записывает статистику карточки в колонки (добавляет карточку, если её ещё нет)"""
+        stats = card.get('statistics') or create_statistics()
+        last_shown = math.nan if stats['last_shown'] is None else stats['last_shown']
+        position = self._positions.get(card['id'])
+        if position is None:
+            self._positions[card['id']] = len(self._cards)
+            self._cards.append(card)
+            self.card_ids.append(card['id'])
+            self.last_shown.append(last_shown)
+            self.total_attempts.append(stats['total_attempts'])
+            self.wrong_answers.append(stats['wrong_answers'])
+            self.wrong_streak.append(stats['wrong_streak'])
+        else:
+            self._cards[position] = card
+            self.last_shown[position] = last_shown
+            self.total_attempts[position] = stats['total_attempts']
+            self.wrong_answers[position] = stats['wrong_answers']
+            self.wrong_streak[position] = stats['wrong_streak']
+        if self._stable_until is not None:
+            # Прежний переход карточки мог быть ближайшим — оставляем более ранний момент
+            self._stable_until = min(self._stable_until, _next_crossing(last_shown, time.time()))
+
+    def remove(self, card_id: int):
+        """Удаляет карточку из колонок: на её место переносится последняя строка"""
+        position = self._positions.pop(card_id, None)
+        if position is None:
+            return
+        last = len(self._cards) - 1
+        columns = self._columns()
+        if position != last:
+            for column in columns:
+                column[position] = column[last]
+            self._positions[self.card_ids[position]] = position
+        for column in columns:
+            column.pop()
+
+    def _scores_numpy(self, now: float):
+        """Приоритеты всех карточек одной векторной операцией"""
+        last_shown = np.frombuffer(self.last_shown, dtype=np.float64)
+        total = np.frombuffer(self.total_attempts, dtype=np.int64)
+        wrong = np.frombuffer(self.wrong_answers, dtype=np.int64)
+        wrong_streak = np.frombuffer(self.wrong_streak, dtype=np.int64)
+
+        # Давность показа (0-30 баллов); для новых карточек NaN не проходит ни одно сравнение
+        hours_since_last = (now - last_shown) / 3600
+        scores = np.where(np.isnan(last_shown), NEW_CARD_PRIORITY, 0)
+        for hours, priority in reversed(RECENCY_PRIORITY):
+            scores = np.where(hours_since_last > hours, priority, scores)
+
+        # Доля ошибок (0-30 баллов)
+        error_rate = np.divide(wrong, total, out=np.zeros(len(total)), where=total > 0)
+        scores += np.select([error_rate > 0.5, error_rate > 0.3, error_rate > 0.1], [30, 20, 10], 0)
+
+        # Стрик ошибок (0-15 баллов) и случайный фактор (0-35 баллов)
+        scores += np.where(wrong_streak >= 2, 15, np.where(wrong_streak == 1, 7, 0))
+        scores += self._rng.integers(0, RANDOM_PRIORITY + 1, len(scores))
+        return scores
+
+    def _scores_python(self, now: float) -> list:
+        """Приоритеты всех карточек циклом по колонкам (без NumPy)"""
+        randint = random.randint
+        scores = []
+        for last_shown, total, wrong, wrong_streak in zip(
+            self.last_shown, self.total_attempts, self.wrong_answers, self.wrong_streak
+        ):
+            if last_shown != last_shown:  # NaN — новая карточка
+                priority = NEW_CARD_PRIORITY
+            else:
+                priority = 0
+                hours_since_last = (now - last_shown) / 3600
+                for hours, recency in RECENCY_PRIORITY:
+                    if hours_since_last > hours:
+                        priority = recency
+                        break
+            if total > 0:
+                error_rate = wrong / total
+                if error_rate > 0.5:
+                    priority += 30
+                elif error_rate > 0.3:
+                    priority += 20
+                elif error_rate > 0.1:
+                    priority += 10
+            if wrong_streak >= 2:
+                priority += 15
+            elif wrong_streak == 1:
+                priority += 7
+            scores.append(priority + randint(0, RANDOM_PRIORITY))
+        return scores
+
+    def scores(self, now: float = None):
+        """Возвращает приоритеты карточек в порядке строк колонок (см. card_ids)"""
+        if now is None:
+            now = time.time()
+        if np is not None:
+            return self._scores_numpy(now)
+        return self._scores_python(now)
+
+    def rank_key(self, card_id: int):
+        """Порядок карточек каждый раз считается заново со случайным фактором, постоянного ключа нет"""
+        return None
+
+    def stable_until(self) -> float:
+        """Момент, до которого баллы за давность показа не меняются (ближайшее пересечение порога).
+
+        Значение запоминается и после ответов только уменьшается, поэтому
+        полный пересчет по колонкам нужен, лишь когда этот момент наступил.
+        """
+        now = time.time()
+        if self._stable_until is None or self._stable_until <= now:
+            if np is not None:
+                self._stable_until = self._stable_until_numpy(now)
+            else:
+                self._stable_until = min((_next_crossing(last_shown, now) for last_shown in self.last_shown), default=math.inf)
+        return self._stable_until
+
+    def _stable_until_numpy(self, now: float) -> float:
+        last_shown = np.frombuffer(self.last_shown, dtype=np.float64)
+        crossings = last_shown[:, None] + np.array([hours * 3600 for hours, _ in RECENCY_PRIORITY])
+        crossings = crossings[crossings > now]  # для NaN сравнение ложно
+        return float(crossings.min()) if crossings.size else math.inf
+
+    def peek(self, count: int, exclude=()) -> list:
+        """Возвращает до count карточек с наибольшими приоритетами, пропуская exclude"""
+        scores = self.scores()
+        ids = self.card_ids
+        positions = [position for position, card_id in enumerate(ids) if card_id not in exclude]
+        best = heapq.nsmallest(count, positions, key=lambda position: (-scores[position], ids[position]))
+        return [self._cards[position] for position in best]
+
+    def select(self, exclude_id=None):
+        """Возвращает карточку с наибольшим приоритетом, кроме exclude_id (None, если карточек нет)"""
+        if not self._cards:
+            return None
+        if len(self._cards) == 1:
+            return self._cards[0]
+
+        scores = self.scores()
+        excluded = self._positions.get(exclude_id) if exclude_id else None
+        if excluded is not None:
+            scores[excluded] = -1
+        # При равном приоритете выигрывает карточка с меньшим id (как в DueIndex)
+        ids = self.card_ids
+        if np is not None:
+            candidates = np.flatnonzero(scores == scores.max())
+            best = candidates[np.argmin(np.frombuffer(ids, dtype=np.int64)[candidates])]
+            return self._cards[int(best)]
+        return self._cards[max(range(len(scores)), key=lambda position: (scores[position], -ids[position]))]
+
+def _next_crossing(last_shown: float, now: float) -> float:
+    """Ближайший после now момент, когда карточка переходит порог давности (inf, если порогов впереди нет)"""
+    return min((last_shown + hours * 3600 for hours, _ in RECENCY_PRIORITY if last_shown + hours * 3600 > now), default=math.inf)
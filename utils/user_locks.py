@@ -0,0 +1,63 @@
+"""Блокировки по пользователям: обновления одного пользователя обрабатываются по очереди"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from aiogram import BaseMiddleware
+from utils import metrics
+
+class UserLockMap:
+    """Набор asyncio-блокировок по user_id.
+
+    Блокировка создается при первом обращении и удаляется, когда её больше
+    никто не держит и не ждет, поэтому словарь не растет с числом пользователей.
+    """
+
+    def __init__(self):
+        # user_id -> [блокировка, число владельцев и ожидающих]
+        self._locks = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, user_id: str):
+        """Захватывает блокировку пользователя на время блока async with"""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        lock = entry[0]
+        try:
+            if entry[1] > 1:
+                # Блокировку уже держит или ждет другое обновление этого пользователя
+                metrics.increment('user_lock_contended')
+                started = time.perf_counter()
+                await lock.acquire()
+                metrics.observe('user_lock_wait_seconds', time.perf_counter() - started)
+            else:
+                await lock.acquire()
+            metrics.increment('user_lock_acquired')
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[user_id]
+            metrics.set_gauge('user_locks_active', len(self._locks))
+
+class UserLockMiddleware(BaseMiddleware):
+    """Внешний middleware: обработчики одного пользователя выполняются последовательно,
+    обновления разных пользователей — параллельно"""
+
+    def __init__(self, locks: UserLockMap):
+        self.locks = locks
+
+    async def __call__(self, handler, event, data):
+        user = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+        async with self.locks.hold(str(user.id)):
+            return await handler(event, data)
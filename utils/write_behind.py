@@ -0,0 +1,145 @@
+"""Отложенная запись: изменения пользователей копятся в памяти и сбрасываются на диск пачками"""
+
+import asyncio
+import copy
+import threading
+import time
+from utils import metrics
+
+class WriteBehindCache:
+    """Кэш отложенной записи.
+
+    Обработчики только помечают пользователя «грязным», а фоновая задача
+    сбрасывает накопленные изменения в пуле потоков раз в interval секунд
+    или сразу, как только грязных пользователей становится max_dirty.
+    Пока пачка пишется, она остается видна get и pending_statistics (после
+    новых грязных изменений), чтобы перечитанный пользователь не потерял её.
+    """
+
+    def __init__(self, write_batch, interval: float, max_dirty: int):
+        # write_batch(users, statistics) синхронно записывает пачку на диск
+        self._write_batch = write_batch
+        self.interval = interval
+        self.max_dirty = max_dirty
+        # user_id -> актуальный объект пользователя
+        self._dirty_users = {}
+        # user_id -> {card_id: статистика} для точечных обновлений
+        self._dirty_stats = {}
+        # Пачка, которая сейчас записывается: те же объекты пользователей и копии статистики
+        self._flushing_users = {}
+        self._flushing_stats = {}
+        self._wakeup = asyncio.Event()
+        # Запись пачки и финальный сброс не должны идти одновременно
+        self._write_lock = threading.Lock()
+
+    def _queue_depth(self) -> int:
+        """Количество пользователей, ожидающих записи"""
+        return len(self._dirty_users.keys() | self._dirty_stats.keys())
+
+    def _updated(self):
+        """Обновляет метрики и будит фоновую задачу при превышении порога"""
+        depth = self._queue_depth()
+        metrics.set_gauge('write_behind_queue_depth', depth)
+        if depth >= self.max_dirty:
+            self._wakeup.set()
+
+    def mark_dirty(self, user_id: str, user: dict):
+        """Помечает пользователя для сохранения целиком"""
+        self._dirty_users[user_id] = user
+        # Полное сохранение включает и статистику
+        self._dirty_stats.pop(user_id, None)
+        metrics.increment('write_behind_updates')
+        self._updated()
+
+    def mark_statistics(self, user_id: str, card_id: int, stats: dict):
+        """Помечает статистику одной карточки для сохранения"""
+        if user_id not in self._dirty_users:
+            self._dirty_stats.setdefault(user_id, {})[card_id] = stats
+        metrics.increment('write_behind_updates')
+        self._updated()
+
+    def get(self, user_id: str):
+        """Возвращает ещё не записанного пользователя (или None)"""
+        user = self._dirty_users.get(user_id)
+        if user is None:
+            user = self._flushing_users.get(user_id)
+        return user
+
+    def pending_statistics(self, user_id: str) -> dict:
+        """Возвращает ещё не записанную статистику карточек пользователя"""
+        flushing = self._flushing_stats.get(user_id)
+        if not flushing:
+            return self._dirty_stats.get(user_id, {})
+        # Новые изменения важнее тех, что сейчас записываются
+        return {**flushing, **self._dirty_stats.get(user_id, {})}
+
+    def _take_batch(self):
+        """Забирает накопленные изменения, копируя их, чтобы обработчики могли менять данные дальше"""
+        users = {user_id: copy.deepcopy(user) for user_id, user in self._dirty_users.items()}
+        stats = {
+            user_id: {card_id: dict(card_stats) for card_id, card_stats in cards.items()}
+            for user_id, cards in self._dirty_stats.items()
+        }
+        self._flushing_users = self._dirty_users
+        self._flushing_stats = stats
+        self._dirty_users = {}
+        self._dirty_stats = {}
+        metrics.set_gauge('write_behind_queue_depth', 0)
+        return users, stats
+
+    def _finish_batch(self):
+        """Пачка записана (или возвращена в очередь): читать её больше не нужно"""
+        self._flushing_users = {}
+        self._flushing_stats = {}
+
+    def _write(self, users: dict, stats: dict):
+        """Записывает пачку и обновляет метрики"""
+        started = time.perf_counter()
+        with self._write_lock:
+            self._write_batch(users, stats)
+        metrics.observe('write_behind_flush_seconds', time.perf_counter() - started)
+        metrics.observe('write_behind_batch_size', len(users.keys() | stats.keys()))
+        metrics.increment('write_behind_flushes')
+
+    async def flush(self):
+        """Сбрасывает накопленные изменения в пуле потоков"""
+        if not self._dirty_users and not self._dirty_stats:
+            return
+        users, stats = self._take_batch()
+        try:
+            await asyncio.to_thread(self._write, users, stats)
+        except Exception as e:
+            # Возвращаем пачку в очередь, если пользователь не изменился заново
+            print(f"Write-behind flush error: {e}")
+            metrics.increment('write_behind_errors')
+            for user_id, user in self._flushing_users.items():
+                self._dirty_users.setdefault(user_id, user)
+            for user_id, cards in stats.items():
+                if user_id not in self._dirty_users:
+                    pending = self._dirty_stats.setdefault(user_id, {})
+                    for card_id, card_stats in cards.items():
+                        pending.setdefault(card_id, card_stats)
+            self._updated()
+        finally:
+            self._finish_batch()
+
+    def flush_sync(self):
+        """Синхронно сбрасывает всё накопленное (используется при остановке)"""
+        if self._dirty_users or self._dirty_stats:
+            try:
+                self._write(*self._take_batch())
+            finally:
+                self._finish_batch()
+
+    async def run(self):
+        """Фоновая задача: сброс по интервалу или по порогу, гарантированный сброс при остановке"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+        finally:
+            self.flush_sync()